@@ -1,9 +1,13 @@
 from rest_framework import serializers
 
 from address.models import Address
+from booking_api.serializers import SparseFieldsMixin
 
 
-class AddressSerializer(serializers.ModelSerializer):
+class AddressSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    # Writable so nested updates can tell existing addresses from new ones
+    id = serializers.IntegerField(required=False)
+
     class Meta:
         model = Address
         fields = "__all__"
@@ -1 +1,98 @@
-# Create your tests here.
+from address.models import Address
+from booking_api.testing import PerformanceTestCase, create_salon
+
+
+class SalonAddressSyncTests(PerformanceTestCase):
+    """Nested address writes through the salon endpoint."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.salon = create_salon()
+        cls.user = cls.salon.users.first()
+
+    def setUp(self):
+        super().setUp()
+        self.authenticate(self.user)
+
+    def set_addresses(self, count):
+        addresses = Address.objects.bulk_create(
+            [
+                Address(street=f"{number} High Street", city="London")
+                for number in range(count)
+            ]
+        )
+        self.salon.addresses.set(addresses)
+        return addresses
+
+    def payload(self, addresses):
+        """Update the first address, keep the rest, drop the last, add one."""
+        changed, *kept, _dropped = addresses
+        return {
+            "addresses": [
+                {"id": changed.pk, "street": "Changed Street", "city": "London"},
+                *({"id": address.pk} for address in kept),
+                {"street": "New Street", "city": "Leeds"},
+            ]
+        }
+
+    def patch(self, payload):
+        return self.client.patch(f"/salons/{self.salon.pk}/", payload, format="json")
+
+    def test_sync_applies_changes(self):
+        first, second, third = self.set_addresses(3)
+
+        response = self.patch(self.payload([first, second, third]))
+
+        self.assertEqual(response.status_code, 200)
+        streets = {address["street"] for address in response.data["addresses"]}
+        self.assertEqual(streets, {"Changed Street", "1 High Street", "New Street"})
+        # Unlinked, not deleted
+        self.assertTrue(Address.objects.filter(pk=third.pk).exists())
+
+    def test_sync_performance(self):
+        payload = self.payload(self.set_addresses(3))
+        self.assert_performance(
+            "salons.update_addresses",
+            lambda: self.patch(payload),
+            max_queries=9,
+        )
+
+    def test_sync_query_count_does_not_depend_on_address_count(self):
+        # Warm the cached user so both measurements start equal
+        self.client.get(f"/salons/{self.salon.pk}/")
+
+        counts = []
+        for count in (3, 12):
+            payload = self.payload(self.set_addresses(count))
+            queries, _ = self.measure(lambda payload=payload: self.patch(payload), 200)
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_unknown_address_is_rejected(self):
+        other = create_salon(name="Other Salon").addresses.get()
+
+        response = self.patch({"addresses": [{"id": other.pk, "street": "Taken"}]})
+
+        self.assertEqual(response.status_code, 400)
+        other.refresh_from_db()
+        self.assertEqual(other.street, "1 High Street")
+
+    def test_unknown_address_is_rejected_before_any_write(self):
+        addresses = self.set_addresses(2)
+        other = create_salon(name="Other Salon").addresses.get()
+        payload = self.payload(addresses)
+        payload["name"] = "Renamed"
+        payload["addresses"][0]["id"] = other.pk
+        # Warm the cached user
+        self.client.get(f"/salons/{self.salon.pk}/")
+
+        with self.assertNumQueries(5):
+            # The salon and its addresses within the request's savepoint,
+            # and no write at all
+            response = self.patch(payload)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn(str(other.pk), str(response.data["addresses"]))
+        self.salon.refresh_from_db()
+        self.assertNotEqual(self.salon.name, "Renamed")
+        self.assertCountEqual(self.salon.addresses.all(), addresses)
@@ -0,0 +1,53 @@
+from contextlib import contextmanager
+
+import arrow
+import dramatiq
+from dramatiq.common import dq_name
+
+# Queue of the SMS actors
+QUEUE_NAME = "default"
+
+
+def delayed_messages_key(queue_name=QUEUE_NAME):
+    """
+    Hash in which dramatiq's Redis broker keeps the payload of every delayed
+    message of ``queue_name``, keyed by the ``redis_message_id`` we store in
+    ``Appointment.task_id``. Follows the broker's namespace.
+    """
+    return f"{dramatiq.get_broker().namespace}:{dq_name(queue_name)}.msgs"
+
+
+@contextmanager
+def pipelined_enqueues(broker=None):
+    """
+    Send the messages enqueued inside the block in a single Redis round trip.
+
+    The Redis broker runs its dispatch script once per message; within the
+    block the script is queued on a pipeline executed on exit instead.
+    Message ids are assigned before sending, so ``send_with_options()`` still
+    returns them.
+    """
+    broker = broker or dramatiq.get_broker()
+    script = broker.scripts["dispatch"]
+    with broker.client.pipeline(transaction=False) as pipeline:
+        # ``broker.do_enqueue`` looks the script up on every call
+        broker.scripts["dispatch"] = lambda keys, args: script(
+            keys=keys, args=args, client=pipeline
+        )
+        try:
+            yield
+        finally:
+            broker.scripts["dispatch"] = script
+        pipeline.execute()
+
+
+def reminder_delay_ms(appointment_time, reminder_minutes, now=None):
+    """
+    Milliseconds to wait before sending the reminder for an appointment.
+
+    Returns a value <= 0 when the reminder time has already passed.
+    """
+    reminder_time = arrow.get(appointment_time).shift(minutes=-reminder_minutes)
+    now = arrow.get(now) if now else arrow.now()
+
+    return int((reminder_time - now).total_seconds()) * 1000
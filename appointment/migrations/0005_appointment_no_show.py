@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-19 16:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointment', '0004_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='appointment',
+            name='no_show',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2 on 2026-10-19 16:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointment', '0005_appointment_no_show'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(
+                fields=['salon', 'appointment_time'], name='appointment_salon_time'
+            ),
+        ),
+    ]
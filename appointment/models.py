@@ -1,13 +1,14 @@
-import arrow
-import redis
-from django.conf import settings
 from django.db import models
 from django_extensions.db.models import TimeStampedModel
 
+from booking_api.cache import get_redis_client
 from customer.models import Customer
+from salon.helpers import get_salon_settings
 from salon.models import Salon
 from user.models import ExtendedUser
 
+from .helpers import delayed_messages_key, reminder_delay_ms
+
 
 class Appointment(TimeStampedModel):
     salon = models.ForeignKey(Salon, on_delete=models.CASCADE)
@@ -17,8 +18,17 @@ class Appointment(TimeStampedModel):
     comment = models.TextField(blank=True, default="")
     column_id = models.IntegerField(default=1)
     end_time = models.DateTimeField(blank=True, null=True)
+    no_show = models.BooleanField(default=False)
     task_id = models.CharField(max_length=50, blank=True, editable=False)
 
+    class Meta(TimeStampedModel.Meta):
+        indexes = (
+            # Salon-scoped listings, usually narrowed to one day
+            models.Index(
+                fields=["salon", "appointment_time"], name="appointment_salon_time"
+            ),
+        )
+
     def __str__(self):
         return f"Appointment #{self.pk} - {self.user}"
 
@@ -30,12 +40,10 @@ class Appointment(TimeStampedModel):
 
     def schedule_reminder_sms(self):
         """SMS #2: Schedule reminder X minutes before."""
-        reminder_minutes = self.salon.reminder_time_minutes
-        appointment_time = arrow.get(self.appointment_time)
-        reminder_time = appointment_time.shift(minutes=-reminder_minutes)
-        now = arrow.now()
-
-        milli_to_wait = int((reminder_time - now).total_seconds()) * 1000
+        salon_settings = get_salon_settings(self.salon_id)
+        milli_to_wait = reminder_delay_ms(
+            self.appointment_time, salon_settings.reminder_time_minutes
+        )
 
         if milli_to_wait <= 0:
             return None
@@ -51,8 +59,7 @@ class Appointment(TimeStampedModel):
         """Cancel scheduled reminder task."""
         if not self.task_id:
             return
-        redis_client = redis.Redis.from_url(settings.REDIS_URL)
-        redis_client.hdel("dramatiq:default.DQ.msgs", self.task_id)
+        get_redis_client().hdel(delayed_messages_key(), self.task_id)
 
     def save(self, *args, **kwargs):
         """Handle SMS on create or time change."""
@@ -62,6 +69,9 @@ class Appointment(TimeStampedModel):
         if not is_new:
             old = Appointment.objects.get(pk=self.pk)
             time_changed = old.appointment_time != self.appointment_time
+            if old.customer_id != self.customer_id:
+                # Both customers' visit statistics need refreshing
+                self._previous_customer_id = old.customer_id
 
         # Cancel old reminder
         if self.task_id:
@@ -82,18 +92,3 @@ class Appointment(TimeStampedModel):
         if task_id:
             self.task_id = task_id
             Appointment.objects.filter(id=self.id).update(task_id=self.task_id)
-
-    def delete(self, *args, **kwargs):
-        """Cancel reminder and send cancellation SMS."""
-        if self.task_id:
-            self.cancel_task()
-
-        from .tasks import send_sms_reminder
-
-        time_date = arrow.get(self.appointment_time).format("YYYY-MM-DD h:mm A")
-        send_sms_reminder.send(
-            self.pk,
-            {"time_date": time_date, "phone_number": str(self.customer.phone_number)},
-        )
-
-        super().delete(*args, **kwargs)
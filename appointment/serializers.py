@@ -1,13 +1,77 @@
+from typing import ClassVar
+
 import arrow
 from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
 
 from appointment.models import Appointment
+from booking_api.serializers import SparseFieldsMixin
+from booking_api.tenancy import get_user_salon_ids
+from customer.models import Customer
+from user.models import ExtendedUser
 
 
-class AppointmentSerializer(serializers.ModelSerializer):
+class AppointmentSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Appointment
         fields = "__all__"
+        expandable_fields: ClassVar[dict[str, str]] = {
+            "customer": "customer.serializers.CustomerSerializer",
+            "salon": "salon.serializers.SalonSerializer",
+            "user": "user.serializers.UserSerializer",
+        }
+
+    def get_fields(self):
+        fields = super().get_fields()
+
+        request = self.context.get("request")
+        if (
+            request is None
+            or request.method in SAFE_METHODS
+            or request.user.is_superuser
+        ):
+            return fields
+
+        # Writes may only reference customers and staff of the caller's salons;
+        # the salon itself is checked by SalonScopedMixin
+        salon_ids = get_user_salon_ids(request.user)
+        fields["customer"].queryset = Customer.objects.filter(
+            pk__in=Customer.salons.through.objects.filter(
+                salon_id__in=salon_ids
+            ).values("customer_id")
+        )
+        fields["user"].queryset = ExtendedUser.objects.filter(
+            pk__in=ExtendedUser.salons.through.objects.filter(
+                salon_id__in=salon_ids
+            ).values("extendeduser_id")
+        )
+        return fields
+
+    def validate(self, attrs):
+        attrs = super().validate(attrs)
+        if not attrs.keys() & {"salon", "customer", "user"}:
+            return attrs
+
+        salon = attrs.get("salon", getattr(self.instance, "salon", None))
+        request = self.context.get("request")
+        if (
+            request is not None
+            and not request.user.is_superuser
+            and salon.pk not in get_user_salon_ids(request.user)
+        ):
+            # Refused with a 403 by SalonScopedMixin
+            return attrs
+
+        customer = attrs.get("customer", getattr(self.instance, "customer", None))
+        user = attrs.get("user", getattr(self.instance, "user", None))
+        errors = {}
+        if not customer.salons.filter(pk=salon.pk).exists():
+            errors["customer"] = ["The customer is not a customer of this salon."]
+        if not user.salons.filter(pk=salon.pk).exists():
+            errors["user"] = ["The staff member does not work at this salon."]
+        if errors:
+            raise serializers.ValidationError(errors)
+        return attrs
 
     def validate_appointment_time(self, appointment_time):
         if appointment_time < arrow.utcnow():
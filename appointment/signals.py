@@ -0,0 +1,195 @@
+import abc
+import threading
+import weakref
+from contextlib import contextmanager
+
+import arrow
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from booking_api.cache import get_redis_client
+from customer.helpers import refresh_customer_stats
+from customer.models import Customer
+
+from .helpers import delayed_messages_key
+from .models import Appointment
+
+_local = threading.local()
+
+
+class TransactionBatch(abc.ABC):
+    """
+    Work collected while a transaction runs and flushed once it commits.
+
+    Deleting a salon, customer or user cascades to its appointments, so one
+    request can touch hundreds of them. Batches turn per-appointment side
+    effects into one broker write or query per transaction.
+    """
+
+    def __init__(self, using):
+        self.using = using
+        self.flushed = False
+
+    @classmethod
+    @contextmanager
+    def collect(cls, using):
+        """Yield the batch of the current transaction, creating it if needed."""
+        connection = transaction.get_connection(using)
+        if not connection.in_atomic_block:
+            # Autocommit: the change is already committed, flush right away
+            batch = cls(using)
+            yield batch
+            batch.flush()
+            return
+
+        batch = cls.pending(using)
+        if batch is None:
+            batch = cls(using)
+            # Only the on_commit callbacks below keep the batch alive
+            setattr(_local, cls.__name__, weakref.ref(batch))
+
+        # Registered with every change, so the batch is flushed if any of
+        # them commits. Django drops the callbacks of a rolled back
+        # transaction or savepoint; a batch left without any is freed, and
+        # the next change starts a new one.
+        transaction.on_commit(batch.run, using=using, robust=True)
+
+        yield batch
+
+    @classmethod
+    def pending(cls, using):
+        """The batch waiting for a commit on ``using`` in this thread, if any."""
+        ref = getattr(_local, cls.__name__, None)
+        batch = ref() if ref is not None else None
+        if batch is None or batch.using != using or batch.flushed:
+            return None
+        return batch
+
+    def run(self):
+        # Called once per collected change
+        if self.flushed:
+            return
+        self.flushed = True
+        self.flush()
+
+    @abc.abstractmethod
+    def flush(self):
+        """
+        Apply the collected work.
+
+        Changes made in a savepoint that was rolled back are collected too,
+        so the work must only rely on what the database holds now.
+        """
+
+
+class CancellationBatch(TransactionBatch):
+    """
+    Upcoming appointments deleted inside one transaction.
+
+    Flushed as one HDEL for the scheduled reminders and one cancellation
+    message for all customers.
+    """
+
+    def __init__(self, using):
+        super().__init__(using)
+        # Customer, time and task of the deleted appointments, by id
+        self.appointments = {}
+        # Phone numbers of customers deleted in the same transaction, which
+        # can no longer be looked up once the batch is flushed.
+        self.phone_numbers = {}
+
+    def flush(self):
+        if not self.appointments:
+            return
+
+        # Rows whose delete was rolled back with a savepoint
+        kept = set(
+            Appointment.objects.using(self.using)
+            .filter(pk__in=self.appointments)
+            .values_list("pk", flat=True)
+        )
+        appointments = [
+            appointment
+            for pk, appointment in self.appointments.items()
+            if pk not in kept
+        ]
+        if not appointments:
+            return
+
+        task_ids = [task_id for _, _, task_id in appointments if task_id]
+        if task_ids:
+            get_redis_client().hdel(delayed_messages_key(), *task_ids)
+
+        unknown = {
+            customer_id
+            for customer_id, _, _ in appointments
+            if customer_id not in self.phone_numbers
+        }
+        if unknown:
+            self.phone_numbers.update(
+                Customer.objects.filter(pk__in=unknown).values_list(
+                    "pk", "phone_number"
+                )
+            )
+
+        notices = [
+            {
+                "time_date": arrow.get(appointment_time).format("YYYY-MM-DD h:mm A"),
+                "phone_number": str(self.phone_numbers[customer_id]),
+            }
+            for customer_id, appointment_time, _ in appointments
+            if self.phone_numbers.get(customer_id)
+        ]
+        if notices:
+            from .tasks import send_sms_cancellations
+
+            send_sms_cancellations.send(notices)
+
+
+class CustomerStatsBatch(TransactionBatch):
+    """Customers whose visit statistics changed inside one transaction."""
+
+    def __init__(self, using):
+        super().__init__(using)
+        self.customer_ids = set()
+
+    def flush(self):
+        refresh_customer_stats(self.customer_ids)
+
+
+@receiver(pre_delete, sender=Appointment)
+def cancel_appointment(sender, instance, using, **kwargs):
+    """Queue reminder removal and cancellation SMS for upcoming appointments."""
+    if instance.appointment_time <= timezone.now():
+        return
+
+    with CancellationBatch.collect(using) as batch:
+        batch.appointments[instance.pk] = (
+            instance.customer_id,
+            instance.appointment_time,
+            instance.task_id,
+        )
+        if Appointment.customer.is_cached(instance):
+            customer = instance.customer
+            batch.phone_numbers[customer.pk] = customer.phone_number
+
+
+@receiver(pre_delete, sender=Customer)
+def remember_customer_phone(sender, instance, using, **kwargs):
+    with CancellationBatch.collect(using) as batch:
+        batch.phone_numbers[instance.pk] = instance.phone_number
+
+
+@receiver(post_save, sender=Appointment)
+@receiver(post_delete, sender=Appointment)
+def update_customer_stats(sender, instance, using, **kwargs):
+    """Refresh visit statistics of the customers an appointment belongs to."""
+    with CustomerStatsBatch.collect(using) as batch:
+        batch.customer_ids.add(instance.customer_id)
+
+        # Set by Appointment.save() for this save only
+        previous_customer_id = instance.__dict__.pop("_previous_customer_id", None)
+        if previous_customer_id:
+            batch.customer_ids.add(previous_customer_id)
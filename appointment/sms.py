@@ -0,0 +1,48 @@
+"""
+The Twilio client the SMS actors send through.
+
+Importing Twilio pulls in ``requests`` and its HTTP stack, so this module is
+only imported when a worker sends its first message; web processes, which
+only enqueue messages, never load it.
+"""
+
+import functools
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from twilio.http.http_client import TwilioHttpClient
+from twilio.rest import Client
+
+
+class RedirectedTwilioHttpClient(TwilioHttpClient):
+    """Sends every Twilio API call to ``base_url`` instead of api.twilio.com."""
+
+    def __init__(self, base_url, **kwargs):
+        super().__init__(**kwargs)
+        self.base_url = base_url.rstrip("/")
+
+    def request(self, method, url, *args, **kwargs):
+        parts = urlsplit(url)
+        return super().request(method, self.base_url + parts.path, *args, **kwargs)
+
+
+def get_twilio_http_client():
+    """
+    HTTP client for the Twilio client, or None for Twilio's default.
+
+    ``TWILIO_API_URL`` points SMS at a stand-in such as
+    ``scripts/fake_twilio.py`` for load tests.
+    """
+    if not settings.TWILIO_API_URL:
+        return None
+    return RedirectedTwilioHttpClient(settings.TWILIO_API_URL)
+
+
+@functools.cache
+def get_twilio_client():
+    """Twilio client of the process, created on first use."""
+    return Client(
+        settings.TWILIO_ACCOUNT_SID,
+        settings.TWILIO_AUTH_TOKEN,
+        http_client=get_twilio_http_client(),
+    )
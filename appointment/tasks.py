@@ -3,10 +3,41 @@ import logging
 import arrow
 import dramatiq
 from django.conf import settings
-from twilio.rest import Client
+from twilio.base.exceptions import TwilioRestException
+
+from booking_api.replicas import (
+    get_or_primary,
+    message_reads_from_replica,
+    replica_reads,
+)
+from salon.helpers import get_salon_settings
 
 logger = logging.getLogger(__name__)
-client = Client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
+
+
+def send_sms(to, body):
+    """Send ``body`` to the phone number ``to`` from ``TWILIO_PHONE_NUMBER``."""
+    # Imported on first use: web processes enqueue messages but never send
+    from .sms import get_twilio_client
+
+    get_twilio_client().messages.create(
+        body=body, to=to, from_=settings.TWILIO_PHONE_NUMBER
+    )
+
+
+def get_appointment(booking_id):
+    """
+    The appointment a message is about, with its customer.
+
+    Read from the replica once the message is old enough for the replica to
+    have caught up with the write that enqueued it.
+    """
+    from appointment.models import Appointment
+
+    with replica_reads(message_reads_from_replica()):
+        return get_or_primary(
+            Appointment.objects.select_related("customer"), pk=booking_id
+        )
 
 
 @dramatiq.actor
@@ -15,27 +46,22 @@ def send_sms_confirmation(booking_id):
     from appointment.models import Appointment
 
     try:
-        appointment = Appointment.objects.select_related("customer", "salon").get(
-            pk=booking_id
-        )
+        appointment = get_appointment(booking_id)
     except Appointment.DoesNotExist:
         logger.warning(f"Appointment {booking_id} not found")
         return
 
     appointment_time = arrow.get(appointment.appointment_time)
     customer = appointment.customer.full_name or "Customer"
+    salon = get_salon_settings(appointment.salon_id)
 
     body = (
-        f"Hi {customer}, Your appointment at {appointment.salon.name} "
+        f"Hi {customer}, Your appointment at {salon.name} "
         f"has been confirmed for {appointment_time.format('YYYY-MM-DD')} "
         f"at {appointment_time.format('h:mm A')}. See you soon!"
     )
 
-    client.messages.create(
-        body=body,
-        to=str(appointment.customer.phone_number),
-        from_=settings.TWILIO_PHONE_NUMBER,
-    )
+    send_sms(str(appointment.customer.phone_number), body)
     logger.info(f"Confirmation SMS sent for appointment {booking_id}")
 
 
@@ -44,38 +70,46 @@ def send_sms_reminder(booking_id, cancelled_info=None):
     """SMS #2: Send reminder X minutes before appointment."""
     from appointment.models import Appointment
 
+    # Kept for cancellation notices enqueued before send_sms_cancellations
     if cancelled_info:
         body = (
             f"Hi, We regret to inform you that your scheduled appointment "
             f"for {cancelled_info.get('time_date', 'N/A')} has been cancelled."
         )
-        client.messages.create(
-            body=body,
-            to=cancelled_info["phone_number"],
-            from_=settings.TWILIO_PHONE_NUMBER,
-        )
+        send_sms(cancelled_info["phone_number"], body)
         return
 
     try:
-        appointment = Appointment.objects.select_related("customer", "salon").get(
-            pk=booking_id
-        )
+        appointment = get_appointment(booking_id)
     except Appointment.DoesNotExist:
         logger.warning(f"Appointment {booking_id} not found")
         return
 
     appointment_time = arrow.get(appointment.appointment_time)
     customer = appointment.customer.full_name or "Customer"
+    salon = get_salon_settings(appointment.salon_id)
 
     body = (
         f"Hi {customer}, You have an appointment coming up "
         f"at {appointment_time.format('h:mm A')}. "
-        f"Regards {appointment.salon.name}."
+        f"Regards {salon.name}."
     )
 
-    client.messages.create(
-        body=body,
-        to=str(appointment.customer.phone_number),
-        from_=settings.TWILIO_PHONE_NUMBER,
-    )
+    send_sms(str(appointment.customer.phone_number), body)
     logger.info(f"Reminder SMS sent for appointment {booking_id}")
+
+
+@dramatiq.actor
+def send_sms_cancellations(notices):
+    """Send cancellation SMS for a batch of deleted appointments."""
+    for notice in notices:
+        body = (
+            f"Hi, We regret to inform you that your scheduled appointment "
+            f"for {notice['time_date']} has been cancelled."
+        )
+        try:
+            send_sms(notice["phone_number"], body)
+        except TwilioRestException as e:
+            # Retrying the whole batch would resend notices that already went out
+            logger.warning(f"Cancellation SMS to {notice['phone_number']} failed: {e}")
+    logger.info(f"Cancellation SMS sent for {len(notices)} appointments")
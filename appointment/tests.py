@@ -1 +1,526 @@
-# Create your tests here.
+import io
+import uuid
+from datetime import timedelta
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from booking_api.cache import get_redis_client
+from booking_api.management.commands.reconcile_reminders import (
+    Command as ReconcileCommand,
+)
+from booking_api.testing import PerformanceTestCase, add_customers, create_salon
+from customer.helpers import refresh_customer_stats
+from customer.models import CustomerStats
+
+from .helpers import delayed_messages_key
+from .models import Appointment
+from .signals import CancellationBatch, TransactionBatch
+from .tasks import send_sms_reminder
+
+
+class AppointmentEndpointTests(PerformanceTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.salon = create_salon()
+        cls.user = cls.salon.users.first()
+        cls.customers = add_customers(cls.salon, 5)
+        cls.appointment = Appointment.objects.filter(salon=cls.salon).first()
+
+        # Rows of another salon must never show up or be reachable
+        cls.other_salon = create_salon(name="Other Salon")
+        cls.other_customers = add_customers(cls.other_salon, 5)
+        cls.other_user = cls.other_salon.users.first()
+
+    def setUp(self):
+        super().setUp()
+        self.authenticate(self.user)
+
+    def grow(self):
+        add_customers(self.salon, 20)
+
+    def test_list(self):
+        self.assert_performance(
+            "appointments.list",
+            lambda: self.client.get("/appointments/"),
+            max_queries=2,
+            grow=self.grow,
+        )
+
+    def test_list_day_expanded(self):
+        today = timezone.localdate().isoformat()
+        self.assert_performance(
+            "appointments.list_day_expanded",
+            lambda: self.client.get(
+                f"/appointments/?date={today}&expand=customer,salon,user"
+            ),
+            max_queries=7,
+            grow=self.grow,
+        )
+
+    def test_list_not_modified(self):
+        url = f"/appointments/?date={timezone.localdate().isoformat()}&expand=customer"
+        etag = self.client.get(url)["ETag"]
+        self.assert_performance(
+            "appointments.list_not_modified",
+            lambda: self.client.get(url, HTTP_IF_NONE_MATCH=etag),
+            max_queries=1,
+            status=304,
+        )
+
+    def test_list_etag_changes_with_rows(self):
+        etag = self.client.get("/appointments/")["ETag"]
+        customer = self.customers[0]
+        customer.full_name = "Renamed Customer"
+        customer.save()
+        # Only rendered relations count
+        response = self.client.get("/appointments/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        expanded = "/appointments/?expand=customer"
+        etag = self.client.get(expanded)["ETag"]
+        customer.full_name = "Renamed Again"
+        customer.save()
+        response = self.client.get(expanded, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+        etag = response["ETag"]
+        Appointment.objects.filter(salon=self.salon).last().delete()
+        response = self.client.get(expanded, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_list_day_async(self):
+        today = timezone.localdate().isoformat()
+        self.assert_performance(
+            "appointments.list_day_async",
+            lambda: self.client.get(
+                f"/appointments/async/?date={today}&expand=customer,salon,user"
+            ),
+            max_queries=7,
+            grow=self.grow,
+        )
+
+    def test_async_list_matches_sync_list(self):
+        query = f"?date={timezone.localdate().isoformat()}&expand=customer"
+        response = self.client.get(f"/appointments/async/{query}")
+        self.assertEqual(
+            response.json(), self.client.get(f"/appointments/{query}").json()
+        )
+
+    def test_async_list_requires_authentication(self):
+        self.client.credentials()
+        response = self.client.get("/appointments/async/")
+        self.assertEqual(response.status_code, 401)
+
+    def test_list_is_scoped_to_salon(self):
+        response = self.client.get("/appointments/")
+        self.assertEqual(
+            {appointment["salon"] for appointment in response.data}, {self.salon.pk}
+        )
+        response = self.client.get(f"/appointments/?salon={self.other_salon.pk}")
+        self.assertEqual(response.status_code, 403)
+
+    def test_detail(self):
+        self.assert_performance(
+            "appointments.detail",
+            lambda: self.client.get(f"/appointments/{self.appointment.pk}/"),
+            max_queries=2,
+        )
+
+    def test_detail_not_modified(self):
+        url = f"/appointments/{self.appointment.pk}/"
+        response = self.client.get(url)
+        self.assertEqual(
+            self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"]).status_code,
+            304,
+        )
+        self.assertEqual(
+            self.client.get(
+                url, HTTP_IF_MODIFIED_SINCE=response["Last-Modified"]
+            ).status_code,
+            304,
+        )
+
+        self.client.patch(url, {"comment": "Running late"}, format="json")
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["comment"], "Running late")
+
+    def test_create(self):
+        customer = self.customers[0]
+        appointment_time = timezone.now() + timedelta(days=3)
+        self.assert_performance(
+            "appointments.create",
+            lambda: self.client.post(
+                "/appointments/",
+                {
+                    "salon": self.salon.pk,
+                    "user": self.user.pk,
+                    "customer": customer.pk,
+                    "appointment_time": appointment_time.isoformat(),
+                },
+                format="json",
+            ),
+            max_queries=21,
+            status=201,
+        )
+
+    def test_create_in_other_salon_is_forbidden(self):
+        response = self.client.post(
+            "/appointments/",
+            {
+                "salon": self.other_salon.pk,
+                "user": self.user.pk,
+                "customer": self.customers[0].pk,
+                "appointment_time": (timezone.now() + timedelta(days=1)).isoformat(),
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, 403)
+
+    def test_create_with_other_salon_rows_is_rejected(self):
+        appointment_time = (timezone.now() + timedelta(days=1)).isoformat()
+        for field, value in (
+            ("customer", self.other_customers[0].pk),
+            ("user", self.other_user.pk),
+        ):
+            with self.subTest(field=field):
+                data = {
+                    "salon": self.salon.pk,
+                    "user": self.user.pk,
+                    "customer": self.customers[0].pk,
+                    "appointment_time": appointment_time,
+                    field: value,
+                }
+                response = self.client.post("/appointments/", data, format="json")
+                self.assertEqual(response.status_code, 400)
+                self.assertIn(field, response.data)
+        self.assertFalse(
+            Appointment.objects.filter(
+                salon=self.salon, customer=self.other_customers[0]
+            ).exists()
+        )
+
+    def test_update_to_other_salon_customer_is_rejected(self):
+        response = self.client.patch(
+            f"/appointments/{self.appointment.pk}/",
+            {"customer": self.other_customers[0].pk},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 400)
+        self.appointment.refresh_from_db()
+        self.assertEqual(self.appointment.salon, self.salon)
+        self.assertNotEqual(self.appointment.customer, self.other_customers[0])
+
+    def test_update(self):
+        self.assert_performance(
+            "appointments.update",
+            lambda: self.client.patch(
+                f"/appointments/{self.appointment.pk}/",
+                {"comment": "Running late"},
+                format="json",
+            ),
+            max_queries=6,
+        )
+
+    def test_only_writes_run_in_a_transaction(self):
+        url = f"/appointments/{self.appointment.pk}/"
+        # Test cases already run in a transaction, so the view's is a savepoint
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        self.assertFalse(any("SAVEPOINT" in q["sql"] for q in queries))
+        with CaptureQueriesContext(connection) as queries:
+            self.client.patch(url, {"comment": "Running late"}, format="json")
+        self.assertTrue(any("SAVEPOINT" in q["sql"] for q in queries))
+
+    def test_delete(self):
+        appointments = list(
+            Appointment.objects.filter(
+                salon=self.salon, appointment_time__gt=timezone.now()
+            )
+        )
+        self.assert_performance(
+            "appointments.delete",
+            lambda: self.client.delete(f"/appointments/{appointments.pop().pk}/"),
+            max_queries=4,
+            status=204,
+        )
+
+
+class ReconcileRemindersTests(PerformanceTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.salon = create_salon()
+        add_customers(cls.salon, 2)
+        # Saved long enough ago to be outside the grace window
+        Appointment.objects.update(modified=timezone.now() - timedelta(hours=1))
+        cls.upcoming = list(
+            Appointment.objects.filter(
+                appointment_time__gt=timezone.now() + timedelta(hours=2)
+            ).order_by("pk")
+        )
+
+    def setUp(self):
+        super().setUp()
+        self.redis = get_redis_client()
+        self.key = delayed_messages_key()
+        self.redis.delete(self.key)
+        self.addCleanup(self.redis.delete, self.key)
+
+    def reconcile(self):
+        call_command("reconcile_reminders", stdout=io.StringIO())
+
+    def add_message(self, booking_id, age):
+        """A reminder for ``booking_id`` enqueued ``age`` ago."""
+        message = send_sms_reminder.message_with_options(args=(booking_id,)).copy(
+            message_timestamp=int((timezone.now() - age).timestamp() * 1000)
+        )
+        message_id = str(uuid.uuid4())
+        self.redis.hset(self.key, message_id, message.encode())
+        return message_id
+
+    def test_key_follows_broker_namespace(self):
+        self.assertEqual(self.key, "dramatiq-test:default.DQ.msgs")
+
+    def test_missing_reminders_are_rescheduled(self):
+        self.reconcile()
+
+        for appointment in self.upcoming:
+            appointment.refresh_from_db()
+            self.assertTrue(self.redis.hexists(self.key, appointment.task_id))
+        self.assertEqual(self.redis.hlen(self.key), len(self.upcoming))
+
+    def test_recently_saved_appointments_are_skipped(self):
+        recent = self.upcoming[0]
+        Appointment.objects.filter(pk=recent.pk).update(modified=timezone.now())
+
+        self.reconcile()
+
+        recent.refresh_from_db()
+        self.assertEqual(recent.task_id, "")
+        self.assertEqual(self.redis.hlen(self.key), len(self.upcoming) - 1)
+
+    def test_orphans_outside_the_grace_window_are_removed(self):
+        booking_id = self.upcoming[0].pk
+        old = self.add_message(booking_id, age=timedelta(hours=1))
+        # Enqueued by a save that has not stored its id yet
+        young = self.add_message(booking_id, age=timedelta(seconds=5))
+
+        self.reconcile()
+
+        self.assertFalse(self.redis.hexists(self.key, old))
+        self.assertTrue(self.redis.hexists(self.key, young))
+
+    def test_reminders_of_appointments_saved_meanwhile_are_dropped(self):
+        appointment = self.upcoming[0]
+        Appointment.objects.filter(pk=appointment.pk).update(task_id="saved")
+
+        rescheduled, raced = ReconcileCommand().reschedule(
+            self.redis,
+            self.key,
+            # Read before the save above
+            {appointment.pk: (timezone.now() - timedelta(days=1), 60_000)},
+        )
+
+        self.assertEqual((rescheduled, raced), (0, 1))
+        appointment.refresh_from_db()
+        self.assertEqual(appointment.task_id, "saved")
+        self.assertEqual(self.redis.hlen(self.key), 0)
+
+
+class CustomerStatsTests(PerformanceTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.salon = create_salon()
+        cls.user = cls.salon.users.first()
+        cls.first, cls.second = add_customers(cls.salon, 2)
+
+    def stats(self, customer):
+        return CustomerStats.objects.get(customer=customer)
+
+    def book(self, customer, days=2):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Appointment.objects.create(
+                salon=self.salon,
+                user=self.user,
+                customer=customer,
+                appointment_time=timezone.now() + timedelta(days=days),
+            )
+
+    def test_create_and_delete_refresh_stats(self):
+        upcoming = self.stats(self.first).upcoming_count
+
+        appointment = self.book(self.first)
+        self.assertEqual(self.stats(self.first).upcoming_count, upcoming + 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            appointment.delete()
+        self.assertEqual(self.stats(self.first).upcoming_count, upcoming)
+
+    def test_moving_an_appointment_refreshes_both_customers(self):
+        appointment = self.book(self.first)
+        first, second = self.stats(self.first), self.stats(self.second)
+
+        appointment.customer = self.second
+        with self.captureOnCommitCallbacks(execute=True):
+            appointment.save()
+
+        self.assertEqual(
+            self.stats(self.first).upcoming_count, first.upcoming_count - 1
+        )
+        self.assertEqual(
+            self.stats(self.second).upcoming_count, second.upcoming_count + 1
+        )
+
+    def test_previous_customer_is_refreshed_once(self):
+        appointment = self.book(self.first)
+        appointment.customer = self.second
+        with self.captureOnCommitCallbacks(execute=True):
+            appointment.save()
+
+        appointment.comment = "Running late"
+        with (
+            mock.patch("appointment.signals.refresh_customer_stats") as refresh,
+            self.captureOnCommitCallbacks(execute=True),
+        ):
+            appointment.save()
+        refresh.assert_called_once_with({self.second.pk})
+
+    def test_one_refresh_per_transaction(self):
+        with (
+            mock.patch("appointment.signals.refresh_customer_stats") as refresh,
+            self.captureOnCommitCallbacks(execute=True),
+            transaction.atomic(),
+        ):
+            for customer in (self.first, self.second, self.first):
+                Appointment.objects.create(
+                    salon=self.salon,
+                    user=self.user,
+                    customer=customer,
+                    appointment_time=timezone.now() + timedelta(days=2),
+                )
+        refresh.assert_called_once_with({self.first.pk, self.second.pk})
+
+    def test_refresh_locks_the_customers(self):
+        with CaptureQueriesContext(connection) as queries:
+            refresh_customer_stats([self.first.pk])
+        self.assertTrue(
+            any("FOR UPDATE" in query["sql"] for query in queries.captured_queries)
+        )
+
+    def test_refresh_skips_deleted_customers(self):
+        self.assertEqual(
+            [stats.customer_id for stats in refresh_customer_stats([self.first.pk, 0])],
+            [self.first.pk],
+        )
+
+    def test_batches_must_implement_flush(self):
+        with self.assertRaises(TypeError):
+            TransactionBatch("default")
+
+
+class CancellationBatchTests(PerformanceTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.salon = create_salon()
+        cls.customers = add_customers(cls.salon, 3)
+        for appointment in Appointment.objects.filter(salon=cls.salon):
+            appointment.task_id = f"task-{appointment.pk}"
+            appointment.save(update_fields=["task_id"])
+
+    def setUp(self):
+        super().setUp()
+        self.hdel = self.patch("appointment.signals.get_redis_client").return_value.hdel
+        self.send = self.patch("appointment.tasks.send_sms_cancellations.send")
+
+    def patch(self, target):
+        patcher = mock.patch(target)
+        self.addCleanup(patcher.stop)
+        return patcher.start()
+
+    def upcoming(self, customer):
+        return list(
+            customer.appointment_set.filter(appointment_time__gt=timezone.now())
+        )
+
+    def assert_cancelled(self, appointments):
+        """One HDEL and one message for exactly ``appointments``."""
+        self.hdel.assert_called_once()
+        self.assertCountEqual(
+            self.hdel.call_args.args[1:],
+            [appointment.task_id for appointment in appointments],
+        )
+        self.send.assert_called_once()
+        notices = self.send.call_args.args[0]
+        self.assertEqual(len(notices), len(appointments))
+        self.assertEqual(
+            {notice["phone_number"] for notice in notices},
+            {str(appointment.customer.phone_number) for appointment in appointments},
+        )
+
+    def test_one_flush_per_transaction(self):
+        appointments = [
+            appointment
+            for customer in self.customers
+            for appointment in self.upcoming(customer)
+        ]
+        with self.captureOnCommitCallbacks(execute=True), transaction.atomic():
+            for appointment in appointments:
+                Appointment.objects.get(pk=appointment.pk).delete()
+
+        self.assert_cancelled(appointments)
+
+    def test_customer_delete_cascades(self):
+        customer = self.customers[0]
+        appointments = self.upcoming(customer)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            customer.delete()
+
+        # The customer's row is gone by then, its number was kept
+        self.assert_cancelled(appointments)
+
+    def test_past_appointments_are_skipped(self):
+        past = self.customers[0].appointment_set.filter(
+            appointment_time__lt=timezone.now()
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            past.delete()
+
+        self.hdel.assert_not_called()
+        self.send.assert_not_called()
+
+    def test_deletes_rolled_back_with_a_savepoint_are_dropped(self):
+        kept, first, second = (
+            self.upcoming(customer)[-1] for customer in self.customers
+        )
+        # Cleared by delete()
+        kept_pk = kept.pk
+
+        with self.captureOnCommitCallbacks(execute=True), transaction.atomic():
+            first.delete()
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                kept.delete()
+                raise RuntimeError
+            second.delete()
+
+        self.assertTrue(Appointment.objects.filter(pk=kept_pk).exists())
+        self.assert_cancelled([first, second])
+
+    def test_batch_of_a_rolled_back_transaction_is_not_reused(self):
+        rolled_back, deleted = (
+            self.upcoming(customer)[-1] for customer in self.customers[:2]
+        )
+
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            rolled_back.delete()
+            raise RuntimeError
+
+        self.assertIsNone(CancellationBatch.pending("default"))
+        with self.captureOnCommitCallbacks(execute=True):
+            deleted.delete()
+        self.assert_cancelled([deleted])
@@ -3,6 +3,7 @@ from django.urls import path
 from appointment.views import (
     AppointmentDetailUpdateDeleteView,
     AppointmentListCreateAPIView,
+    AsyncAppointmentListView,
 )
 
 app_name = "appointment"
@@ -15,4 +16,5 @@ urlpatterns = [
         AppointmentDetailUpdateDeleteView.as_view(),
         name="appointment_detail_update_delete",
     ),
+    path("async/", AsyncAppointmentListView.as_view(), name="appointments_async"),
 ]
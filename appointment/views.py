@@ -1,12 +1,38 @@
-from datetime import datetime
+from datetime import datetime, timedelta
 
+from django.utils import timezone
 from rest_framework.generics import ListCreateAPIView, RetrieveUpdateDestroyAPIView
 
 from appointment.serializers import Appointment, AppointmentSerializer
+from booking_api.asyncviews import AsyncReadView
+from booking_api.conditional import ConditionalGetMixin
+from booking_api.database import NonAtomicReadsMixin
+from booking_api.prefetch import AutoPrefetchMixin
+from booking_api.tenancy import SalonScopedMixin
+
+
+def filter_day(queryset, date):
+    """
+    Appointments on ``date`` (YYYY-MM-DD).
+
+    A range on the raw column lets the (salon, appointment_time) index serve
+    the query, unlike a __date lookup.
+    """
+    provided_date = datetime.strptime(date, "%Y-%m-%d")
+    return queryset.filter(
+        appointment_time__gte=timezone.make_aware(provided_date),
+        appointment_time__lt=timezone.make_aware(provided_date + timedelta(days=1)),
+    )
 
 
 # Create your views here.
-class AppointmentListCreateAPIView(ListCreateAPIView):
+class AppointmentListCreateAPIView(
+    NonAtomicReadsMixin,
+    ConditionalGetMixin,
+    SalonScopedMixin,
+    AutoPrefetchMixin,
+    ListCreateAPIView,
+):
     queryset = Appointment.objects.all()
     serializer_class = AppointmentSerializer
 
@@ -16,12 +42,31 @@ class AppointmentListCreateAPIView(ListCreateAPIView):
         # Access query parameters using self.request.GET
         date = self.request.GET.get("date")  # Example: ?date=2023-06-14
         if date:
-            provided_date = datetime.strptime(date, "%Y-%m-%d")
-            queryset = queryset.filter(appointment_time__date=provided_date)
+            queryset = filter_day(queryset, date)
 
         return queryset
 
 
-class AppointmentDetailUpdateDeleteView(RetrieveUpdateDestroyAPIView):
+class AppointmentDetailUpdateDeleteView(
+    NonAtomicReadsMixin,
+    ConditionalGetMixin,
+    SalonScopedMixin,
+    AutoPrefetchMixin,
+    RetrieveUpdateDestroyAPIView,
+):
+    queryset = Appointment.objects.all()
+    serializer_class = AppointmentSerializer
+
+
+class AsyncAppointmentListView(AsyncReadView):
+    """Async ``GET /appointments/``, usually polled for one ``?date=``."""
+
     queryset = Appointment.objects.all()
     serializer_class = AppointmentSerializer
+
+    async def get(self, request):
+        queryset = self.get_queryset()
+        date = request.GET.get("date")
+        if date:
+            queryset = filter_day(queryset, date)
+        return await self.list_response(queryset)
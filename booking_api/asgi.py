@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'booking_api.settings')
+# Selects how database connections are held (see booking_api.database)
+os.environ.setdefault('PROCESS_TYPE', 'asgi')
 
 application = get_asgi_application()
@@ -0,0 +1,126 @@
+"""
+Async read endpoints for ASGI deployments (``booking_api.asgi``).
+
+Under WSGI every request holds a worker thread while it waits on Redis and
+PostgreSQL. These views await the cache and the ORM instead, so an ASGI
+server keeps serving other clients meanwhile. They return the same JSON as
+their sync counterparts, scoped by ``SalonScopedMixin`` and shaped by the
+same serializers, sparse fieldsets included.
+"""
+
+from django.db import transaction
+from django.http import Http404
+from django.views import View
+from rest_framework.exceptions import (
+    AuthenticationFailed,
+    MethodNotAllowed,
+    NotAuthenticated,
+)
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.views import exception_handler
+
+from user.authentication import CachedJWTCookieAuthentication
+
+from .conditional import Validators, validator_aggregates
+from .prefetch import optimize_queryset
+from .renderers import FastJSONRenderer
+from .replicas import reads_from_replica, replica_reads
+from .tenancy import SalonScopedMixin
+
+
+class AsyncReadView(SalonScopedMixin, View):
+    """
+    Base of async, authenticated, salon-scoped GET endpoints.
+
+    Subclasses implement ``async def get()`` returning a DRF ``Response``.
+    Serializers run on rows fetched with the async ORM; a relation the query
+    plan missed raises ``SynchronousOnlyOperation`` rather than blocking.
+    """
+
+    queryset = None
+    serializer_class = None
+    authenticator = CachedJWTCookieAuthentication()
+    renderer = FastJSONRenderer()
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        # Django refuses to wrap async views in ATOMIC_REQUESTS transactions
+        return transaction.non_atomic_requests(super().as_view(**initkwargs))
+
+    async def dispatch(self, request, *args, **kwargs):
+        # Gives serializers and SalonScopedMixin the query_params they expect
+        self.request = Request(request)
+        try:
+            if request.method != "GET":
+                raise MethodNotAllowed(request.method)
+            with replica_reads(reads_from_replica(request)):
+                self.request.user = await self.authenticate(request)
+                response = await self.get(self.request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+        return self.finalize(response)
+
+    async def authenticate(self, request):
+        result = await self.authenticator.aauthenticate(request)
+        if result is None:
+            raise NotAuthenticated()
+        return result[0]
+
+    def handle_exception(self, exc):
+        """Error responses as DRF renders them for the sync views."""
+        if isinstance(exc, NotAuthenticated | AuthenticationFailed):
+            exc.auth_header = self.authenticator.authenticate_header(self.request)
+        response = exception_handler(exc, {"view": self, "request": self.request})
+        if response is None:
+            raise exc
+        return response
+
+    def finalize(self, response):
+        if not isinstance(response, Response):
+            # 304 Not Modified
+            return response
+        response.accepted_renderer = self.renderer
+        response.accepted_media_type = self.renderer.media_type
+        response.renderer_context = {
+            "view": self,
+            "request": self.request,
+            "response": response,
+        }
+        return response.render()
+
+    def get_serializer(self, *args, **kwargs):
+        context = {"request": self.request, "view": self}
+        return self.serializer_class(*args, context=context, **kwargs)
+
+    def get_queryset(self):
+        queryset = self.queryset.all()
+        salon_ids = self.get_salon_ids()
+        if salon_ids is not None:
+            queryset = queryset.filter(self.salon_filter(salon_ids))
+        return optimize_queryset(queryset, self.get_serializer())
+
+    async def get_validators(self, queryset):
+        values = await queryset.aaggregate(**validator_aggregates(queryset))
+        return Validators(self.request, values)
+
+    async def list_response(self, queryset):
+        validators = await self.get_validators(queryset)
+        response = validators.not_modified(self.request, detail=False)
+        if response is not None:
+            return response
+        rows = [row async for row in queryset]
+        return validators.add_headers(
+            Response(self.get_serializer(rows, many=True).data)
+        )
+
+    async def detail_response(self, queryset, pk):
+        queryset = queryset.filter(pk=pk)
+        validators = await self.get_validators(queryset)
+        if not validators.exists:
+            raise Http404
+        response = validators.not_modified(self.request, detail=True)
+        if response is not None:
+            return response
+        row = await queryset.aget()
+        return validators.add_headers(Response(self.get_serializer(row).data))
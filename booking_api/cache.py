@@ -0,0 +1,66 @@
+"""
+Redis clients that report to the performance middleware.
+
+Every command sent to Redis, whether through Django's cache or a client
+from ``get_redis_client()``, counts as a round trip of the current request,
+and cache reads are counted as hits or misses.
+"""
+
+import redis
+from django.conf import settings
+from django.core.cache.backends.redis import RedisCache, RedisCacheClient
+
+from .middleware import current_metrics
+
+_MISSING = object()
+
+
+class InstrumentedRedis(redis.Redis):
+    def execute_command(self, *args, **options):
+        metrics = current_metrics()
+        if metrics is not None:
+            metrics.redis_calls += 1
+        return super().execute_command(*args, **options)
+
+    def pipeline(self, *args, **kwargs):
+        # A pipeline is sent in a single round trip
+        metrics = current_metrics()
+        if metrics is not None:
+            metrics.redis_calls += 1
+        return super().pipeline(*args, **kwargs)
+
+
+def get_redis_client():
+    return InstrumentedRedis.from_url(settings.REDIS_URL)
+
+
+class InstrumentedRedisCacheClient(RedisCacheClient):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._client = InstrumentedRedis
+
+
+class InstrumentedRedisCache(RedisCache):
+    """``RedisCache`` counting hits, misses and round trips per request."""
+
+    def __init__(self, server, params):
+        super().__init__(server, params)
+        self._class = InstrumentedRedisCacheClient
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, _MISSING, version)
+        self._record(hits=value is not _MISSING, misses=value is _MISSING)
+        return default if value is _MISSING else value
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        values = super().get_many(keys, version)
+        self._record(hits=len(values), misses=len(keys) - len(values))
+        return values
+
+    @staticmethod
+    def _record(hits, misses):
+        metrics = current_metrics()
+        if metrics is not None:
+            metrics.cache_hits += hits
+            metrics.cache_misses += misses
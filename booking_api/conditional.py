@@ -0,0 +1,124 @@
+"""
+Conditional GET for polled list and detail endpoints.
+
+Responses carry an ``ETag`` and ``Last-Modified`` computed from a single
+aggregate over the rows they render: their count and latest ``modified``,
+plus the same for every relation the serializer renders (see
+``booking_api.prefetch``). A client sending the ``ETag`` back in
+``If-None-Match`` gets ``304 Not Modified`` before anything is loaded or
+serialized.
+
+``Last-Modified`` cannot reveal a deleted row, so lists only honour
+``If-Modified-Since`` through their ``ETag``; detail views honour both.
+Bump ``REPRESENTATION_VERSION`` when serializers change what they render
+for the same rows, so clients do not keep the old representation.
+"""
+
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+from .prefetch import rendered_relations
+
+REPRESENTATION_VERSION = 1
+
+
+def validator_aggregates(queryset):
+    """
+    Aggregates whose values change whenever the rendered rows change.
+
+    Returns:
+        dict: Aggregate expressions by alias, for ``QuerySet.aggregate()``
+    """
+    aggregates = {"rows": Count("pk", distinct=True)}
+    if _has_modified(queryset.model):
+        aggregates["latest"] = Max("modified")
+
+    for path, model, many in rendered_relations(queryset):
+        if _has_modified(model):
+            aggregates[f"{path}_latest"] = Max(f"{path}__modified")
+        if many:
+            # Memberships change without touching either row
+            aggregates[f"{path}_rows"] = Count(path)
+    return aggregates
+
+
+def _has_modified(model):
+    return any(field.name == "modified" for field in model._meta.concrete_fields)
+
+
+class Validators:
+    """``ETag`` and ``Last-Modified`` of a response, from its aggregates."""
+
+    def __init__(self, request, values):
+        self.exists = bool(values["rows"])
+        digest = hashlib.md5(
+            repr(
+                (
+                    REPRESENTATION_VERSION,
+                    request.get_full_path(),
+                    sorted(values.items()),
+                )
+            ).encode(),
+            usedforsecurity=False,
+        ).hexdigest()
+        self.etag = f'W/"{digest}"'
+        modified = [
+            value
+            for name, value in values.items()
+            if name.endswith("latest") and value is not None
+        ]
+        # HTTP dates have whole seconds
+        self.last_modified = int(max(modified).timestamp()) if modified else None
+
+    def not_modified(self, request, detail):
+        """The ``304 Not Modified`` response for ``request``, or None."""
+        return self.add_headers(
+            get_conditional_response(
+                request,
+                etag=self.etag,
+                last_modified=self.last_modified if detail else None,
+            )
+        )
+
+    def add_headers(self, response):
+        if response is None:
+            return None
+        response["ETag"] = quote_etag(self.etag)
+        if self.last_modified is not None:
+            response["Last-Modified"] = http_date(self.last_modified)
+        # Browsers revalidate on every poll instead of reusing the copy
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+
+class ConditionalGetMixin:
+    """
+    Generic view mixin answering ``GET`` with ``304`` when nothing changed.
+
+    Detail views are recognised by their lookup URL keyword argument.
+    """
+
+    def get(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        lookup = self.lookup_url_kwarg or self.lookup_field
+        detail = lookup in kwargs
+        if detail:
+            queryset = queryset.filter(**{self.lookup_field: kwargs[lookup]})
+
+        validators = Validators(
+            request, queryset.aggregate(**validator_aggregates(queryset))
+        )
+        if detail and not validators.exists:
+            # Let the view answer 404 as usual
+            return super().get(request, *args, **kwargs)
+
+        response = validators.not_modified(request, detail)
+        if response is not None:
+            return response
+        response = super().get(request, *args, **kwargs)
+        if response.status_code == 200:
+            validators.add_headers(response)
+        return response
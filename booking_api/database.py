@@ -0,0 +1,133 @@
+"""
+How each kind of process holds its database connections.
+
+Without configuration Django opens a PostgreSQL connection per request and
+per dramatiq message, and closes it afterwards. ``DB_CONNECTIONS`` picks
+one of:
+
+- ``close``: a connection per request or message
+- ``persistent``: a connection per thread, reused for ``DB_CONN_MAX_AGE``
+  seconds and checked before reuse when a request starts
+- ``pool``: psycopg's connection pool, shared by the threads of a process;
+  requires psycopg 3 and ``psycopg-pool``
+
+The default depends on the process type, detected from the entry point or
+set with ``PROCESS_TYPE``: ``web`` (WSGI) and ``worker`` (dramatiq) keep
+persistent connections, ``asgi`` and ``command`` close theirs, because
+persistent connections are never reused from the event loop's threads.
+
+``NonAtomicReadsMixin`` lets read views skip ``ATOMIC_REQUESTS``.
+"""
+
+import importlib.util
+import os
+import sys
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+
+CONNECTION_MODES = ("close", "persistent", "pool")
+PROCESS_TYPES = ("web", "asgi", "worker", "command")
+DEFAULT_CONNECTION_MODES = {
+    "web": "persistent",
+    "asgi": "close",
+    "worker": "persistent",
+    "command": "close",
+}
+INSTRUMENTED_ENGINE = "booking_api.postgresql"
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+def detect_process_type():
+    """
+    Process type of the running program.
+
+    ``booking_api.wsgi`` and ``booking_api.asgi`` set ``PROCESS_TYPE`` before
+    loading the settings; dramatiq workers are recognised by their program.
+    """
+    process_type = os.environ.get("PROCESS_TYPE")
+    if process_type:
+        if process_type not in PROCESS_TYPES:
+            raise ImproperlyConfigured(
+                f"PROCESS_TYPE must be one of {', '.join(PROCESS_TYPES)}"
+            )
+        return process_type
+    if os.path.basename(sys.argv[0]).startswith("dramatiq"):
+        return "worker"
+    return "command"
+
+
+def configure_connections(
+    database, mode, max_age, pool_min_size, pool_max_size, pool_timeout
+):
+    """
+    Apply a connection ``mode`` to a ``DATABASES`` entry.
+
+    PostgreSQL databases also get the instrumented backend, which exports
+    connection metrics (see ``booking_api.postgresql``).
+
+    Args:
+        database (dict): Entry parsed from ``DATABASE_URL``, updated in place
+        mode (str): One of ``CONNECTION_MODES``
+        max_age (int): Seconds a persistent connection is reused
+        pool_min_size (int): Connections a pool keeps open
+        pool_max_size (int): Connections a pool opens at most
+        pool_timeout (float): Seconds to wait for a pooled connection
+
+    Returns:
+        dict: ``database``
+    """
+    if mode not in CONNECTION_MODES:
+        raise ImproperlyConfigured(
+            f"DB_CONNECTIONS must be one of {', '.join(CONNECTION_MODES)}"
+        )
+
+    postgresql = database["ENGINE"] == "django.db.backends.postgresql"
+    if postgresql:
+        database["ENGINE"] = INSTRUMENTED_ENGINE
+
+    if mode == "persistent":
+        database["CONN_MAX_AGE"] = max_age
+        database["CONN_HEALTH_CHECKS"] = True
+    elif mode == "pool":
+        if not postgresql or importlib.util.find_spec("psycopg_pool") is None:
+            raise ImproperlyConfigured(
+                "DB_CONNECTIONS=pool needs PostgreSQL with psycopg 3 and "
+                "psycopg-pool installed; use persistent with psycopg2."
+            )
+        database["CONN_MAX_AGE"] = 0
+        database.setdefault("OPTIONS", {})["pool"] = {
+            "min_size": pool_min_size,
+            "max_size": pool_max_size,
+            "timeout": pool_timeout,
+        }
+    else:
+        database["CONN_MAX_AGE"] = 0
+    return database
+
+
+class NonAtomicReadsMixin:
+    """
+    View mixin running safe requests outside ``ATOMIC_REQUESTS``.
+
+    Reads then skip the transaction (``BEGIN``/``COMMIT``, or a savepoint
+    pair in tests) and a pooled connection is not held in a transaction
+    while the response is serialized. They go to the read replica when one
+    is configured and the client has not just written (see
+    ``booking_api.replicas``). Other methods stay atomic on the primary.
+    """
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        return transaction.non_atomic_requests(super().as_view(**initkwargs))
+
+    def dispatch(self, request, *args, **kwargs):
+        # Imported late: the settings import this module
+        from .replicas import reads_from_replica, replica_reads
+
+        if request.method in SAFE_METHODS:
+            with replica_reads(reads_from_replica(request)):
+                return super().dispatch(request, *args, **kwargs)
+        with transaction.atomic():
+            return super().dispatch(request, *args, **kwargs)
@@ -0,0 +1,107 @@
+"""
+Django management command benchmarking JSON rendering and compression.
+
+Serializes a salon's customer list as ``GET /customers/?salon=`` does, then
+times rendering and parsing it with DRF's stdlib renderer and parser against
+the orjson ones (``booking_api.renderers``), and compressing it with every
+coding ``CompressionMiddleware`` can negotiate. Reports the median of
+``--repeat`` runs and the bytes sent for each.
+"""
+
+import io
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from booking_api import renderers
+from booking_api.compression import available_encodings
+from booking_api.prefetch import optimize_queryset
+from customer.models import Customer
+from customer.serializers import CustomerSerializer
+from salon.models import Salon
+
+
+def median_ms(function, repeat):
+    """Median milliseconds of ``repeat`` calls, and the last result."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000, result
+
+
+class Command(BaseCommand):
+    help = "Measure JSON rendering, parsing and compression of the customer list"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--salon",
+            type=int,
+            help="Salon whose customers are rendered (default: the largest)",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=20,
+            help="Runs per measurement; the median is reported",
+        )
+
+    def handle(self, *args, **options):
+        salon = self.get_salon(options["salon"])
+        repeat = options["repeat"]
+
+        queryset = Customer.objects.filter(salons=salon).order_by("-created")
+        queryset = optimize_queryset(queryset, CustomerSerializer())
+        serialize_ms, data = median_ms(
+            lambda: CustomerSerializer(queryset.all(), many=True).data, repeat
+        )
+
+        self.stdout.write(self.style.SUCCESS("\n=== Rendering Benchmark ==="))
+        self.stdout.write(
+            f"Salon {salon.pk}: {len(data)} customers, "
+            f"queried and serialized in {serialize_ms:.1f} ms"
+        )
+        if renderers.orjson is None:
+            self.stdout.write(self.style.WARNING("orjson is not installed"))
+
+        self.stdout.write(f"\n{'':<10}{'render ms':>11}{'parse ms':>10}{'bytes':>10}")
+        content = None
+        for name, renderer, parser in (
+            ("json", JSONRenderer(), JSONParser()),
+            ("orjson", renderers.FastJSONRenderer(), renderers.FastJSONParser()),
+        ):
+            render_ms, content = median_ms(lambda r=renderer: r.render(data), repeat)
+            parse_ms, _ = median_ms(
+                lambda p=parser, c=content: p.parse(io.BytesIO(c)), repeat
+            )
+            self.stdout.write(
+                f"{name:<10}{render_ms:>11.2f}{parse_ms:>10.2f}{len(content):>10}"
+            )
+
+        self.stdout.write(f"\n{'coding':<10}{'ms':>11}{'bytes':>10}{'ratio':>8}")
+        self.stdout.write(f"{'identity':<10}{0:>11.2f}{len(content):>10}{1:>8.2f}")
+        for coding, compress in available_encodings().items():
+            compress_ms, compressed = median_ms(lambda c=compress: c(content), repeat)
+            self.stdout.write(
+                f"{coding:<10}{compress_ms:>11.2f}{len(compressed):>10}"
+                f"{len(compressed) / len(content):>8.2f}"
+            )
+        self.stdout.write(self.style.SUCCESS("===========================\n"))
+
+    def get_salon(self, salon_id):
+        salons = Salon.objects.all()
+        if salon_id is None:
+            salons = salons.annotate(customer_count=Count("customers")).order_by(
+                "-customer_count"
+            )
+        else:
+            salons = salons.filter(pk=salon_id)
+        salon = salons.first()
+        if salon is None:
+            raise CommandError("No such salon. Seed some first.")
+        return salon
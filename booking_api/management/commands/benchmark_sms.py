@@ -0,0 +1,247 @@
+"""
+Django management command benchmarking the SMS pipeline end to end.
+
+Enqueues confirmation and reminder messages for existing appointments and
+times them through dramatiq workers and the Twilio client until the Twilio
+stand-in (``scripts/fake_twilio.py``) has received all of them. Each
+``--processes``/``--threads`` combination gets a fresh ``rundramatiq``
+worker. A sample of messages is also enqueued and processed in-process to
+count the database queries each message costs, on both sides of the queue.
+
+Refuses to run unless ``TWILIO_API_URL`` points the Twilio client away from
+Twilio and ``DRAMATIQ_NAMESPACE`` gives the broker a namespace of its own, so
+no real SMS is sent: the workers of a running stack consume the default
+namespace with the real Twilio credentials.
+"""
+
+import itertools
+import json
+import signal
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+
+import dramatiq
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from appointment.models import Appointment
+from appointment.tasks import send_sms_confirmation, send_sms_reminder
+
+# Namespace of RedisBroker unless DRAMATIQ_NAMESPACE is set
+DEFAULT_NAMESPACE = "dramatiq"
+
+
+def parse_counts(value):
+    return [int(count) for count in value.split(",")]
+
+
+class QueryCounter:
+    """``execute_wrapper`` counting queries across threads."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        with self.lock:
+            self.count += 1
+        return execute(sql, params, many, context)
+
+
+class Command(BaseCommand):
+    help = "Measure SMS messages per second through dramatiq and a stub Twilio"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--messages",
+            type=int,
+            default=1000,
+            help="Messages enqueued per run",
+        )
+        parser.add_argument(
+            "--processes",
+            type=parse_counts,
+            default=[1],
+            help="Comma-separated worker process counts to compare",
+        )
+        parser.add_argument(
+            "--threads",
+            type=parse_counts,
+            default=[8],
+            help="Comma-separated worker thread counts to compare",
+        )
+        parser.add_argument(
+            "--kind",
+            choices=("confirmation", "reminder", "both"),
+            default="both",
+            help="Actor the messages are sent to",
+        )
+        parser.add_argument(
+            "--query-sample",
+            type=int,
+            default=20,
+            help="Messages processed in-process to count database queries",
+        )
+        parser.add_argument(
+            "--warmup",
+            type=float,
+            default=5,
+            help="Seconds a new worker gets to boot before messages are sent",
+        )
+        parser.add_argument(
+            "--timeout",
+            type=float,
+            default=600,
+            help="Seconds to wait for a run to complete",
+        )
+
+    def handle(self, *args, **options):
+        if not settings.TWILIO_API_URL:
+            raise CommandError(
+                "Set TWILIO_API_URL to a Twilio stand-in such as "
+                "scripts/fake_twilio.py; this command sends real messages otherwise."
+            )
+        namespace = getattr(dramatiq.get_broker(), "namespace", None)
+        if namespace in (None, DEFAULT_NAMESPACE):
+            raise CommandError(
+                "Set DRAMATIQ_NAMESPACE to a namespace no running worker consumes, "
+                "such as dramatiq-benchmark; workers of a running stack would "
+                "send these messages as real SMS otherwise."
+            )
+        self.stats_url = settings.TWILIO_API_URL.rstrip("/") + "/stats"
+
+        appointment_ids = list(
+            Appointment.objects.exclude(customer__phone_number="")
+            .order_by("-pk")
+            .values_list("pk", flat=True)[: options["messages"]]
+        )
+        if not appointment_ids:
+            raise CommandError("No appointments to send messages for. Seed some first.")
+        actors = {
+            "confirmation": [send_sms_confirmation],
+            "reminder": [send_sms_reminder],
+            "both": [send_sms_confirmation, send_sms_reminder],
+        }[options["kind"]]
+        messages = list(
+            zip(
+                itertools.cycle(actors),
+                itertools.islice(itertools.cycle(appointment_ids), options["messages"]),
+            )
+        )
+
+        self.stdout.write(self.style.SUCCESS("\n=== SMS Pipeline Benchmark ==="))
+        self.count_queries(messages[: options["query_sample"]])
+
+        self.stdout.write(
+            f"\n{'processes':>10}{'threads':>9}{'messages':>10}{'failed':>8}"
+            f"{'enqueue s':>11}{'total s':>9}{'msg/s':>9}"
+        )
+        for processes, threads in itertools.product(
+            options["processes"], options["threads"]
+        ):
+            enqueue_time, stats = self.run(messages, processes, threads, options)
+            row = (
+                f"{processes:>10}{threads:>9}{len(messages):>10}"
+                f"{stats['failures']:>8}{enqueue_time:>11.2f}"
+            )
+            if stats["last"] is None:
+                # Nothing was delivered, so there is no end time to report
+                self.stdout.write(row + f"{'-':>9}{'-':>9}")
+                continue
+            total_time = stats["last"] - stats["started"]
+            self.stdout.write(
+                row + f"{total_time:>9.2f}{stats['messages'] / total_time:>9.1f}"
+            )
+        self.stdout.write(self.style.SUCCESS("==============================\n"))
+
+    def count_queries(self, sample):
+        """Enqueue and process ``sample`` in this process, counting queries."""
+        if not sample:
+            return
+
+        enqueue_counter, process_counter = QueryCounter(), QueryCounter()
+        with connection.execute_wrapper(enqueue_counter):
+            for actor, appointment_id in sample:
+                actor.send(appointment_id)
+        # Only this command uses the namespace, and no worker runs yet
+        dramatiq.get_broker().flush_all()
+
+        # Actor functions run as a worker thread runs them, without booting
+        # worker middleware such as Prometheus in this process
+        failed = 0
+        with connection.execute_wrapper(process_counter):
+            for actor, appointment_id in sample:
+                try:
+                    actor.fn(appointment_id)
+                except Exception:
+                    # A worker would retry; the queries ran all the same
+                    failed += 1
+
+        self.stdout.write(
+            f"Queries per message: {enqueue_counter.count / len(sample):.1f} "
+            f"to enqueue, {process_counter.count / len(sample):.1f} to process "
+            f"({len(sample)} messages, {failed} failed)"
+        )
+
+    def run(self, messages, processes, threads, options):
+        """
+        Time ``messages`` through a fresh worker.
+
+        Returns:
+            tuple: Seconds to enqueue, and the stand-in's stats with the
+            ``started`` time added
+        """
+        worker = subprocess.Popen(
+            [
+                sys.executable,
+                "manage.py",
+                "rundramatiq",
+                "--processes",
+                str(processes),
+                "--threads",
+                str(threads),
+            ],
+            cwd=settings.BASE_DIR,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        try:
+            time.sleep(options["warmup"])
+            self.reset_stats()
+
+            started = time.time()
+            for actor, appointment_id in messages:
+                actor.send(appointment_id)
+            enqueued = time.time()
+
+            stats = self.wait_for(len(messages), options["timeout"])
+            return enqueued - started, {**stats, "started": started}
+        finally:
+            worker.send_signal(signal.SIGTERM)
+            try:
+                worker.wait(timeout=60)
+            except subprocess.TimeoutExpired:
+                worker.kill()
+            # Retries of failed messages would be counted by the next run
+            dramatiq.get_broker().flush_all()
+
+    def wait_for(self, count, timeout):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            stats = self.get_stats()
+            if stats["messages"] + stats["failures"] >= count:
+                return stats
+            time.sleep(0.1)
+        raise CommandError(f"Timed out with {stats['messages']}/{count} messages sent")
+
+    def get_stats(self):
+        with urllib.request.urlopen(self.stats_url) as response:
+            return json.load(response)
+
+    def reset_stats(self):
+        request = urllib.request.Request(self.stats_url + "/reset", method="POST")
+        urllib.request.urlopen(request).close()
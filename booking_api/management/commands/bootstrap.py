@@ -0,0 +1,42 @@
+"""
+Django management command preparing a container before the app starts.
+
+Does what ``entrypoint.sh`` used to do with three commands, in one process
+so Django boots once: checks external services, applies migrations and
+seeds the default salon. Migrating is skipped when no migration is
+unapplied, and seeding when its rows already exist, so restarting a
+container that is up to date only costs a few queries.
+"""
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.migrations.executor import MigrationExecutor
+
+from .healthcheck import Command as HealthcheckCommand
+
+
+def unapplied_migrations(database=DEFAULT_DB_ALIAS):
+    """Migrations ``migrate`` would apply to ``database``, in order."""
+    executor = MigrationExecutor(connections[database])
+    plan = executor.migration_plan(executor.loader.graph.leaf_nodes())
+    return [migration for migration, backwards in plan]
+
+
+class Command(BaseCommand):
+    help = "Check services, then migrate and seed the database if needed"
+
+    def handle(self, *args, **options):
+        self.stdout.write("Running health checks...")
+        healthcheck = HealthcheckCommand(stdout=self.stdout, stderr=self.stderr)
+        if not healthcheck.run_checks():
+            raise CommandError("Some health checks failed. See errors above.")
+
+        migrations = unapplied_migrations()
+        if migrations:
+            self.stdout.write(f"Applying {len(migrations)} migrations...")
+            call_command("migrate", interactive=False, stdout=self.stdout)
+        else:
+            self.stdout.write("Migrations are current, skipping.")
+
+        call_command("seed_data", skip_if_current=True, stdout=self.stdout)
@@ -0,0 +1,97 @@
+"""
+Django management command for finding and merging duplicate customers.
+
+Customers created repeatedly for the same phone number and name inflate
+customer lists and SMS volume. By default this command only reports
+candidate clusters; pass ``--merge`` to merge them into the oldest customer.
+``--phone-only`` also treats customers with different names as duplicates,
+which merges family members sharing a phone.
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from customer.dedupe import iter_clusters, merge_clusters
+
+
+class Command(BaseCommand):
+    help = "Report and optionally merge customers sharing a phone number and name"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--merge",
+            action="store_true",
+            help="Merge duplicates instead of only reporting them",
+        )
+        parser.add_argument(
+            "--phone-only",
+            action="store_true",
+            help="Treat customers as duplicates even if their names differ",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Number of clusters merged per transaction",
+        )
+        parser.add_argument(
+            "--show",
+            type=int,
+            default=20,
+            help="Number of clusters printed in the report",
+        )
+
+    def handle(self, *args, **options):
+        merge = options["merge"]
+        batch_size = options["batch_size"]
+        started = time.monotonic()
+
+        clusters_found = 0
+        duplicates_found = 0
+        merged = 0
+        batch = []
+
+        for cluster in iter_clusters(
+            match_names=not options["phone_only"], chunk_size=batch_size
+        ):
+            clusters_found += 1
+            duplicates_found += len(cluster.duplicate_ids)
+
+            if clusters_found <= options["show"]:
+                self.write_cluster(cluster)
+
+            if merge:
+                batch.append(cluster)
+                if len(batch) >= batch_size:
+                    merged += merge_clusters(batch)
+                    batch = []
+
+        if batch:
+            merged += merge_clusters(batch)
+
+        elapsed = time.monotonic() - started
+
+        self.stdout.write(self.style.SUCCESS("\n=== Duplicate Customers ==="))
+        self.stdout.write(f"Clusters found: {clusters_found}")
+        self.stdout.write(f"Duplicate customers: {duplicates_found}")
+        if merge:
+            self.stdout.write(f"Customers merged: {merged}")
+        else:
+            self.stdout.write(
+                self.style.WARNING("Report only. Run with --merge to merge them.")
+            )
+        self.stdout.write(f"Elapsed: {elapsed:.2f}s")
+        self.stdout.write(self.style.SUCCESS("===========================\n"))
+
+    def write_cluster(self, cluster):
+        """
+        Print one cluster with its survivor first.
+
+        Args:
+            cluster (Cluster): Customers considered the same person
+        """
+        self.stdout.write(f"{cluster.phone_number}:")
+        for pk, name in cluster.members:
+            marker = "keep " if pk == cluster.survivor_id else "merge"
+            self.stdout.write(f"  {marker} #{pk} {name or '(no name)'}")
@@ -30,19 +30,11 @@ class Command(BaseCommand):
     def handle(self, *args, **options):
         fail_fast = options["fail_fast"]
         quiet = options["quiet"]
-        all_passed = True
 
         if not quiet:
             self.stdout.write("Running health checks...")
 
-        # Check Redis connection
-        redis_ok = self.check_redis_connection(quiet)
-        if not redis_ok:
-            all_passed = False
-
-        # Add more health checks here as needed
-        # db_ok = self.check_database_connection(quiet)
-        # twilio_ok = self.check_twilio_connection(quiet)
+        all_passed = self.run_checks(quiet)
 
         # Final summary
         if all_passed:
@@ -58,6 +50,29 @@ class Command(BaseCommand):
             else:
                 sys.exit(0)
 
+    def run_checks(self, quiet=False):
+        """
+        Run every health check.
+
+        Args:
+            quiet (bool): If True, suppress success messages
+
+        Returns:
+            bool: True if all checks passed, False otherwise
+        """
+        all_passed = True
+
+        # Check Redis connection
+        redis_ok = self.check_redis_connection(quiet)
+        if not redis_ok:
+            all_passed = False
+
+        # Add more health checks here as needed
+        # db_ok = self.check_database_connection(quiet)
+        # twilio_ok = self.check_twilio_connection(quiet)
+
+        return all_passed
+
     def check_redis_connection(self, quiet=False):
         """
         Check Redis cache connection.
@@ -0,0 +1,135 @@
+"""
+Django management command reporting where process startup time goes.
+
+Boots a fresh interpreter the way a web or worker process boots, with
+``python -X importtime``, and reports the boot's wall time and the import
+time of each package or module, slowest first. Self time excludes the
+imports a module triggers, so a package's row is what it costs on its own.
+"""
+
+import os
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# What each process type imports before it serves its first request or message
+BOOT_CODE = {
+    "web": (
+        "import booking_api.wsgi\n"
+        "from django.urls import get_resolver\n"
+        "get_resolver().url_patterns\n"
+    ),
+    "asgi": (
+        "import booking_api.asgi\n"
+        "from django.urls import get_resolver\n"
+        "get_resolver().url_patterns\n"
+    ),
+    "worker": (
+        "import django\n"
+        "django.setup()\n"
+        "from django.utils.module_loading import autodiscover_modules\n"
+        "autodiscover_modules('tasks')\n"
+    ),
+}
+
+
+def parse_importtime(output):
+    """
+    ``(module, self_us, cumulative_us)`` of every import in ``-X importtime``
+    output.
+    """
+    imports = []
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        if not self_us.strip().isdigit():
+            # Column headers
+            continue
+        imports.append((name.strip(), int(self_us), int(cumulative_us)))
+    return imports
+
+
+class Command(BaseCommand):
+    help = "Report import times of a web or worker process boot"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--process",
+            choices=tuple(BOOT_CODE),
+            default="web",
+            help="Process type whose boot is profiled",
+        )
+        parser.add_argument(
+            "--by",
+            choices=("package", "module"),
+            default="package",
+            help="Report self time per top-level package or per module",
+        )
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=25,
+            help="Rows reported",
+        )
+
+    def handle(self, *args, **options):
+        process = options["process"]
+        # A first boot compiles missing bytecode, which is not what is measured
+        self.boot(process)
+        elapsed, output = self.boot(process)
+        imports = parse_importtime(output)
+
+        self_us = defaultdict(int)
+        modules = defaultdict(int)
+        for name, own, _ in imports:
+            key = name.split(".")[0] if options["by"] == "package" else name
+            self_us[key] += own
+            modules[key] += 1
+        cumulative = {name: total for name, _, total in imports}
+
+        self.stdout.write(self.style.SUCCESS(f"\n=== Startup Profile: {process} ==="))
+        self.stdout.write(
+            f"Boot: {elapsed * 1000:.0f} ms wall, "
+            f"{sum(self_us.values()) / 1000:.0f} ms importing "
+            f"{len(imports)} modules\n"
+        )
+        if options["by"] == "package":
+            self.stdout.write(f"{'package':<32}{'self ms':>10}{'modules':>9}")
+        else:
+            self.stdout.write(f"{'module':<48}{'self ms':>10}{'cumul. ms':>11}")
+        ranked = sorted(self_us.items(), key=lambda item: item[1], reverse=True)
+        for name, own in ranked[: options["limit"]]:
+            if options["by"] == "package":
+                self.stdout.write(f"{name:<32}{own / 1000:>10.1f}{modules[name]:>9}")
+            else:
+                self.stdout.write(
+                    f"{name:<48}{own / 1000:>10.1f}{cumulative[name] / 1000:>11.1f}"
+                )
+        self.stdout.write(self.style.SUCCESS("=" * (len(process) + 26) + "\n"))
+
+    def boot(self, process):
+        """Wall time and ``-X importtime`` output of a fresh boot."""
+        env = {
+            **os.environ,
+            "DJANGO_SETTINGS_MODULE": os.environ.get(
+                "DJANGO_SETTINGS_MODULE", "booking_api.settings"
+            ),
+            "PROCESS_TYPE": process,
+        }
+        started = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", BOOT_CODE[process]],
+            cwd=settings.BASE_DIR,
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+        elapsed = time.perf_counter() - started
+        if result.returncode:
+            raise CommandError(f"{process} boot failed:\n{result.stderr[-2000:]}")
+        return elapsed, result.stderr
@@ -0,0 +1,48 @@
+"""
+Django management command for rebuilding customer visit statistics.
+
+Statistics are normally kept in sync by appointment writes. Run this after
+bulk imports, raw SQL changes or deploying the statistics table, and
+periodically so rows of customers whose next appointment has passed are
+refreshed ahead of the next profile view.
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from customer.helpers import refresh_customer_stats
+from customer.models import Customer
+
+
+class Command(BaseCommand):
+    help = "Recompute denormalized visit statistics for all customers"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=1000,
+            help="Number of customers recomputed per query",
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options["chunk_size"]
+        started = time.monotonic()
+        customers = Customer.objects.order_by("pk").values_list("pk", flat=True)
+
+        refreshed = 0
+        last_pk = 0
+        while True:
+            customer_ids = list(customers.filter(pk__gt=last_pk)[:chunk_size])
+            if not customer_ids:
+                break
+            last_pk = customer_ids[-1]
+            refreshed += len(refresh_customer_stats(customer_ids))
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Recomputed statistics for {refreshed} customers in {elapsed:.2f}s"
+            )
+        )
@@ -0,0 +1,257 @@
+"""
+Django management command for reconciling SMS reminders with the broker.
+
+Every future appointment whose customer has a phone number should have a
+delayed ``send_sms_reminder`` message in the broker's delayed messages hash
+(``<namespace>:default.DQ.msgs``) whose id matches ``Appointment.task_id``.
+This command removes reminder messages that no longer belong to an
+appointment and re-schedules the ones that went missing, so lost reminders
+are found before customers notice.
+
+``Appointment.save()`` enqueues a reminder before it stores its id, and the
+request commits later still, so messages and appointments changed within
+``--grace-seconds`` are left alone: they may be mid-save.
+"""
+
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from dramatiq import Message
+
+from appointment.helpers import (
+    delayed_messages_key,
+    pipelined_enqueues,
+    reminder_delay_ms,
+)
+from appointment.models import Appointment
+from appointment.tasks import send_sms_reminder
+from booking_api.cache import get_redis_client
+
+
+class Command(BaseCommand):
+    help = "Verify scheduled SMS reminders against the broker and repair them"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=500,
+            help="Number of appointments/messages processed per batch",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Report what would change without touching Redis or the database",
+        )
+        parser.add_argument(
+            "--grace-seconds",
+            type=int,
+            default=120,
+            help="Ignore messages and appointments changed more recently than this",
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options["chunk_size"]
+        dry_run = options["dry_run"]
+        redis_client = get_redis_client()
+        key = delayed_messages_key()
+        # Anything newer may belong to an Appointment.save() in progress
+        cutoff = timezone.now() - timedelta(seconds=options["grace_seconds"])
+        started = time.monotonic()
+
+        if dry_run:
+            self.stdout.write(self.style.WARNING("Dry run: no changes will be made"))
+
+        orphans = self.remove_orphans(redis_client, key, cutoff, chunk_size, dry_run)
+        orphans_elapsed = time.monotonic() - started
+
+        stats = self.repair_missing(redis_client, key, cutoff, chunk_size, dry_run)
+        elapsed = time.monotonic() - started
+
+        self.stdout.write(self.style.SUCCESS("\n=== Reminder Reconciliation ==="))
+        self.stdout.write(f"Future appointments scanned: {stats['scanned']}")
+        self.stdout.write(f"Reminders live in broker: {stats['live']}")
+        self.stdout.write(f"Reminders missing: {stats['missing']}")
+        self.stdout.write(f"Reminders re-scheduled: {stats['rescheduled']}")
+        self.stdout.write(f"Skipped (reminder time passed): {stats['expired']}")
+        self.stdout.write(f"Skipped (changed during the run): {stats['raced']}")
+        self.stdout.write(f"Orphaned messages removed: {orphans}")
+        self.stdout.write(
+            f"Elapsed: {elapsed:.2f}s (orphan scan {orphans_elapsed:.2f}s)"
+        )
+        self.stdout.write(self.style.SUCCESS("===============================\n"))
+
+    def remove_orphans(self, redis_client, key, cutoff, chunk_size, dry_run):
+        """
+        Delete reminder messages that no appointment refers to any more.
+
+        Args:
+            redis_client: Redis connection used by the dramatiq broker
+            key (str): Hash of the delayed messages
+            cutoff (datetime): Messages enqueued after it are kept
+            chunk_size (int): HSCAN page size
+            dry_run (bool): If True, only count orphans
+
+        Returns:
+            int: Number of orphaned messages found
+        """
+        removed = 0
+        cutoff_ms = cutoff.timestamp() * 1000
+
+        cursor = 0
+        while True:
+            cursor, page = redis_client.hscan(key, cursor=cursor, count=chunk_size)
+
+            booking_ids = {}
+            for message_id, payload in page.items():
+                message = Message.decode(payload)
+                # Cancellation notices carry a second argument and are not tied
+                # to an appointment row, so only plain reminders are checked.
+                if message.actor_name != send_sms_reminder.actor_name:
+                    continue
+                if len(message.args) != 1:
+                    continue
+                if message.message_timestamp > cutoff_ms:
+                    continue
+                booking_ids[message_id.decode()] = message.args[0]
+
+            if booking_ids:
+                task_ids = dict(
+                    Appointment.objects.filter(
+                        pk__in=set(booking_ids.values()),
+                        appointment_time__gt=timezone.now(),
+                    ).values_list("pk", "task_id")
+                )
+                orphaned = [
+                    message_id
+                    for message_id, booking_id in booking_ids.items()
+                    if task_ids.get(booking_id) != message_id
+                ]
+                if orphaned and not dry_run:
+                    redis_client.hdel(key, *orphaned)
+                removed += len(orphaned)
+
+            if cursor == 0:
+                return removed
+
+    def repair_missing(self, redis_client, key, cutoff, chunk_size, dry_run):
+        """
+        Re-schedule reminders for future appointments missing from the broker.
+
+        Appointments are read in primary key order so memory stays bounded by
+        ``chunk_size`` regardless of table size. The reminders of a chunk are
+        enqueued in one Redis round trip, and stored only on appointments
+        that were not saved in the meantime.
+
+        Args:
+            redis_client: Redis connection used by the dramatiq broker
+            key (str): Hash of the delayed messages
+            cutoff (datetime): Appointments modified after it are skipped
+            chunk_size (int): Number of appointments checked per batch
+            dry_run (bool): If True, only count missing reminders
+
+        Returns:
+            dict: Counters for scanned, live, missing, rescheduled, expired
+                and raced
+        """
+        stats = dict.fromkeys(
+            ("scanned", "live", "missing", "rescheduled", "expired", "raced"), 0
+        )
+        queryset = (
+            Appointment.objects.filter(
+                appointment_time__gt=timezone.now(), modified__lte=cutoff
+            )
+            .exclude(customer__phone_number="")
+            .order_by("pk")
+            .values_list(
+                "pk",
+                "task_id",
+                "appointment_time",
+                "salon__reminder_time_minutes",
+                "modified",
+            )
+        )
+
+        last_pk = 0
+        while True:
+            chunk = list(queryset.filter(pk__gt=last_pk)[:chunk_size])
+            if not chunk:
+                return stats
+            last_pk = chunk[-1][0]
+            stats["scanned"] += len(chunk)
+
+            # One HMGET per chunk; appointments without a task id look up a
+            # field that can never exist so results stay aligned with rows.
+            payloads = redis_client.hmget(
+                key, [task_id or "-" for _, task_id, _, _, _ in chunk]
+            )
+
+            missing = {}
+            for (pk, _task_id, appointment_time, minutes, modified), payload in zip(
+                chunk, payloads, strict=True
+            ):
+                if payload and list(Message.decode(payload).args[:1]) == [pk]:
+                    stats["live"] += 1
+                    continue
+
+                stats["missing"] += 1
+                delay = reminder_delay_ms(appointment_time, minutes)
+                if delay <= 0:
+                    stats["expired"] += 1
+                    continue
+                if not dry_run:
+                    missing[pk] = (modified, delay)
+
+            if missing:
+                rescheduled, raced = self.reschedule(redis_client, key, missing)
+                stats["rescheduled"] += rescheduled
+                stats["raced"] += raced
+
+    def reschedule(self, redis_client, key, missing):
+        """
+        Enqueue reminders for ``missing`` and store their ids.
+
+        Appointments are locked while their ids are stored, and skipped if
+        saved since they were read: that save scheduled its own reminder, so
+        the one enqueued here is deleted again.
+
+        Args:
+            redis_client: Redis connection used by the dramatiq broker
+            key (str): Hash of the delayed messages
+            missing (dict): ``(modified, delay)`` by appointment id
+
+        Returns:
+            tuple[int, int]: Reminders stored and appointments skipped
+        """
+        with pipelined_enqueues():
+            task_ids = {
+                pk: send_sms_reminder.send_with_options(
+                    args=(pk,), delay=delay
+                ).options["redis_message_id"]
+                for pk, (_, delay) in missing.items()
+            }
+
+        now = timezone.now()
+        with transaction.atomic():
+            unchanged = [
+                pk
+                for pk, modified in Appointment.objects.select_for_update()
+                .filter(pk__in=missing)
+                .values_list("pk", "modified")
+                if modified == missing[pk][0]
+            ]
+            Appointment.objects.bulk_update(
+                [
+                    Appointment(pk=pk, task_id=task_ids[pk], modified=now)
+                    for pk in unchanged
+                ],
+                ["task_id", "modified"],
+            )
+
+        raced = [task_ids[pk] for pk in missing.keys() - set(unchanged)]
+        if raced:
+            redis_client.hdel(key, *raced)
+        return len(unchanged), len(raced)
@@ -1,9 +1,13 @@
 import os
+import time
+from datetime import date
 
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 from django.db import transaction
+from django.utils import timezone
 
 from address.models import Address
+from booking_api.seeding import ScaleSeeder
 from salon.models import Salon
 from user.models import ExtendedUser
 
@@ -11,7 +15,64 @@ from user.models import ExtendedUser
 class Command(BaseCommand):
     help = 'Seeds the database with initial salon and user data using environment variables'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scale',
+            type=int,
+            help='Generate this many salons of synthetic data for capacity testing',
+        )
+        parser.add_argument(
+            '--staff-per-salon',
+            type=int,
+            default=6,
+            help='Staff members per generated salon',
+        )
+        parser.add_argument(
+            '--customers-per-salon',
+            type=int,
+            default=2000,
+            help='Customers per generated salon',
+        )
+        parser.add_argument(
+            '--appointments-per-customer',
+            type=float,
+            default=10,
+            help='Average appointments per generated customer',
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Random seed; the same seed generates the same data',
+        )
+        parser.add_argument(
+            '--anchor',
+            type=date.fromisoformat,
+            help='Day (YYYY-MM-DD) splitting history from upcoming bookings, '
+            'today by default',
+        )
+        parser.add_argument(
+            '--password',
+            default='scalepass123',
+            help='Password of every generated staff member',
+        )
+        parser.add_argument(
+            '--no-copy',
+            action='store_true',
+            help='Insert with bulk_create instead of PostgreSQL COPY',
+        )
+        parser.add_argument(
+            '--skip-if-current',
+            action='store_true',
+            help='Do nothing if the owner is already a member of the seeded salon '
+            'at the seeded address',
+        )
+
     def handle(self, *args, **options):
+        if options['scale'] is not None:
+            self.seed_scale(options)
+            return
+
         self.stdout.write('Starting database seeding...')
 
         # Get seed data from environment variables
@@ -28,6 +89,12 @@ class Command(BaseCommand):
         owner_full_name = os.environ.get('SEED_OWNER_FULL_NAME', 'Default Owner')
         owner_password = os.environ.get('SEED_OWNER_DEFAULT_PASSWORD', 'defaultpass123')
 
+        if options['skip_if_current'] and self.is_seeded(
+            owner_email, salon_name, salon_street, salon_city, salon_postal_code
+        ):
+            self.stdout.write('Seed data is current, skipping.')
+            return
+
         # Validate required environment variables
         if salon_name == 'Default Salon' or owner_email == 'owner@example.com':
             self.stdout.write(
@@ -134,3 +201,55 @@ class Command(BaseCommand):
         except Exception as e:
             self.stdout.write(self.style.ERROR(f'Error during seeding: {e!s}'))
             raise
+
+    def is_seeded(self, owner_email, salon_name, street, city, postal_code):
+        """Whether the owner is a member of the salon at the address, in one query."""
+        return ExtendedUser.objects.filter(
+            email=owner_email,
+            salons__name=salon_name,
+            salons__addresses__street=street,
+            salons__addresses__city=city,
+            salons__addresses__postal_code=postal_code,
+        ).exists()
+
+    def seed_scale(self, options):
+        if options['scale'] < 1:
+            raise CommandError('--scale must be at least 1')
+
+        try:
+            seeder = ScaleSeeder(
+                salons=options['scale'],
+                staff_per_salon=max(1, options['staff_per_salon']),
+                customers_per_salon=options['customers_per_salon'],
+                appointments_per_customer=options['appointments_per_customer'],
+                seed=options['seed'],
+                anchor=options['anchor'] or timezone.localdate(),
+                password=options['password'],
+                use_copy=not options['no_copy'],
+            )
+        except ValueError as e:
+            raise CommandError(str(e)) from None
+        if seeder.exists():
+            raise CommandError(
+                'Scale data already exists. Seed an empty database, e.g. after '
+                '`manage.py flush`.'
+            )
+
+        started = time.monotonic()
+        customers = appointments = 0
+        for number, salon_customers, salon_appointments in seeder.run():
+            customers += salon_customers
+            appointments += salon_appointments
+            self.stdout.write(
+                f'Salon {number}/{seeder.salons}: {salon_customers} customers, '
+                f'{salon_appointments} appointments'
+            )
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS('\n=== Scale Seeding Complete ==='))
+        self.stdout.write(f'Salons: {seeder.salons}')
+        self.stdout.write(f'Staff: {seeder.salons * seeder.staff_per_salon}')
+        self.stdout.write(f'Customers: {customers}')
+        self.stdout.write(f'Appointments: {appointments}')
+        self.stdout.write(f'Elapsed: {elapsed:.2f}s')
+        self.stdout.write(self.style.SUCCESS('==============================\n'))
@@ -0,0 +1,162 @@
+"""
+Prometheus metrics of the web tier.
+
+Gunicorn serves requests from several worker processes. Under gunicorn,
+``gunicorn.conf.py`` points ``PROMETHEUS_MULTIPROC_DIR`` at
+``GUNICORN_METRICS_DIR``, every worker writes its samples there and the
+``/metrics/`` view aggregates them across processes. Other processes keep
+their samples in memory, except dramatiq workers, whose Prometheus
+middleware sets up its own directory after the process boots.
+
+``prometheus_client`` picks in-memory or multiprocess storage when it is
+imported, so it is imported on first use rather than when Django starts.
+"""
+
+import functools
+import hmac
+import os
+from types import SimpleNamespace
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+
+
+@functools.cache
+def get_metrics():
+    """The metrics of this process, created on first use."""
+    from prometheus_client import Counter, Gauge, Histogram
+
+    return SimpleNamespace(
+        request_latency=Histogram(
+            "booking_http_request_duration_seconds",
+            "Time spent serving HTTP requests",
+            ["route", "method"],
+            buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+        ),
+        requests=Counter(
+            "booking_http_requests",
+            "HTTP responses by route and status code",
+            ["route", "method", "status"],
+        ),
+        request_queries=Histogram(
+            "booking_http_request_db_queries",
+            "SQL queries executed per HTTP request",
+            ["route"],
+            buckets=(1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144),
+        ),
+        cache_lookups=Counter(
+            "booking_cache_lookups",
+            "Django cache reads by result, for the hit ratio",
+            ["result"],
+        ),
+        messages_enqueued=Counter(
+            "booking_messages_enqueued",
+            "Dramatiq messages enqueued, i.e. SMS scheduled, by actor",
+            ["actor"],
+        ),
+        db_connection_wait=Histogram(
+            "booking_db_connection_wait_seconds",
+            "Time to obtain a database connection: connecting, or waiting for "
+            "the pool",
+            ["process_type", "mode"],
+            buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+        ),
+        db_pool_connections=Gauge(
+            "booking_db_pool_connections",
+            "Pooled database connections by state, and requests waiting for one",
+            ["process_type", "state"],
+            multiprocess_mode="livesum",
+        ),
+    )
+
+
+def metrics_enabled():
+    """
+    Whether samples can be recorded.
+
+    A ``PROMETHEUS_MULTIPROC_DIR`` that does not exist would make every
+    sample raise ``FileNotFoundError``.
+    """
+    directory = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    return not directory or os.path.isdir(directory)
+
+
+def record_request(request, response, metrics, elapsed):
+    """Export one request measured by ``PerformanceMiddleware``."""
+    if not metrics_enabled():
+        return
+    match = request.resolver_match
+    # Unmatched paths share one label so scanners cannot blow up cardinality
+    route = match.view_name if match else "unmatched"
+
+    exported = get_metrics()
+    exported.request_latency.labels(route, request.method).observe(elapsed)
+    exported.requests.labels(route, request.method, response.status_code).inc()
+    exported.request_queries.labels(route).observe(metrics.db_queries)
+    if metrics.cache_hits:
+        exported.cache_lookups.labels("hit").inc(metrics.cache_hits)
+    if metrics.cache_misses:
+        exported.cache_lookups.labels("miss").inc(metrics.cache_misses)
+
+
+def record_message_enqueued(actor_name):
+    """Export one dramatiq message enqueued for ``actor_name``."""
+    if metrics_enabled():
+        get_metrics().messages_enqueued.labels(actor_name).inc()
+
+
+def record_database_connection(elapsed, pool):
+    """
+    Export one connection obtained by ``booking_api.postgresql``.
+
+    Args:
+        elapsed (float): Seconds spent connecting or waiting for the pool
+        pool (ConnectionPool | None): psycopg pool the connection came from
+    """
+    if not metrics_enabled():
+        return
+    exported = get_metrics()
+    process_type = settings.PROCESS_TYPE
+    exported.db_connection_wait.labels(process_type, settings.DB_CONNECTIONS).observe(
+        elapsed
+    )
+    if pool is not None:
+        stats = pool.get_stats()
+        gauge = exported.db_pool_connections
+        gauge.labels(process_type, "open").set(stats["pool_size"])
+        gauge.labels(process_type, "idle").set(stats["pool_available"])
+        gauge.labels(process_type, "waiting").set(stats.get("requests_waiting", 0))
+
+
+def metrics_view(request):
+    """
+    Expose metrics behind ``METRICS_TOKEN``.
+
+    Without a token they are only exposed with ``DEBUG`` on.
+    """
+    from prometheus_client import (
+        CONTENT_TYPE_LATEST,
+        REGISTRY,
+        CollectorRegistry,
+        generate_latest,
+        multiprocess,
+    )
+
+    token = settings.METRICS_TOKEN
+    if token:
+        expected = f"Bearer {token}"
+        provided = request.headers.get("Authorization", "")
+        if not hmac.compare_digest(provided, expected):
+            return HttpResponseForbidden()
+    elif not settings.DEBUG:
+        return HttpResponseForbidden()
+
+    # Registers the metrics before the first request records any
+    get_metrics()
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+
+    return HttpResponse(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
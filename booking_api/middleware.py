@@ -0,0 +1,186 @@
+"""
+Per-request performance instrumentation.
+
+``PerformanceMiddleware`` measures every request: wall time, SQL queries and
+their time, cache hits and misses, Redis round trips and dramatiq messages
+enqueued. The figures are logged as one JSON line per request on the
+``booking_api.performance`` logger and, with ``PERFORMANCE_SERVER_TIMING``
+on, returned in a ``Server-Timing`` header, which browser dev tools display. For a sample of slow requests the SQL of
+every query is logged too. The same figures feed the Prometheus metrics in
+``booking_api.metrics``.
+"""
+
+import json
+import logging
+import random
+import time
+from contextvars import ContextVar
+
+import dramatiq
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+from .metrics import record_message_enqueued, record_request
+
+logger = logging.getLogger("booking_api.performance")
+
+# Upper bound on the queries kept per request for slow request samples
+MAX_RECORDED_QUERIES = 200
+
+_current_metrics = ContextVar("request_metrics", default=None)
+
+
+class RequestMetrics:
+    """Counters for the request being served."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.db_queries = 0
+        self.db_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.redis_calls = 0
+        self.enqueued_messages = 0
+        # (alias, sql, seconds) of the first MAX_RECORDED_QUERIES queries
+        self.queries = []
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def server_timing(self, elapsed):
+        return ", ".join(
+            (
+                f"total;dur={elapsed * 1000:.1f}",
+                f'db;dur={self.db_time * 1000:.1f};desc="{self.db_queries} queries"',
+                f'cache;desc="{self.cache_hits} hits, {self.cache_misses} misses"',
+                f'redis;desc="{self.redis_calls} calls"',
+                f'broker;desc="{self.enqueued_messages} messages"',
+            )
+        )
+
+
+def current_metrics():
+    """Metrics of the request being served, or None outside a request."""
+    return _current_metrics.get()
+
+
+class QueryRecorder:
+    """``execute_wrapper`` counting and timing the current request's queries."""
+
+    def __init__(self, alias):
+        self.alias = alias
+
+    def __call__(self, execute, sql, params, many, context):
+        metrics = current_metrics()
+        if metrics is None:
+            return execute(sql, params, many, context)
+
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            metrics.db_queries += 1
+            metrics.db_time += duration
+            if len(metrics.queries) < MAX_RECORDED_QUERIES:
+                metrics.queries.append((self.alias, sql, duration))
+
+
+def install_query_recorder(connection):
+    if not any(isinstance(w, QueryRecorder) for w in connection.execute_wrappers):
+        connection.execute_wrappers.append(QueryRecorder(connection.alias))
+
+
+@receiver(connection_created)
+def record_new_connection(sender, connection, **kwargs):
+    # Async views query from executor threads, each with its own connection;
+    # the request's metrics reach them through the context variable
+    install_query_recorder(connection)
+
+
+class PerformanceMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.slow_request_ms = settings.PERFORMANCE_SLOW_REQUEST_MS
+        self.query_sample_rate = settings.PERFORMANCE_QUERY_SAMPLE_RATE
+        self.server_timing = settings.PERFORMANCE_SERVER_TIMING
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+
+        for connection in connections.all():
+            install_query_recorder(connection)
+
+        metrics = RequestMetrics()
+        token = _current_metrics.set(metrics)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_metrics.reset(token)
+        return self.finish(request, response, metrics)
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics()
+        token = _current_metrics.set(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_metrics.reset(token)
+        return self.finish(request, response, metrics)
+
+    def finish(self, request, response, metrics):
+        elapsed = metrics.elapsed
+        if self.server_timing:
+            response["Server-Timing"] = metrics.server_timing(elapsed)
+        self.log(request, response, metrics, elapsed)
+        record_request(request, response, metrics, elapsed)
+        return response
+
+    def log(self, request, response, metrics, elapsed):
+        match = request.resolver_match
+        duration_ms = elapsed * 1000
+        record = {
+            "method": request.method,
+            "path": request.path,
+            "route": match.view_name if match else None,
+            "status": response.status_code,
+            "duration_ms": round(duration_ms, 1),
+            "db_queries": metrics.db_queries,
+            "db_ms": round(metrics.db_time * 1000, 1),
+            "cache_hits": metrics.cache_hits,
+            "cache_misses": metrics.cache_misses,
+            "redis_calls": metrics.redis_calls,
+            "enqueued_messages": metrics.enqueued_messages,
+        }
+
+        slow = duration_ms >= self.slow_request_ms
+        if slow and random.random() < self.query_sample_rate:
+            record["queries"] = [
+                {"db": alias, "sql": sql, "ms": round(duration * 1000, 2)}
+                for alias, sql, duration in metrics.queries
+            ]
+
+        level = logging.WARNING if slow else logging.INFO
+        logger.log(level, json.dumps(record, default=str))
+
+
+class EnqueueMetricsMiddleware(dramatiq.Middleware):
+    """Dramatiq middleware counting enqueued messages, per request and actor."""
+
+    def before_enqueue(self, broker, message, delay):
+        record_message_enqueued(message.actor_name)
+
+        metrics = current_metrics()
+        if metrics is not None:
+            metrics.enqueued_messages += 1
@@ -0,0 +1,21 @@
+"""
+PostgreSQL backend exporting how long processes wait for connections.
+
+Selected by ``booking_api.database.configure_connections()``. Every new
+connection, or connection taken from psycopg's pool, is timed, and the
+pool's size is exported along with it (see ``booking_api.metrics``).
+"""
+
+import time
+
+from django.db.backends.postgresql import base
+
+from ..metrics import record_database_connection
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_new_connection(self, conn_params):
+        started = time.perf_counter()
+        connection = super().get_new_connection(conn_params)
+        record_database_connection(time.perf_counter() - started, self.pool)
+        return connection
@@ -0,0 +1,215 @@
+"""
+Derive ``select_related``/``prefetch_related``/``only()`` from serializers.
+
+Nested serializers and many related fields otherwise load their relations
+one object at a time, turning every list endpoint into 1 + N + N*M queries.
+The planner walks the serializer's readable fields and builds the matching
+queryset, so views stay correct when serializers change.
+"""
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.relations import ManyRelatedField, PrimaryKeyRelatedField
+
+
+class QueryPlan:
+    """Relations to join or prefetch and columns to load for one model."""
+
+    def __init__(self, model):
+        self.model = model
+        self.select_related = []
+        self.prefetch_related = []
+        # ``None`` means some field needs the whole row (a property, a method
+        # or a dotted source), so columns are not restricted.
+        self.only = {model._meta.pk.name}
+
+    def load_all(self):
+        self.only = None
+
+    def add_column(self, name):
+        if self.only is not None:
+            self.only.add(name)
+
+    def apply(self, queryset, defer_fields=True):
+        if self.select_related:
+            queryset = queryset.select_related(*self.select_related)
+        if self.prefetch_related:
+            queryset = queryset.prefetch_related(*self.prefetch_related)
+        if defer_fields and self.only is not None:
+            queryset = queryset.only(*self.only)
+        return queryset
+
+
+def plan_serializer(serializer, model):
+    """
+    Build the ``QueryPlan`` needed to render ``serializer`` for ``model``.
+
+    Args:
+        serializer: Serializer instance (the child of a ``ListSerializer``)
+        model: Model class whose instances the serializer renders
+
+    Returns:
+        QueryPlan: Joins, prefetches and columns for the queryset
+    """
+    plan = QueryPlan(model)
+
+    for field in serializer.fields.values():
+        if field.write_only:
+            continue
+
+        if len(field.source_attrs) != 1:
+            plan.load_all()
+            continue
+
+        try:
+            model_field = model._meta.get_field(field.source)
+        except FieldDoesNotExist:
+            plan.load_all()
+            continue
+
+        if not model_field.is_relation:
+            plan.add_column(model_field.name)
+        elif model_field.many_to_many or model_field.one_to_many:
+            plan.prefetch_related.append(_plan_prefetch(field, model_field))
+        else:
+            _plan_join(plan, field, model_field)
+
+    return plan
+
+
+def _plan_prefetch(field, model_field):
+    """Prefetch for a many relation, recursing into nested serializers."""
+    related_model = model_field.related_model
+    queryset = related_model._default_manager.all()
+
+    if isinstance(field, serializers.ListSerializer):
+        child_plan = plan_serializer(field.child, related_model)
+    elif isinstance(field, ManyRelatedField) and isinstance(
+        field.child_relation, PrimaryKeyRelatedField
+    ):
+        child_plan = QueryPlan(related_model)
+    else:
+        child_plan = QueryPlan(related_model)
+        child_plan.load_all()
+
+    if model_field.one_to_many:
+        # Reverse foreign keys are matched back to their parent by this column
+        child_plan.add_column(model_field.field.name)
+
+    return Prefetch(field.source, queryset=child_plan.apply(queryset))
+
+
+def _plan_join(plan, field, model_field):
+    """Select a forward (or reverse one-to-one) relation in the same query."""
+    if isinstance(field, PrimaryKeyRelatedField):
+        # Rendered from the ``<name>_id`` column without touching the relation
+        plan.add_column(model_field.name)
+        return
+
+    if not isinstance(field, serializers.BaseSerializer):
+        plan.select_related.append(field.source)
+        plan.load_all()
+        return
+
+    child_plan = plan_serializer(field, model_field.related_model)
+    prefix = f"{field.source}__"
+
+    plan.select_related.append(field.source)
+    plan.select_related.extend(prefix + name for name in child_plan.select_related)
+    for prefetch in child_plan.prefetch_related:
+        plan.prefetch_related.append(
+            Prefetch(prefix + prefetch.prefetch_through, queryset=prefetch.queryset)
+        )
+
+    if model_field.concrete:
+        plan.add_column(model_field.name)
+    if child_plan.only is None:
+        plan.load_all()
+    else:
+        for name in child_plan.only:
+            plan.add_column(prefix + name)
+
+
+def rendered_relations(queryset):
+    """
+    Relations ``queryset`` loads along with its rows, joined or prefetched.
+
+    Yields:
+        tuple[str, type[Model], bool]: Lookup path from the queryset's model,
+            related model and whether the relation is many-valued
+    """
+    yield from _joined_relations(queryset.model, queryset.query.select_related, "")
+
+    for lookup in queryset._prefetch_related_lookups:
+        path = lookup.prefetch_through if isinstance(lookup, Prefetch) else lookup
+        model, many = queryset.model, False
+        for name in path.split("__"):
+            field = _get_relation(model, name)
+            model, many = field.related_model, many or not _is_single(field)
+        yield path, model, many
+
+        if isinstance(lookup, Prefetch) and lookup.queryset is not None:
+            for subpath, related, related_many in rendered_relations(lookup.queryset):
+                yield f"{path}__{subpath}", related, many or related_many
+
+
+def _joined_relations(model, select_related, prefix):
+    # ``True`` would mean every relation; plans always name them
+    if not isinstance(select_related, dict):
+        return
+    for name, nested in select_related.items():
+        related = _get_relation(model, name).related_model
+        yield prefix + name, related, False
+        yield from _joined_relations(related, nested, f"{prefix}{name}__")
+
+
+def _get_relation(model, name):
+    try:
+        return model._meta.get_field(name)
+    except FieldDoesNotExist:
+        # Reverse relations are prefetched by their accessor, e.g. ``x_set``
+        for relation in model._meta.related_objects:
+            if relation.get_accessor_name() == name:
+                return relation
+        raise
+
+
+def _is_single(field):
+    return field.many_to_one or field.one_to_one
+
+
+def optimize_queryset(queryset, serializer, defer_fields=True):
+    """
+    Apply the serializer's query plan to ``queryset``.
+
+    Args:
+        queryset: Queryset the serializer will render
+        serializer: Serializer instance or ``ListSerializer``
+        defer_fields (bool): Restrict loaded columns with ``only()``
+
+    Returns:
+        QuerySet: Queryset with joins, prefetches and column restrictions
+    """
+    if isinstance(serializer, serializers.ListSerializer):
+        serializer = serializer.child
+
+    plan = plan_serializer(serializer, queryset.model)
+    return plan.apply(queryset, defer_fields=defer_fields)
+
+
+class AutoPrefetchMixin:
+    """
+    Generic view mixin optimizing ``get_queryset()`` for its serializer.
+
+    Columns are only restricted for safe methods so writes always see and
+    save complete rows.
+    """
+
+    def get_queryset(self):
+        return optimize_queryset(
+            super().get_queryset(),
+            self.get_serializer(),
+            defer_fields=self.request.method in SAFE_METHODS,
+        )
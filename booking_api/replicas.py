@@ -0,0 +1,135 @@
+"""
+Reads from a PostgreSQL replica, with read-your-writes stickiness.
+
+When ``DATABASE_REPLICA_URL`` is set, ``ReplicaRouter`` sends the reads of
+list and detail views (``NonAtomicReadsMixin``, ``AsyncReadView``) and of
+SMS actors to the ``replica`` alias. Everything else, and every write,
+stays on the primary.
+
+Replicas lag behind the primary. After a client writes,
+``ReadYourWritesMiddleware`` pins it to the primary with a cookie for
+``READ_YOUR_WRITES_SECONDS``, so staff see a booking in the calendar right
+after making it. Actors read from the replica once their message is older
+than that window and fall back to the primary for rows not replicated yet.
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS
+from dramatiq.middleware import CurrentMessage
+
+from user.cookies import COOKIE_DOMAIN, COOKIE_PATH, COOKIE_SAMESITE
+
+from .database import SAFE_METHODS
+
+REPLICA_DB_ALIAS = "replica"
+PIN_COOKIE = "pin_primary"
+
+_replica_reads = ContextVar("replica_reads", default=False)
+
+
+@contextmanager
+def replica_reads(enabled=True):
+    """Route the reads of the enclosed code to the replica, if ``enabled``."""
+    token = _replica_reads.set(enabled)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+def reads_from_replica(request):
+    """Whether ``request`` may read from the replica: safe and not pinned."""
+    return request.method in SAFE_METHODS and PIN_COOKIE not in request.COOKIES
+
+
+def message_reads_from_replica():
+    """
+    Whether the current dramatiq message may read from the replica.
+
+    Messages enqueued within ``READ_YOUR_WRITES_SECONDS`` usually follow the
+    write that enqueued them, which the replica may not have yet.
+    """
+    message = CurrentMessage.get_current_message()
+    if message is None:
+        return False
+    age = time.time() - message.message_timestamp / 1000
+    return age >= settings.READ_YOUR_WRITES_SECONDS
+
+
+def get_or_primary(queryset, **lookup):
+    """
+    ``queryset.get(**lookup)``, retried on the primary if the row is missing.
+
+    Raises:
+        DoesNotExist: If the primary has no such row either
+    """
+    try:
+        return queryset.get(**lookup)
+    except queryset.model.DoesNotExist:
+        if queryset.db == DEFAULT_DB_ALIAS:
+            raise
+    return queryset.using(DEFAULT_DB_ALIAS).get(**lookup)
+
+
+class ReplicaRouter:
+    """Database router sending reads to the replica inside ``replica_reads()``."""
+
+    def db_for_read(self, model, **hints):
+        if _replica_reads.get():
+            return REPLICA_DB_ALIAS
+        return None
+
+    def db_for_write(self, model, **hints):
+        # Rows read from the replica are saved to the primary too
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+class ReadYourWritesMiddleware:
+    """Pins clients to the primary for a while after a successful write."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.READ_YOUR_WRITES_SECONDS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        return self.pin(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.pin(request, await self.get_response(request))
+
+    def pin(self, request, response):
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            response.set_cookie(
+                PIN_COOKIE,
+                "1",
+                max_age=settings.READ_YOUR_WRITES_SECONDS,
+                # Sent cross-origin by the frontend, like the auth cookies
+                path=COOKIE_PATH,
+                domain=COOKIE_DOMAIN,
+                secure=True,
+                httponly=True,
+                samesite=COOKIE_SAMESITE,
+            )
+        return response
@@ -0,0 +1,346 @@
+"""
+Synthetic data for capacity testing, generated by ``seed_data --scale``.
+
+Every salon gets staff, customers and a year of appointment history plus
+bookings for the coming weeks, spread over opening hours the way a busy
+salon fills up: weekends and after-work slots first. Rows are written with
+``COPY`` on PostgreSQL (``bulk_create`` elsewhere) and never go through
+``Model.save()`` or signals, so no SMS is sent or scheduled. Customer
+statistics are recomputed once per salon instead.
+
+Each salon is generated from its own random stream derived from ``seed``,
+so the same seed yields the same data, relative to the anchor date.
+"""
+
+import io
+import random
+from datetime import datetime, time, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+from django.utils import timezone
+
+from address.models import Address
+from appointment.models import Appointment
+from customer.helpers import refresh_customer_stats
+from customer.models import Customer
+from salon.models import Salon
+from user.models import ExtendedUser
+
+SALON_NAME_PREFIX = "Scale Salon"
+STAFF_EMAIL_DOMAIN = "scale.example.com"
+
+HISTORY_DAYS = 365
+FUTURE_DAYS = 60
+# Share of customers who are also customers of a second salon
+SHARED_CUSTOMER_RATE = 0.03
+NO_SHOW_RATE = 0.04
+COMMENT_RATE = 0.1
+STATS_CHUNK_SIZE = 1000
+
+# Relative demand per weekday (Monday first) and per opening hour
+WEEKDAY_WEIGHTS = (0.8, 1.0, 1.0, 1.1, 1.3, 1.6, 0.4)
+HOUR_WEIGHTS = {
+    9: 0.6,
+    10: 0.9,
+    11: 1.0,
+    12: 1.2,
+    13: 1.1,
+    14: 0.9,
+    15: 0.9,
+    16: 1.1,
+    17: 1.4,
+    18: 1.3,
+}
+DURATIONS = (30, 45, 60, 90)
+DURATION_WEIGHTS = (3, 2, 4, 1)
+
+COMMENTS = (
+    "Gel polish",
+    "Prefers the window seat",
+    "Allergic to acetone",
+    "Running late",
+    "Brings a friend",
+)
+FIRST_NAMES = (
+    "Olivia", "Amelia", "Isla", "Ava", "Mia", "Grace", "Sophia", "Lily",
+    "Freya", "Emily", "Ella", "Poppy", "Chloe", "Ruby", "Evie", "Aisha",
+    "Noah", "Oliver", "George", "Leo", "Arthur", "Muhammad", "Harry", "Jack",
+    "Oscar", "Charlie", "Thomas", "Priya", "Mei", "Zofia",
+)  # fmt: skip
+LAST_NAMES = (
+    "Smith", "Jones", "Taylor", "Brown", "Williams", "Wilson", "Johnson",
+    "Davies", "Patel", "Robinson", "Wright", "Thompson", "Evans", "Walker",
+    "White", "Roberts", "Green", "Hall", "Wood", "Jackson", "Clarke", "Khan",
+    "Nguyen", "Kowalski", "Chen", "Murphy", "Hughes", "Edwards", "Lewis",
+    "Harris",
+)  # fmt: skip
+APPOINTMENT_FIELDS = (
+    "salon_id",
+    "user_id",
+    "customer_id",
+    "appointment_time",
+    "end_time",
+    "column_id",
+    "no_show",
+    "comment",
+    "task_id",
+    "created",
+    "modified",
+)
+CITIES = ("London", "Manchester", "Birmingham", "Leeds", "Bristol", "Glasgow")
+
+
+# Prefix and size of the block of phone numbers of each kind of row. Ofcom
+# keeps the 04 and 06 ranges unallocated, so no generated number can reach a
+# phone, and separate blocks keep the duplicate customer report clean.
+PHONE_NUMBER_RANGES = {
+    "salon": ("+4440", 10**8),
+    "staff": ("+4441", 10**8),
+    "customer": ("+446", 10**9),
+}
+
+
+def phone_number(kind, index):
+    """
+    The ``index``-th number of the block of ``kind`` rows.
+
+    Raises:
+        ValueError: If the block has fewer than ``index + 1`` numbers
+    """
+    prefix, size = PHONE_NUMBER_RANGES[kind]
+    if not 0 <= index < size:
+        raise ValueError(f"The {kind} phone numbers ({prefix}...) ran out at {index}")
+    # Ten digits after +44, like real UK numbers
+    return f"{prefix}{index:0{len(str(size - 1))}d}"
+
+
+class ScaleSeeder:
+    """
+    Generates ``salons`` salons with their staff, customers and appointments.
+
+    Args:
+        salons (int): Number of salons
+        staff_per_salon (int): Staff members per salon, the first one owner
+        customers_per_salon (int): Customers per salon
+        appointments_per_customer (float): Average appointments per customer
+        seed (int): Seed of the random streams
+        anchor (date): Day splitting history from upcoming bookings
+        password (str): Password of every generated staff member
+        use_copy (bool): Load rows with ``COPY`` instead of ``bulk_create``
+
+    Raises:
+        ValueError: If a block of phone numbers is too small for the rows
+    """
+
+    def __init__(
+        self,
+        salons,
+        staff_per_salon,
+        customers_per_salon,
+        appointments_per_customer,
+        seed,
+        anchor,
+        password,
+        use_copy,
+    ):
+        self.salons = salons
+        self.staff_per_salon = staff_per_salon
+        self.customers_per_salon = customers_per_salon
+        self.appointments_per_customer = appointments_per_customer
+        self.seed = seed
+        self.anchor = anchor
+        self.use_copy = use_copy and connection.vendor == "postgresql"
+        # Hashing is deliberately slow, so every staff member shares one hash
+        self.password_hash = make_password(password)
+        self.now = timezone.now()
+        self.days = [
+            anchor + timedelta(days=offset)
+            for offset in range(-HISTORY_DAYS, FUTURE_DAYS)
+        ]
+        self.day_weights = [WEEKDAY_WEIGHTS[day.weekday()] for day in self.days]
+
+        # Fail before writing anything rather than at the last salons
+        for kind, count in (
+            ("salon", salons),
+            ("staff", salons * staff_per_salon),
+            ("customer", salons * customers_per_salon),
+        ):
+            if count:
+                phone_number(kind, count - 1)
+
+    def exists(self):
+        return Salon.objects.filter(name__startswith=SALON_NAME_PREFIX).exists()
+
+    def run(self):
+        """
+        Generate every salon, one transaction each.
+
+        Yields:
+            tuple[int, int, int]: Salon number and the customers and
+                appointments written for it
+        """
+        salons = []
+        for number in range(1, self.salons + 1):
+            with transaction.atomic():
+                salon, customers, appointments = self.seed_salon(number, salons)
+            salons.append(salon)
+            yield number, customers, appointments
+
+    def seed_salon(self, number, previous_salons):
+        rng = random.Random(f"{self.seed}:{number}")
+
+        salon = Salon.objects.create(
+            name=f"{SALON_NAME_PREFIX} {number:04d}",
+            phone_number=phone_number("salon", number - 1),
+        )
+        salon.addresses.add(
+            Address.objects.create(
+                street=f"{rng.randint(1, 300)} High Street",
+                city=rng.choice(CITIES),
+                postal_code=f"SW{rng.randint(1, 20)} {rng.randint(1, 9)}AA",
+            )
+        )
+
+        staff = self.create_staff(salon, number, rng)
+        customers = self.create_customers(salon, number, previous_salons, rng)
+        appointments = self.create_appointments(salon, staff, customers, rng)
+
+        customer_ids = [customer.pk for customer in customers]
+        for start in range(0, len(customer_ids), STATS_CHUNK_SIZE):
+            refresh_customer_stats(customer_ids[start : start + STATS_CHUNK_SIZE])
+
+        return salon, len(customers), appointments
+
+    def create_staff(self, salon, number, rng):
+        staff = []
+        for index in range(self.staff_per_salon):
+            first_name, last_name = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            staff.append(
+                ExtendedUser(
+                    email=f"staff{number}.{index}@{STAFF_EMAIL_DOMAIN}",
+                    password=self.password_hash,
+                    first_name=first_name,
+                    last_name=last_name,
+                    full_name=f"{first_name} {last_name}",
+                    phone_number=phone_number(
+                        "staff", (number - 1) * self.staff_per_salon + index
+                    ),
+                    is_owner=index == 0,
+                )
+            )
+        staff = ExtendedUser.objects.bulk_create(staff)
+        salon.users.add(*staff)
+        return staff
+
+    def create_customers(self, salon, number, previous_salons, rng):
+        first_number = (number - 1) * self.customers_per_salon
+        customers = Customer.objects.bulk_create(
+            [
+                Customer(
+                    full_name=f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+                    phone_number=phone_number("customer", first_number + index),
+                )
+                for index in range(self.customers_per_salon)
+            ],
+            batch_size=5000,
+        )
+
+        memberships = [(customer.pk, salon.pk) for customer in customers]
+        if previous_salons:
+            memberships += [
+                (customer.pk, rng.choice(previous_salons).pk)
+                for customer in customers
+                if rng.random() < SHARED_CUSTOMER_RATE
+            ]
+        self.write(Customer.salons.through, ("customer_id", "salon_id"), memberships)
+        return customers
+
+    def create_appointments(self, salon, staff, customers, rng):
+        tz = timezone.get_current_timezone()
+        hours = list(HOUR_WEIGHTS)
+        hour_weights = list(HOUR_WEIGHTS.values())
+        # Geometric counts: most customers come a few times, regulars often
+        stop = 1 / (self.appointments_per_customer + 1)
+
+        rows = []
+        for customer in customers:
+            count = 0
+            while rng.random() >= stop:
+                count += 1
+            for day in rng.choices(self.days, self.day_weights, k=count):
+                column = rng.randrange(len(staff))
+                hour = rng.choices(hours, hour_weights)[0]
+                start = datetime.combine(
+                    day, time(hour, rng.choice((0, 15, 30, 45))), tzinfo=tz
+                )
+                duration = rng.choices(DURATIONS, DURATION_WEIGHTS)[0]
+                rows.append(
+                    (
+                        salon.pk,
+                        staff[column].pk,
+                        customer.pk,
+                        start,
+                        start + timedelta(minutes=duration),
+                        column + 1,
+                        start < self.now and rng.random() < NO_SHOW_RATE,
+                        rng.choice(COMMENTS) if rng.random() < COMMENT_RATE else "",
+                        "",
+                        self.now,
+                        self.now,
+                    )
+                )
+
+        self.write(Appointment, APPOINTMENT_FIELDS, rows)
+        return len(rows)
+
+    def write(self, model, fields, rows):
+        """
+        Insert ``rows`` without reading back their primary keys.
+
+        Args:
+            model (type[Model]): Model the rows belong to
+            fields (tuple[str]): Attribute names of the row values
+            rows (list[tuple]): Values in ``fields`` order
+        """
+        if not self.use_copy:
+            model.objects.bulk_create(
+                (model(**dict(zip(fields, row, strict=True))) for row in rows),
+                batch_size=5000,
+            )
+            return
+
+        buffer = io.StringIO()
+        for row in rows:
+            buffer.write("\t".join(map(copy_value, row)))
+            buffer.write("\n")
+        buffer.seek(0)
+
+        quote_name = connection.ops.quote_name
+        columns = ", ".join(
+            quote_name(model._meta.get_field(name).column) for name in fields
+        )
+        with connection.cursor() as cursor:
+            cursor.copy_expert(
+                f"COPY {quote_name(model._meta.db_table)} ({columns}) FROM STDIN",
+                buffer,
+            )
+
+
+def copy_value(value):
+    """``value`` in PostgreSQL's COPY text format."""
+    if isinstance(value, int) and not isinstance(value, bool):
+        return str(value)
+    if value is None:
+        return r"\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
@@ -0,0 +1,76 @@
+from django.utils.module_loading import import_string
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.relations import ManyRelatedField
+
+
+def parse_field_tree(value):
+    """
+    Parse ``id,salons.name,salons.addresses.city`` into a nested dict.
+
+    An empty dict means "every field" at that level.
+    """
+    tree = {}
+    for path in (value or "").split(","):
+        node = tree
+        for name in filter(None, path.strip().split(".")):
+            node = node.setdefault(name, {})
+    return tree
+
+
+class SparseFieldsMixin:
+    """
+    Serializer mixin applying ``?fields=`` and ``?expand=`` to GET requests.
+
+    ``fields`` keeps only the listed fields, using dotted names for nested
+    serializers (``?fields=id,full_name,salons.name``). ``expand`` renders
+    relations listed in ``Meta.expandable_fields`` as nested objects instead
+    of primary keys (``?expand=customer``). Nested serializers using the
+    mixin trim themselves by their position in the tree, so the prefetch
+    planner only loads what is actually rendered.
+    """
+
+    def get_fields(self):
+        fields = super().get_fields()
+
+        request = self.context.get("request")
+        if request is None or request.method not in SAFE_METHODS:
+            return fields
+
+        path = self.field_path()
+        expand = self.subtree(
+            parse_field_tree(request.query_params.get("expand")), path
+        )
+        expandable_fields = getattr(self.Meta, "expandable_fields", {})
+        for name in expand:
+            if name in expandable_fields and name in fields:
+                serializer_class = import_string(expandable_fields[name])
+                fields[name] = serializer_class(
+                    many=isinstance(fields[name], ManyRelatedField), read_only=True
+                )
+
+        requested = self.subtree(
+            parse_field_tree(request.query_params.get("fields")), path
+        )
+        if requested:
+            for name in list(fields):
+                if name not in requested:
+                    del fields[name]
+
+        return fields
+
+    def field_path(self):
+        """Field names leading from the root serializer to this one."""
+        names = []
+        node = self
+        while node.parent is not None:
+            # The child of a ListSerializer is bound with an empty name
+            if node.field_name:
+                names.append(node.field_name)
+            node = node.parent
+        return names[::-1]
+
+    @staticmethod
+    def subtree(tree, path):
+        for name in path:
+            tree = tree.get(name, {})
+        return tree
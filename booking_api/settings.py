@@ -11,11 +11,18 @@ https://docs.djangoproject.com/en/4.1/ref/settings/
 """
 
 import os
+import sys
 from datetime import timedelta
 
 import dj_database_url
 import environ
 
+from booking_api.database import (
+    DEFAULT_CONNECTION_MODES,
+    configure_connections,
+    detect_process_type,
+)
+
 env = environ.Env(
     # set casting, default value
     DEBUG=(bool, False),
@@ -34,6 +41,8 @@ environ.Env.read_env(os.path.join(BASE_DIR, ".env"))
 DEBUG = env("DEBUG")
 DEVELOPMENT_MODE = env("DEVELOPMENT_MODE")
 
+TESTING = sys.argv[1:2] == ["test"]
+
 # Raises Django's ImproperlyConfigured
 # exception if SECRET_KEY not in os.environ
 SECRET_KEY = env("DJANGO_SECRET_KEY")
@@ -68,6 +77,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "django_extensions",
     "rest_framework",
     "rest_framework.authtoken",
@@ -88,6 +98,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "booking_api.middleware.PerformanceMiddleware",
+    "booking_api.replicas.ReadYourWritesMiddleware",
+    "booking_api.compression.CompressionMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "allow_cidr.middleware.AllowCIDRMiddleware",
     "django.middleware.security.SecurityMiddleware",
@@ -130,6 +143,32 @@ DATABASE_URL = env("DATABASE_URL")
 DATABASES = {"default": dj_database_url.parse(DATABASE_URL)}
 DATABASES["default"]["ATOMIC_REQUESTS"] = True
 
+# Connection handling per process type: close, persistent or pool (see
+# booking_api.database)
+PROCESS_TYPE = detect_process_type()
+DB_CONNECTIONS = env("DB_CONNECTIONS", default=DEFAULT_CONNECTION_MODES[PROCESS_TYPE])
+DB_CONNECTION_OPTIONS = {
+    "max_age": env.int("DB_CONN_MAX_AGE", default=60),
+    "pool_min_size": env.int("DB_POOL_MIN_SIZE", default=2),
+    "pool_max_size": env.int("DB_POOL_MAX_SIZE", default=4),
+    "pool_timeout": env.float("DB_POOL_TIMEOUT", default=10),
+}
+configure_connections(DATABASES["default"], DB_CONNECTIONS, **DB_CONNECTION_OPTIONS)
+
+# Read replica for list and detail reads and SMS actors, with clients pinned
+# to the primary for a while after they write (see booking_api.replicas).
+# Tests read their own uncommitted rows, so they always use the primary.
+DATABASE_REPLICA_URL = env("DATABASE_REPLICA_URL", default=None)
+READ_YOUR_WRITES_SECONDS = 0
+if DATABASE_REPLICA_URL and not TESTING:
+    DATABASES["replica"] = configure_connections(
+        dj_database_url.parse(DATABASE_REPLICA_URL),
+        DB_CONNECTIONS,
+        **DB_CONNECTION_OPTIONS,
+    )
+    DATABASE_ROUTERS = ["booking_api.replicas.ReplicaRouter"]
+    READ_YOUR_WRITES_SECONDS = env.int("READ_YOUR_WRITES_SECONDS", default=10)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.1/ref/settings/#auth-password-validators
@@ -192,7 +231,17 @@ SIMPLE_JWT = {
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "dj_rest_auth.jwt_auth.JWTCookieAuthentication",
+        "user.authentication.CachedJWTCookieAuthentication",
+    ),
+    # orjson when installed, DRF's stdlib json otherwise
+    "DEFAULT_RENDERER_CLASSES": (
+        "booking_api.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ),
+    "DEFAULT_PARSER_CLASSES": (
+        "booking_api.renderers.FastJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
     ),
     # Pagination disabled to allow client-side filtering of all data
     # "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
@@ -207,7 +256,7 @@ REDIS_URL = os.environ.get("REDIS_URL")
 # Cache configuration using Redis
 CACHES = {
     "default": {
-        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "BACKEND": "booking_api.cache.InstrumentedRedisCache",
         "LOCATION": REDIS_URL,
         "KEY_PREFIX": "booking_api",
         "TIMEOUT": 300,  # 5 minutes default timeout
@@ -221,6 +270,8 @@ DRAMATIQ_BROKER = {
     },
     "MIDDLEWARE": [
         "dramatiq.middleware.Prometheus",
+        "booking_api.middleware.EnqueueMetricsMiddleware",
+        "dramatiq.middleware.CurrentMessage",
         "dramatiq.middleware.AgeLimit",
         "dramatiq.middleware.TimeLimit",
         "dramatiq.middleware.Callbacks",
@@ -230,8 +281,46 @@ DRAMATIQ_BROKER = {
     ],
 }
 
+# Messages enqueued by ``manage.py test`` or ``benchmark_sms`` must never
+# reach the workers of a running stack, which would send real SMS.
+DRAMATIQ_NAMESPACE = env("DRAMATIQ_NAMESPACE", default=None)
+if TESTING:
+    DRAMATIQ_NAMESPACE = "dramatiq-test"
+if DRAMATIQ_NAMESPACE:
+    DRAMATIQ_BROKER["OPTIONS"]["namespace"] = DRAMATIQ_NAMESPACE
+
+# Requests slower than this are logged as warnings, with their SQL for a
+# sample of them (see booking_api.middleware)
+PERFORMANCE_SLOW_REQUEST_MS = env.int("PERFORMANCE_SLOW_REQUEST_MS", default=500)
+PERFORMANCE_QUERY_SAMPLE_RATE = env.float("PERFORMANCE_QUERY_SAMPLE_RATE", default=0.1)
+# Server-Timing headers reveal query counts and timings to every client
+PERFORMANCE_SERVER_TIMING = env.bool("PERFORMANCE_SERVER_TIMING", default=DEBUG)
+
+# Smaller responses are sent uncompressed (see booking_api.compression)
+COMPRESSION_MIN_BYTES = env.int("COMPRESSION_MIN_BYTES", default=1024)
+
+# Bearer token required by /metrics/; without one it is only exposed in DEBUG
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN")
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        "booking_api.performance": {
+            "handlers": ["console"],
+            "level": "WARNING" if TESTING else "INFO",
+            "propagate": False,
+        },
+    },
+}
+
 TWILIO_ACCOUNT_SID = os.environ.get("TWILLIO_SID")
 TWILIO_AUTH_TOKEN = os.environ.get("TWILLIO_TOKEN")
 TWILIO_PHONE_NUMBER = os.environ.get("TWILIO_PHONE_NUMBER")
+# Base URL replacing https://api.twilio.com, e.g. scripts/fake_twilio.py
+TWILIO_API_URL = os.environ.get("TWILIO_API_URL")
 
 STATIC_ROOT = os.path.join(BASE_DIR, "static/")
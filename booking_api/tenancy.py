@@ -0,0 +1,136 @@
+"""
+Salon tenancy: which salons a caller belongs to and scoping views to them.
+
+Memberships are resolved once per request and cached per user, so scoping
+every queryset costs no extra query in the common case. Superusers are not
+restricted unless they ask for a salon with ``?salon=``.
+"""
+
+from django.core.cache import cache
+from django.db.models import Q
+from rest_framework.exceptions import PermissionDenied, ValidationError
+from rest_framework.permissions import IsAuthenticated
+
+MEMBERSHIP_CACHE_TIMEOUT = 300
+
+
+def membership_cache_key(user_id):
+    return f"user:{user_id}:salon-ids"
+
+
+def get_user_salon_ids(user):
+    """
+    Ids of the salons ``user`` belongs to.
+
+    Kept on the user object for the rest of the request and in the shared
+    cache until memberships change (see ``user.signals``).
+    """
+    if not user.is_authenticated:
+        return frozenset()
+
+    salon_ids = getattr(user, "_salon_ids", None)
+    if salon_ids is None:
+        key = membership_cache_key(user.pk)
+        salon_ids = cache.get(key)
+        if salon_ids is None:
+            salon_ids = frozenset(user.salons.values_list("pk", flat=True))
+            cache.set(key, salon_ids, MEMBERSHIP_CACHE_TIMEOUT)
+        user._salon_ids = salon_ids
+    return salon_ids
+
+
+async def aget_user_salon_ids(user):
+    """``get_user_salon_ids()`` for async views."""
+    if not user.is_authenticated:
+        return frozenset()
+
+    salon_ids = getattr(user, "_salon_ids", None)
+    if salon_ids is None:
+        key = membership_cache_key(user.pk)
+        salon_ids = await cache.aget(key)
+        if salon_ids is None:
+            salon_ids = frozenset(
+                [pk async for pk in user.salons.values_list("pk", flat=True)]
+            )
+            await cache.aset(key, salon_ids, MEMBERSHIP_CACHE_TIMEOUT)
+        user._salon_ids = salon_ids
+    return salon_ids
+
+
+class SalonScopedMixin:
+    """
+    Generic view mixin restricting rows to the caller's salons.
+
+    ``salon_field`` is the lookup from the view's model to its salon: a
+    foreign key (``salon``), a many-to-many field (``salons``) or ``pk`` for
+    salons themselves. Many-to-many memberships are matched with a subquery
+    on the through table so rows are never duplicated by the join.
+    """
+
+    permission_classes = (IsAuthenticated,)
+    salon_field = "salon"
+
+    def get_salon_ids(self):
+        """
+        Salons this request may read, narrowed by ``?salon=`` when given.
+
+        Returns:
+            set | None: Salon ids, or None when the caller is unrestricted
+        """
+        user = self.request.user
+        salon_id = self.request.query_params.get("salon")
+        if not salon_id:
+            return None if user.is_superuser else get_user_salon_ids(user)
+
+        try:
+            salon_id = int(salon_id)
+        except ValueError:
+            raise ValidationError({"salon": ["A valid integer is required."]}) from None
+        self.check_salon_access([salon_id])
+        return {salon_id}
+
+    def check_salon_access(self, salon_ids):
+        """Reject access to salons the caller is not a member of."""
+        user = self.request.user
+        if user.is_superuser:
+            return
+        if not set(salon_ids) <= get_user_salon_ids(user):
+            raise PermissionDenied("You are not a member of this salon.")
+
+    def salon_filter(self, salon_ids):
+        if self.salon_field == "pk":
+            return Q(pk__in=salon_ids)
+
+        field = self.queryset.model._meta.get_field(self.salon_field)
+        if not field.many_to_many:
+            return Q(**{f"{self.salon_field}__in": salon_ids})
+
+        through = field.remote_field.through
+        members = through.objects.filter(
+            **{f"{field.m2m_reverse_field_name()}__in": salon_ids}
+        ).values(field.m2m_field_name())
+        return Q(pk__in=members)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        salon_ids = self.get_salon_ids()
+        if salon_ids is None:
+            return queryset
+        return queryset.filter(self.salon_filter(salon_ids))
+
+    def get_written_salon_ids(self, serializer):
+        """Salons a create or update would attach the row to."""
+        value = serializer.validated_data.get(self.salon_field)
+        if value is None:
+            return []
+        if isinstance(value, list | tuple):
+            return [salon.pk for salon in value]
+        return [value.pk]
+
+    def perform_create(self, serializer):
+        self.check_salon_access(self.get_written_salon_ids(serializer))
+        super().perform_create(serializer)
+
+    def perform_update(self, serializer):
+        self.check_salon_access(self.get_written_salon_ids(serializer))
+        super().perform_update(serializer)
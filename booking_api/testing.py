@@ -0,0 +1,264 @@
+"""
+Helpers for the endpoint performance tests in each app's ``tests.py``.
+
+``PerformanceTestCase.assert_performance()`` sends a request several times
+and checks that:
+
+- it never runs more than a fixed number of SQL queries, and runs the same
+  number again once more rows exist, so N+1 patterns fail the suite;
+- its median latency stays within ``PERFORMANCE_TOLERANCE`` of the baseline
+  stored in ``performance_baselines.json``.
+
+Latency depends on the machine, so requests slower than that are only
+reported unless ``PERFORMANCE_CHECK_LATENCY=1`` is set, on the machine that
+recorded the baselines. Requests slower than ``PERFORMANCE_HARD_TOLERANCE``
+always fail, on any machine (CI included). Run ``UPDATE_PERFORMANCE_BASELINES=1 python manage.py test`` to
+record new baselines after an intended change.
+"""
+
+import functools
+import itertools
+import json
+import logging
+import os
+import statistics
+import time
+from datetime import timedelta
+from pathlib import Path
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from address.models import Address
+from appointment.models import Appointment
+from customer.helpers import refresh_customer_stats
+from customer.models import Customer
+from salon.helpers import clear_local_settings
+from salon.models import Salon
+from user.helpers import generate_tokens
+from user.models import ExtendedUser
+
+BASELINES_PATH = Path(__file__).with_name("performance_baselines.json")
+UPDATE_BASELINES = bool(os.environ.get("UPDATE_PERFORMANCE_BASELINES"))
+CHECK_LATENCY = bool(os.environ.get("PERFORMANCE_CHECK_LATENCY"))
+# Allowed slowdown as a ratio of the baseline, plus a fixed allowance so
+# timer noise on very fast endpoints does not fail the build
+TOLERANCE = float(os.environ.get("PERFORMANCE_TOLERANCE", "1.0"))
+# Allowed slowdown anywhere: wide enough for slow runners, narrow enough to
+# catch a lost index or an N+1 pattern on a large response
+HARD_TOLERANCE = float(os.environ.get("PERFORMANCE_HARD_TOLERANCE", "4.0"))
+SLACK_MS = 10
+RUNS = 5
+
+PASSWORD = "performance-test-password"
+
+# Ofcom's ranges reserved for drama, so no SMS ever reaches a real person:
+# 1000 numbers each, starting with 020 7946 0000
+DRAMA_NUMBER_PREFIXES = (
+    "+442079460",
+    "+441134960",
+    "+441144960",
+    "+441164960",
+    "+441174960",
+    "+441184960",
+    "+441214960",
+    "+441314960",
+    "+441414960",
+    "+441514960",
+    "+441614960",
+    "+442896496",
+    "+442920180",
+)
+
+logger = logging.getLogger("booking_api.performance")
+
+_sequence = itertools.count(1)
+_phone_numbers = (
+    f"{prefix}{number:03d}"
+    for prefix in DRAMA_NUMBER_PREFIXES
+    for number in range(1000)
+)
+
+
+def next_phone_number():
+    """A phone number no other call in this test run returns."""
+    try:
+        return next(_phone_numbers)
+    except StopIteration:
+        raise RuntimeError("All drama phone numbers are used") from None
+
+
+def create_salon(name="Test Salon", staff=2):
+    """A salon with one address and ``staff`` members."""
+    salon = Salon.objects.create(name=name, phone_number=next_phone_number())
+    salon.addresses.add(
+        Address.objects.create(
+            street="1 High Street", city="London", postal_code="SW1A 1AA"
+        )
+    )
+    add_staff(salon, staff)
+    return salon
+
+
+def add_staff(salon, count):
+    users = []
+    for _ in range(count):
+        number = next(_sequence)
+        users.append(
+            ExtendedUser.objects.create_user(
+                email=f"staff{number}@example.com",
+                password=PASSWORD,
+                phone_number=next_phone_number(),
+                first_name="Staff",
+                last_name=str(number),
+                full_name=f"Staff {number}",
+            )
+        )
+    salon.users.add(*users)
+    return users
+
+
+def add_customers(salon, count, appointments_per_customer=3):
+    """
+    Customers of ``salon``, each with one past and some upcoming appointments.
+
+    Rows are bulk created, so no SMS is scheduled.
+    """
+    customers = Customer.objects.bulk_create(
+        [
+            Customer(
+                full_name=f"Customer {next(_sequence)}",
+                phone_number=next_phone_number(),
+            )
+            for _ in range(count)
+        ]
+    )
+    Customer.salons.through.objects.bulk_create(
+        [
+            Customer.salons.through(customer=customer, salon=salon)
+            for customer in customers
+        ]
+    )
+
+    user = salon.users.first()
+    now = timezone.now()
+    Appointment.objects.bulk_create(
+        [
+            Appointment(
+                salon=salon,
+                user=user,
+                customer=customer,
+                appointment_time=now + timedelta(days=day, minutes=index),
+            )
+            for index, customer in enumerate(customers)
+            for day in range(-1, appointments_per_customer - 1)
+        ]
+    )
+    refresh_customer_stats([customer.pk for customer in customers])
+    return customers
+
+
+@functools.cache
+def load_baselines():
+    if not BASELINES_PATH.exists():
+        return {}
+    return json.loads(BASELINES_PATH.read_text())
+
+
+def save_baseline(name, median_ms):
+    baselines = load_baselines()
+    baselines[name] = round(median_ms, 2)
+    BASELINES_PATH.write_text(json.dumps(baselines, indent=2, sort_keys=True) + "\n")
+
+
+@override_settings(
+    # Never share cached users or memberships with a running stack
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+    PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"],
+)
+class PerformanceTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        clear_local_settings()
+
+    def authenticate(self, user):
+        token = generate_tokens(user)["access_token"]
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    def assert_performance(self, name, send, max_queries, grow=None, status=200):
+        """
+        Check the query count and latency of a request.
+
+        The request is sent once to warm caches (authenticated user, salon
+        settings), then ``RUNS`` times while measuring.
+
+        Args:
+            name (str): Key of the latency baseline
+            send (callable): Sends the request and returns the response
+            max_queries (int): Upper bound on SQL queries per request
+            grow (callable): Adds rows the response depends on; the query
+                count must not change afterwards
+            status (int): Expected response status code
+        """
+        self.send(send, status)
+
+        counts, timings = [], []
+        for _ in range(RUNS):
+            queries, elapsed = self.measure(send, status)
+            self.assertLessEqual(
+                len(queries),
+                max_queries,
+                f"{name} ran {len(queries)} queries:\n{self.format(queries)}",
+            )
+            counts.append(len(queries))
+            timings.append(elapsed)
+
+        if grow is not None:
+            grow()
+            queries, _ = self.measure(send, status)
+            self.assertEqual(
+                len(queries),
+                max(counts),
+                f"{name} query count grew with the data:\n{self.format(queries)}",
+            )
+
+        self.check_latency(name, statistics.median(timings) * 1000)
+
+    def measure(self, send, status):
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            self.send(send, status)
+            elapsed = time.perf_counter() - started
+        return queries.captured_queries, elapsed
+
+    def send(self, send, status):
+        response = send()
+        self.assertEqual(response.status_code, status, getattr(response, "data", None))
+        return response
+
+    def check_latency(self, name, median_ms):
+        if UPDATE_BASELINES:
+            save_baseline(name, median_ms)
+            return
+
+        baseline = load_baselines().get(name)
+        if baseline is None:
+            return
+        limit = baseline * (1 + TOLERANCE) + SLACK_MS
+        hard_limit = baseline * (1 + max(TOLERANCE, HARD_TOLERANCE)) + SLACK_MS
+        message = f"{name} took {median_ms:.1f}ms, baseline {baseline}ms"
+        self.assertLessEqual(
+            median_ms, hard_limit, f"{message} (limit {hard_limit:.1f}ms)"
+        )
+        if CHECK_LATENCY:
+            self.assertLessEqual(median_ms, limit, f"{message} (limit {limit:.1f}ms)")
+        elif median_ms > limit:
+            logger.warning("%s (limit %.1fms)", message, limit)
+
+    @staticmethod
+    def format(queries):
+        return "\n".join(query["sql"] for query in queries)
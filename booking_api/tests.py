@@ -0,0 +1,473 @@
+import gzip
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import uuid
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import ClassVar
+from unittest import mock
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured, MiddlewareNotUsed
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from phonenumber_field.phonenumber import PhoneNumber
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from booking_api import testing
+from booking_api.compression import CompressionMiddleware, negotiate_encoding
+from booking_api.database import configure_connections
+from booking_api.management.commands.bootstrap import unapplied_migrations
+from booking_api.management.commands.profile_startup import parse_importtime
+from booking_api.prefetch import plan_serializer
+from booking_api.renderers import FastJSONParser, FastJSONRenderer
+from booking_api.replicas import (
+    PIN_COOKIE,
+    ReadYourWritesMiddleware,
+    ReplicaRouter,
+    reads_from_replica,
+    replica_reads,
+)
+from booking_api.seeding import SALON_NAME_PREFIX, STAFF_EMAIL_DOMAIN, phone_number
+from booking_api.testing import (
+    PerformanceTestCase,
+    add_customers,
+    add_staff,
+    create_salon,
+    next_phone_number,
+)
+from customer.models import Customer
+from customer.serializers import CustomerSerializer
+from salon.models import Salon
+from user.models import ExtendedUser
+from user.serializers import UserSerializer
+
+
+class ServiceEndpointTests(PerformanceTestCase):
+    def test_root(self):
+        self.assert_performance("root", lambda: self.client.get("/"), max_queries=2)
+
+    def test_health(self):
+        self.assert_performance(
+            "health", lambda: self.client.get("/health/"), max_queries=2
+        )
+
+    @override_settings(METRICS_TOKEN="secret")
+    def test_metrics(self):
+        self.client.get("/health/")
+        response = self.client.get("/metrics/", HTTP_AUTHORIZATION="Bearer secret")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b"booking_http_request_duration_seconds", response.content)
+        self.assertIn(b"booking_db_connection_wait_seconds", response.content)
+
+    @override_settings(METRICS_TOKEN="secret")
+    def test_metrics_require_the_token(self):
+        response = self.client.get("/metrics/", HTTP_AUTHORIZATION="Bearer wrong")
+        self.assertEqual(response.status_code, 403)
+
+    @override_settings(METRICS_TOKEN=None)
+    def test_metrics_denied_without_a_token(self):
+        self.assertEqual(self.client.get("/metrics/").status_code, 403)
+        with self.settings(DEBUG=True):
+            self.assertEqual(self.client.get("/metrics/").status_code, 200)
+
+    @override_settings(PERFORMANCE_SERVER_TIMING=False)
+    def test_server_timing_hidden_by_default(self):
+        self.assertNotIn("Server-Timing", self.client.get("/health/"))
+
+    @override_settings(PERFORMANCE_SERVER_TIMING=True)
+    def test_server_timing(self):
+        response = self.client.get("/health/")
+        self.assertIn('desc="2 queries"', response["Server-Timing"])
+
+    def test_admin_redirects_to_login(self):
+        response = self.client.get("/admin/")
+        self.assertEqual(response.status_code, 302)
+
+
+class PrefetchQueryCountTests(PerformanceTestCase):
+    """
+    Exact query counts of the list and detail endpoints planned from their
+    serializers, which must not change as rows are added.
+    """
+
+    # Path (formatted with the fixtures below) and queries per request
+    ENDPOINTS: ClassVar[dict[str, int]] = {
+        "/customers/": 4,
+        "/customers/{customer}/": 4,
+        "/salons/": 3,
+        "/salons/{salon}/": 3,
+        "/users/": 3,
+        "/users/{user}/": 3,
+        "/users/{user}/?expand=salons": 4,
+        "/appointments/": 2,
+        "/appointments/{appointment}/": 2,
+        "/appointments/?expand=customer,salon,user": 7,
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.salon = create_salon()
+        cls.user = cls.salon.users.first()
+        cls.customer = add_customers(cls.salon, 3)[0]
+        cls.appointment = cls.customer.appointment_set.first()
+
+    def setUp(self):
+        super().setUp()
+        self.authenticate(self.user)
+
+    def grow(self):
+        add_customers(self.salon, 10)
+        add_staff(self.salon, 5)
+        self.salon.addresses.create(
+            street="2 High Street", city="London", postal_code="SW1A 1AB"
+        )
+        # Customers and staff of several salons
+        other_salon = create_salon(name="Other Salon")
+        other_salon.customers.add(*self.salon.customers.all())
+        other_salon.users.add(*self.salon.users.all())
+
+    def endpoints(self):
+        for path, queries in self.ENDPOINTS.items():
+            yield path.format(
+                customer=self.customer.pk,
+                salon=self.salon.pk,
+                user=self.user.pk,
+                appointment=self.appointment.pk,
+            ), queries
+
+    def assert_queries(self):
+        for url, queries in self.endpoints():
+            with self.subTest(url=url):
+                # Warms the cached user and salon settings
+                self.client.get(url)
+                with self.assertNumQueries(queries):
+                    response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+
+    def test_query_counts(self):
+        self.assert_queries()
+
+    def test_query_counts_do_not_grow_with_rows(self):
+        self.grow()
+        self.assert_queries()
+
+    def test_customer_plan(self):
+        plan = plan_serializer(CustomerSerializer(), Customer)
+        self.assertEqual(plan.select_related, [])
+        self.assertEqual(
+            [prefetch.prefetch_through for prefetch in plan.prefetch_related],
+            ["salons"],
+        )
+        salons = plan.prefetch_related[0].queryset
+        self.assertEqual(
+            [
+                prefetch.prefetch_through
+                for prefetch in salons._prefetch_related_lookups
+            ],
+            ["addresses"],
+        )
+
+    def test_user_plan_loads_only_rendered_columns(self):
+        plan = plan_serializer(UserSerializer(), ExtendedUser)
+        self.assertNotIn("password", plan.only)
+        self.assertIn("email", plan.only)
+        self.assertEqual(
+            [prefetch.prefetch_through for prefetch in plan.prefetch_related],
+            ["salons", "addresses"],
+        )
+        # Rendered as primary keys, so only those are loaded
+        salons = plan.prefetch_related[0].queryset
+        self.assertEqual(salons.model, Salon)
+        self.assertEqual(salons.query.deferred_loading, ({"id"}, False))
+
+
+class PerformanceTestCaseTests(PerformanceTestCase):
+    def test_phone_numbers_do_not_repeat(self):
+        numbers = [next_phone_number() for _ in range(1500)]
+        self.assertEqual(len(set(numbers)), len(numbers))
+        for number in (numbers[0], numbers[-1]):
+            self.assertTrue(PhoneNumber.from_string(number).is_valid())
+
+    def test_slow_requests_are_reported(self):
+        with (
+            mock.patch.object(testing, "load_baselines", return_value={"x": 10}),
+            self.assertLogs("booking_api.performance", "WARNING"),
+        ):
+            self.check_latency("x", 40)
+
+    def test_much_slower_requests_always_fail(self):
+        with (
+            mock.patch.object(testing, "load_baselines", return_value={"x": 10}),
+            self.assertRaises(AssertionError),
+        ):
+            self.check_latency("x", 100)
+
+    def test_slow_requests_fail_when_checking_latency(self):
+        with (
+            mock.patch.object(testing, "load_baselines", return_value={"x": 10}),
+            mock.patch.object(testing, "CHECK_LATENCY", True),
+            self.assertRaises(AssertionError),
+        ):
+            self.check_latency("x", 40)
+
+
+class ConnectionSettingsTests(SimpleTestCase):
+    def configure(self, mode, engine="django.db.backends.postgresql"):
+        return configure_connections(
+            {"ENGINE": engine, "OPTIONS": {}},
+            mode,
+            max_age=60,
+            pool_min_size=2,
+            pool_max_size=4,
+            pool_timeout=10,
+        )
+
+    def test_close(self):
+        database = self.configure("close")
+        self.assertEqual(database["ENGINE"], "booking_api.postgresql")
+        self.assertEqual(database["CONN_MAX_AGE"], 0)
+
+    def test_persistent(self):
+        database = self.configure("persistent")
+        self.assertEqual(database["CONN_MAX_AGE"], 60)
+        self.assertTrue(database["CONN_HEALTH_CHECKS"])
+
+    def test_pool_requires_postgresql(self):
+        with self.assertRaises(ImproperlyConfigured):
+            self.configure("pool", engine="django.db.backends.sqlite3")
+
+    def test_other_engines_are_kept(self):
+        database = self.configure("persistent", engine="django.db.backends.sqlite3")
+        self.assertEqual(database["ENGINE"], "django.db.backends.sqlite3")
+
+    def test_unknown_mode(self):
+        with self.assertRaises(ImproperlyConfigured):
+            self.configure("pooled")
+
+
+class ReplicaRoutingTests(SimpleTestCase):
+    factory = RequestFactory()
+
+    def test_router_reads_from_replica_only_when_asked(self):
+        router = ReplicaRouter()
+        self.assertIsNone(router.db_for_read(None))
+        with replica_reads():
+            self.assertEqual(router.db_for_read(None), "replica")
+            self.assertEqual(router.db_for_write(None), "default")
+        with replica_reads(False):
+            self.assertIsNone(router.db_for_read(None))
+
+    def test_router_migrates_primary_only(self):
+        router = ReplicaRouter()
+        self.assertTrue(router.allow_migrate("default", "appointment"))
+        self.assertFalse(router.allow_migrate("replica", "appointment"))
+
+    def test_pinned_and_unsafe_requests_read_from_primary(self):
+        self.assertTrue(reads_from_replica(self.factory.get("/appointments/")))
+        self.factory.cookies[PIN_COOKIE] = "1"
+        try:
+            self.assertFalse(reads_from_replica(self.factory.get("/appointments/")))
+        finally:
+            del self.factory.cookies[PIN_COOKIE]
+        self.assertFalse(reads_from_replica(self.factory.post("/appointments/")))
+
+    @override_settings(READ_YOUR_WRITES_SECONDS=10)
+    def test_writes_pin_the_client(self):
+        middleware = ReadYourWritesMiddleware(lambda request: HttpResponse(status=201))
+        response = middleware(self.factory.post("/appointments/"))
+        self.assertEqual(response.cookies[PIN_COOKIE]["max-age"], 10)
+
+        response = middleware(self.factory.get("/appointments/"))
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+    @override_settings(READ_YOUR_WRITES_SECONDS=10)
+    def test_failed_writes_do_not_pin(self):
+        middleware = ReadYourWritesMiddleware(lambda request: HttpResponse(status=400))
+        response = middleware(self.factory.post("/appointments/"))
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+    @override_settings(READ_YOUR_WRITES_SECONDS=0)
+    def test_middleware_unused_without_replica(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            ReadYourWritesMiddleware(lambda request: HttpResponse())
+
+
+class RenderingTests(SimpleTestCase):
+    data: ClassVar[dict] = {
+        "id": uuid.UUID("12345678-1234-5678-1234-567812345678"),
+        "start": datetime(2024, 5, 1, 9, 30, 0, 250, tzinfo=timezone.utc),
+        "local": datetime(2024, 5, 1, 9, 30, tzinfo=timezone(timedelta(hours=1))),
+        "price": Decimal("12.50"),
+        "notes": "Café\u2028upstairs",
+        "rows": [1, 2.5, None, True, ("a", "b")],
+        7: "int key",
+    }
+
+    def test_renders_like_drf(self):
+        self.assertEqual(
+            FastJSONRenderer().render(self.data), JSONRenderer().render(self.data)
+        )
+
+    def test_phone_numbers(self):
+        phone_number = PhoneNumber.from_string("+447700900123")
+        self.assertEqual(
+            FastJSONRenderer().render({"phone_number": phone_number}),
+            f'{{"phone_number":"{phone_number}"}}'.encode(),
+        )
+
+    def test_indented_output_falls_back(self):
+        self.assertEqual(
+            FastJSONRenderer().render({"a": 1}, "application/json; indent=2"),
+            b'{\n  "a": 1\n}',
+        )
+
+    def test_parses_like_drf(self):
+        content = JSONRenderer().render(self.data)
+        self.assertEqual(
+            FastJSONParser().parse(io.BytesIO(content)),
+            JSONParser().parse(io.BytesIO(content)),
+        )
+
+    def test_parse_error(self):
+        with self.assertRaises(ParseError):
+            FastJSONParser().parse(io.BytesIO(b'{"a": NaN}'))
+
+
+@override_settings(COMPRESSION_MIN_BYTES=100)
+class CompressionTests(SimpleTestCase):
+    factory = RequestFactory()
+    content = b'{"full_name":"Customer"}' * 20
+
+    def compress(self, accept_encoding, response=None):
+        middleware = CompressionMiddleware(
+            lambda request: response or HttpResponse(self.content)
+        )
+        return middleware(self.factory.get("/", HTTP_ACCEPT_ENCODING=accept_encoding))
+
+    def test_negotiation(self):
+        encodings = ("br", "gzip")
+        self.assertEqual(negotiate_encoding("gzip, deflate, br", encodings), "br")
+        self.assertEqual(negotiate_encoding("br;q=0.5, gzip", encodings), "gzip")
+        self.assertEqual(negotiate_encoding("*", encodings), "br")
+        self.assertEqual(negotiate_encoding("*, br;q=0", encodings), "gzip")
+        self.assertIsNone(negotiate_encoding("identity", encodings))
+        self.assertIsNone(negotiate_encoding("", encodings))
+
+    def test_gzip(self):
+        response = self.compress("gzip")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(response["Vary"], "Accept-Encoding")
+        self.assertEqual(int(response["Content-Length"]), len(response.content))
+        self.assertEqual(gzip.decompress(response.content), self.content)
+
+    def test_identity(self):
+        response = self.compress("identity")
+        self.assertFalse(response.has_header("Content-Encoding"))
+        self.assertEqual(response["Vary"], "Accept-Encoding")
+        self.assertEqual(response.content, self.content)
+
+    def test_small_responses_are_not_compressed(self):
+        response = self.compress("gzip", HttpResponse(b"{}"))
+        self.assertFalse(response.has_header("Content-Encoding"))
+
+    def test_responses_setting_cookies_are_not_compressed(self):
+        response = HttpResponse(self.content)
+        response.set_cookie("token", "secret")
+        self.assertFalse(self.compress("gzip", response).has_header("Content-Encoding"))
+
+    def test_strong_etags_are_weakened(self):
+        response = HttpResponse(self.content)
+        response["ETag"] = '"abc"'
+        self.assertEqual(self.compress("gzip", response)["ETag"], 'W/"abc"')
+
+
+class StartupTests(TestCase):
+    def test_parse_importtime(self):
+        output = (
+            "import time: self [us] | cumulative | imported package\n"
+            "import time:       120 |        120 |     _io\n"
+            "import time:      2189 |      45180 | django.db.models\n"
+        )
+        self.assertEqual(
+            parse_importtime(output),
+            [("_io", 120, 120), ("django.db.models", 2189, 45180)],
+        )
+
+    def test_migrations_are_current(self):
+        self.assertEqual(unapplied_migrations(), [])
+
+    def test_seed_data_skipped_when_current(self):
+        call_command("seed_data", stdout=io.StringIO())
+        stdout = io.StringIO()
+        with self.assertNumQueries(1):
+            call_command("seed_data", skip_if_current=True, stdout=stdout)
+        self.assertIn("Seed data is current", stdout.getvalue())
+
+
+class ScaleSeedingTests(TestCase):
+    def seed(self, **options):
+        options = {
+            "scale": 2,
+            "staff_per_salon": 2,
+            "customers_per_salon": 3,
+            "appointments_per_customer": 1,
+            **options,
+        }
+        call_command("seed_data", stdout=io.StringIO(), **options)
+
+    def test_phone_numbers_are_distinct_and_not_dialable(self):
+        self.seed()
+
+        numbers = [
+            *Salon.objects.filter(name__startswith=SALON_NAME_PREFIX),
+            *ExtendedUser.objects.filter(email__endswith=STAFF_EMAIL_DOMAIN),
+            *Customer.objects.all(),
+        ]
+        numbers = [str(row.phone_number) for row in numbers]
+        self.assertEqual(len(numbers), 2 + 4 + 6)
+        self.assertEqual(len(set(numbers)), len(numbers))
+        for number in numbers:
+            self.assertFalse(PhoneNumber.from_string(number).is_valid(), number)
+
+    def test_too_many_rows_fail_before_seeding(self):
+        with self.assertRaisesMessage(CommandError, "customer phone numbers"):
+            self.seed(customers_per_salon=10**9)
+        self.assertFalse(Salon.objects.exists())
+
+    def test_phone_number_ranges_do_not_wrap(self):
+        self.assertEqual(phone_number("staff", 0), "+444100000000")
+        self.assertEqual(phone_number("customer", 10**9 - 1), "+446999999999")
+        with self.assertRaises(ValueError):
+            phone_number("salon", 10**8)
+
+
+class CommandMetricsTests(TestCase):
+    def test_commands_run_without_the_multiprocess_directory(self):
+        # The image used to set the variable for processes that never create it
+        database = connection.settings_dict
+        env = {
+            **os.environ,
+            "PROMETHEUS_MULTIPROC_DIR": os.path.join(tempfile.mkdtemp(), "missing"),
+            "DATABASE_URL": (
+                f"postgresql://{quote(database['USER'])}:"
+                f"{quote(database['PASSWORD'] or '')}@{database['HOST']}:"
+                f"{database['PORT']}/{database['NAME']}"
+            ),
+        }
+        result = subprocess.run(
+            [sys.executable, "manage.py", "showmigrations", "--plan"],
+            cwd=settings.BASE_DIR,
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+        self.assertEqual(result.returncode, 0, result.stderr)
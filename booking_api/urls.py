@@ -17,9 +17,9 @@ Including another URLconf
 from django.contrib import admin
 from django.http import JsonResponse
 from django.urls import include, path
-from rest_framework_simplejwt.views import (
-    TokenRefreshView,
-)
+
+from booking_api.metrics import metrics_view
+from user.views import RevocableTokenRefreshView
 
 
 def health_check(request):
@@ -36,8 +36,9 @@ urlpatterns = [
     path("", root, name="root"),
     path("admin/", admin.site.urls),
     path("health/", health_check, name="health_check"),
+    path("metrics/", metrics_view, name="metrics"),
     path("users/", include("user.urls")),
-    path("token/refresh/", TokenRefreshView.as_view(), name="token_refresh"),
+    path("token/refresh/", RevocableTokenRefreshView.as_view(), name="token_refresh"),
     path("salons/", include("salon.urls")),
     path("appointments/", include("appointment.urls")),
     path("customers/", include("customer.urls")),
@@ -12,5 +12,7 @@ import os
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'booking_api.settings')
+# Selects how database connections are held (see booking_api.database)
+os.environ.setdefault('PROCESS_TYPE', 'web')
 
 application = get_wsgi_application()
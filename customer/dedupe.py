@@ -0,0 +1,161 @@
+"""
+Duplicate customer detection and bulk merge.
+
+Customers sharing a phone number are bucketed in the database, split
+further by a hash of their normalized name unless only phone numbers are to
+be compared, and merged into the oldest record with set-based UPDATEs so
+large tables never have to fit in memory.
+"""
+
+import hashlib
+import re
+import unicodedata
+from collections import defaultdict
+from typing import NamedTuple
+
+from django.contrib.postgres.aggregates import ArrayAgg
+from django.db import transaction
+from django.db.models import Case, Count, Value, When
+from django.utils import timezone
+
+from .helpers import refresh_customer_stats
+from .models import Customer
+
+
+def normalize_name(name):
+    """Case, accent, punctuation and word-order insensitive form of a name."""
+    ascii_name = (
+        unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode("ascii")
+    )
+    return " ".join(sorted(re.findall(r"[a-z]+", ascii_name.lower())))
+
+
+def name_hash(name):
+    return hashlib.blake2b(normalize_name(name).encode(), digest_size=8).hexdigest()
+
+
+class Cluster(NamedTuple):
+    phone_number: str
+    # (pk, full_name) pairs, oldest customer first
+    members: list
+
+    @property
+    def survivor_id(self):
+        return self.members[0][0]
+
+    @property
+    def duplicate_ids(self):
+        return [pk for pk, _ in self.members[1:]]
+
+    @property
+    def full_name(self):
+        """Name kept on the survivor: its own, else the first non-blank one."""
+        return next((name for _, name in self.members if name), "")
+
+
+def iter_clusters(match_names=True, chunk_size=1000):
+    """
+    Yield clusters of duplicate customers.
+
+    Args:
+        match_names (bool): Only treat customers as duplicates when their
+            normalized names match too. Family members often share a phone
+            number, so comparing phone numbers alone may merge different
+            people
+        chunk_size (int): Number of phone groups fetched per round trip
+
+    Yields:
+        Cluster: Customers considered the same person
+    """
+    groups = (
+        Customer.objects.exclude(phone_number="")
+        .values("phone_number")
+        .annotate(
+            size=Count("pk"),
+            ids=ArrayAgg("pk", ordering="pk"),
+            names=ArrayAgg("full_name", ordering="pk"),
+        )
+        .filter(size__gt=1)
+        .order_by("phone_number")
+    )
+
+    for group in groups.iterator(chunk_size=chunk_size):
+        members = list(zip(group["ids"], group["names"], strict=True))
+
+        if not match_names:
+            yield Cluster(str(group["phone_number"]), members)
+            continue
+
+        buckets = defaultdict(list)
+        for pk, name in members:
+            buckets[name_hash(name)].append((pk, name))
+        for bucket in buckets.values():
+            if len(bucket) > 1:
+                yield Cluster(str(group["phone_number"]), bucket)
+
+
+def merge_clusters(clusters):
+    """
+    Merge each cluster's duplicates into its survivor.
+
+    Appointments and salon memberships are re-pointed with one statement
+    each for the whole batch, then the duplicates are deleted.
+
+    Args:
+        clusters (list[Cluster]): Clusters to merge in one transaction
+
+    Returns:
+        int: Number of duplicate customers removed
+    """
+    survivors = {
+        duplicate_id: cluster.survivor_id
+        for cluster in clusters
+        for duplicate_id in cluster.duplicate_ids
+    }
+    if not survivors:
+        return 0
+
+    from appointment.models import Appointment
+
+    through = Customer.salons.through
+
+    with transaction.atomic():
+        Appointment.objects.filter(customer_id__in=survivors).update(
+            customer_id=Case(
+                *(
+                    When(customer_id=duplicate_id, then=Value(survivor_id))
+                    for duplicate_id, survivor_id in survivors.items()
+                )
+            ),
+            # Lets conditional GETs see the appointments changed
+            modified=timezone.now(),
+        )
+
+        memberships = through.objects.filter(customer_id__in=survivors)
+        through.objects.bulk_create(
+            [
+                through(customer_id=survivors[customer_id], salon_id=salon_id)
+                for customer_id, salon_id in memberships.values_list(
+                    "customer_id", "salon_id"
+                )
+            ],
+            ignore_conflicts=True,
+        )
+        memberships.delete()
+
+        Customer.objects.bulk_update(
+            [
+                Customer(pk=cluster.survivor_id, full_name=cluster.full_name)
+                for cluster in clusters
+                if cluster.full_name != cluster.members[0][1]
+            ],
+            ["full_name"],
+        )
+        survivor_ids = {cluster.survivor_id for cluster in clusters}
+        Customer.objects.filter(pk__in=survivor_ids).update(modified=timezone.now())
+        Customer.objects.filter(pk__in=survivors).delete()
+
+        # The survivors took over the duplicates' appointments
+        refresh_customer_stats(survivor_ids)
+
+    return len(survivors)
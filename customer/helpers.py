@@ -0,0 +1,177 @@
+import re
+
+from django.contrib.postgres.search import TrigramSimilarity
+from django.db import router, transaction
+from django.db.models import Count, Max, Min, Q
+from django.db.models.functions import Collate, Upper
+from django.utils import timezone
+
+from .models import Customer, CustomerStats
+
+# Trigram indexes can only serve patterns of at least three characters
+MIN_SEARCH_LENGTH = 3
+
+# Matches the ``customer_name_prefix`` index; the "C" collation lets Postgres
+# answer both the prefix filter and the ordering from one btree range scan.
+NAME_KEY = Collate(Upper('full_name'), 'C')
+
+
+def normalize_phone_digits(term):
+    """
+    Digits to look for inside stored E.164 phone numbers.
+
+    Numbers are stored as ``+44...`` (see ``PhoneNumberField(region="GB")``),
+    so a national number typed as ``07700 900`` becomes ``7700900``.
+    """
+    digits = re.sub(r"\D", "", term)
+    if digits.startswith("0"):
+        digits = digits[1:]
+    return digits
+
+
+def search_customers(queryset, term, limit):
+    """
+    Return up to ``limit`` customers matching ``term`` by name or phone.
+
+    Prefix matches are served first, ordered by name. Only when there are
+    not enough of them are substring matches added, closest names first, so
+    broad terms never rank thousands of rows by similarity.
+    """
+    # Written as a range rather than startswith, whose ::text cast would drop
+    # the collation and with it the index.
+    name_prefix = term.upper()
+    prefix_match = Q(
+        name_key__gte=name_prefix,
+        name_key__lt=name_prefix[:-1] + chr(ord(name_prefix[-1]) + 1),
+    )
+    substring_match = Q(full_name__icontains=term)
+
+    digits = normalize_phone_digits(term)
+    if len(digits) >= MIN_SEARCH_LENGTH:
+        prefix_match |= Q(phone_number__startswith=f"+44{digits}")
+        prefix_match |= Q(phone_number__startswith=f"+{digits}")
+        substring_match |= Q(phone_number__contains=digits)
+
+    customers = list(
+        queryset.annotate(name_key=NAME_KEY)
+        .filter(prefix_match)
+        .order_by('name_key', 'id')[:limit]
+    )
+    if len(customers) >= limit or len(term) < MIN_SEARCH_LENGTH:
+        return customers
+
+    customers += (
+        queryset.filter(substring_match)
+        .exclude(pk__in=[customer.pk for customer in customers])
+        .annotate(similarity=TrigramSimilarity(Upper('full_name'), term.upper()))
+        .order_by('-similarity', NAME_KEY, 'id')[: limit - len(customers)]
+    )
+    return customers
+
+
+def refresh_customer_stats(customer_ids):
+    """
+    Recompute visit statistics for ``customer_ids`` in one aggregate query.
+
+    The customers are locked first, so concurrent refreshes of a customer run
+    one after the other and the last one counts every committed appointment,
+    rather than an older aggregate overwriting a newer one.
+
+    Args:
+        customer_ids (Iterable[int]): Customers whose appointments changed
+
+    Returns:
+        list[CustomerStats]: The rows written
+    """
+    customer_ids = set(customer_ids)
+    if not customer_ids:
+        return []
+
+    using = router.db_for_write(CustomerStats)
+    with transaction.atomic(using=using):
+        # Ordered so concurrent refreshes lock shared customers in one order.
+        # Customers deleted meanwhile are skipped.
+        customer_ids = set(
+            Customer.objects.using(using)
+            .select_for_update()
+            .filter(pk__in=customer_ids)
+            .order_by('pk')
+            .values_list('pk', flat=True)
+        )
+        return _write_customer_stats(customer_ids, using)
+
+
+def _write_customer_stats(customer_ids, using):
+    return CustomerStats.objects.using(using).bulk_create(
+        aggregate_customer_stats(customer_ids, using),
+        update_conflicts=True,
+        unique_fields=['customer'],
+        update_fields=[
+            'visit_count',
+            'no_show_count',
+            'upcoming_count',
+            'last_visit',
+            'next_appointment',
+            'refreshed',
+        ],
+    )
+
+
+def aggregate_customer_stats(customer_ids, using=None):
+    """
+    Compute visit statistics for ``customer_ids`` without saving them.
+
+    Returns:
+        list[CustomerStats]: Unsaved rows, one per customer
+    """
+    from appointment.models import Appointment
+
+    now = timezone.now()
+    past = Q(appointment_time__lte=now)
+    upcoming = Q(appointment_time__gt=now)
+    visited = past & Q(no_show=False)
+
+    rows = {
+        row['customer_id']: row
+        for row in Appointment.objects.using(using)
+        .filter(customer_id__in=customer_ids)
+        .values('customer_id')
+        .annotate(
+            visit_count=Count('pk', filter=visited),
+            no_show_count=Count('pk', filter=Q(no_show=True)),
+            upcoming_count=Count('pk', filter=upcoming),
+            last_visit=Max('appointment_time', filter=visited),
+            next_appointment=Min('appointment_time', filter=upcoming),
+        )
+        .order_by()
+    }
+
+    return [
+        CustomerStats(
+            customer_id=customer_id,
+            **{
+                key: value
+                for key, value in rows.get(customer_id, {}).items()
+                if key != 'customer_id'
+            },
+        )
+        for customer_id in customer_ids
+    ]
+
+
+def get_customer_stats(customer_id):
+    """
+    Return the statistics of a customer without writing.
+
+    The stored row is used unless its next appointment has passed since it
+    was written; the figures are then aggregated from the appointments
+    instead. Appointment writes and ``recompute_customer_stats`` bring the
+    row up to date.
+
+    Returns:
+        CustomerStats: Possibly unsaved
+    """
+    stats = CustomerStats.objects.filter(customer_id=customer_id).first()
+    if stats is None or stats.is_stale(timezone.now()):
+        [stats] = aggregate_customer_stats([customer_id])
+    return stats
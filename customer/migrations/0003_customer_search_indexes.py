@@ -0,0 +1,47 @@
+# Generated by Django 5.2 on 2026-10-19 16:17
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.comparison
+import django.db.models.functions.text
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer', '0002_initial'),
+        ('salon', '0002_add_sms_settings'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(
+                django.db.models.functions.comparison.Collate(
+                    django.db.models.functions.text.Upper('full_name'), 'C'
+                ),
+                name='customer_name_prefix',
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=django.contrib.postgres.indexes.GinIndex(
+                django.contrib.postgres.indexes.OpClass(
+                    django.db.models.functions.text.Upper('full_name'),
+                    name='gin_trgm_ops',
+                ),
+                name='customer_full_name_trgm',
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=django.contrib.postgres.indexes.GinIndex(
+                django.contrib.postgres.indexes.OpClass(
+                    'phone_number', name='gin_trgm_ops'
+                ),
+                name='customer_phone_trgm',
+            ),
+        ),
+    ]
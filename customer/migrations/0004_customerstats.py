@@ -0,0 +1,35 @@
+# Generated by Django 5.2 on 2026-10-19 16:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer', '0003_customer_search_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CustomerStats',
+            fields=[
+                (
+                    'customer',
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name='stats',
+                        serialize=False,
+                        to='customer.customer',
+                    ),
+                ),
+                ('visit_count', models.PositiveIntegerField(default=0)),
+                ('no_show_count', models.PositiveIntegerField(default=0)),
+                ('upcoming_count', models.PositiveIntegerField(default=0)),
+                ('last_visit', models.DateTimeField(blank=True, null=True)),
+                ('next_appointment', models.DateTimeField(blank=True, null=True)),
+                ('refreshed', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
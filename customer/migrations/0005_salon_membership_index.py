@@ -0,0 +1,25 @@
+# Generated by Django 5.2 on 2026-10-19 16:29
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """
+    Salon-scoped customer queries look members up by salon. The implicit
+    through table only has single-column indexes, so this one lets Postgres
+    answer the membership subquery with an index-only scan.
+    """
+
+    dependencies = [
+        ('customer', '0004_customerstats'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql=(
+                'CREATE INDEX IF NOT EXISTS customer_salons_salon_customer '
+                'ON customer_customer_salons (salon_id, customer_id);'
+            ),
+            reverse_sql='DROP INDEX IF EXISTS customer_salons_salon_customer;',
+        ),
+    ]
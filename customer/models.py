@@ -1,4 +1,6 @@
+from django.contrib.postgres.indexes import GinIndex, OpClass
 from django.db import models
+from django.db.models.functions import Collate, Upper
 from django_extensions.db.models import TimeStampedModel
 
 from booking_api.models import CommonInfo
@@ -10,5 +12,46 @@ class Customer(CommonInfo, TimeStampedModel):
     full_name = models.CharField(max_length=150, blank=True)
     salons = models.ManyToManyField(Salon, related_name='customers')
 
+    class Meta:
+        indexes = (
+            # Typeahead search (?q=): prefix matches use the btree index,
+            # substring matches the trigram indexes.
+            models.Index(
+                Collate(Upper('full_name'), 'C'),
+                name='customer_name_prefix',
+            ),
+            GinIndex(
+                OpClass(Upper('full_name'), name='gin_trgm_ops'),
+                name='customer_full_name_trgm',
+            ),
+            GinIndex(
+                OpClass('phone_number', name='gin_trgm_ops'),
+                name='customer_phone_trgm',
+            ),
+        )
+
     def __str__(self):
         return self.full_name or str(self.phone_number)
+
+
+class CustomerStats(models.Model):
+    """
+    Visit statistics of a customer, kept in sync by appointment writes.
+
+    Lets the customer summary be served from a single row instead of
+    aggregating the customer's appointments on every request.
+    """
+
+    customer = models.OneToOneField(
+        Customer, on_delete=models.CASCADE, primary_key=True, related_name='stats'
+    )
+    visit_count = models.PositiveIntegerField(default=0)
+    no_show_count = models.PositiveIntegerField(default=0)
+    upcoming_count = models.PositiveIntegerField(default=0)
+    last_visit = models.DateTimeField(blank=True, null=True)
+    next_appointment = models.DateTimeField(blank=True, null=True)
+    refreshed = models.DateTimeField(auto_now=True)
+
+    def is_stale(self, now):
+        """The next appointment has passed and turned into a visit."""
+        return self.next_appointment is not None and self.next_appointment <= now
@@ -3,12 +3,14 @@ from typing import ClassVar
 from phonenumber_field.serializerfields import PhoneNumberField
 from rest_framework import serializers
 
+from booking_api.serializers import SparseFieldsMixin
+from booking_api.tenancy import get_user_salon_ids
 from salon.serializers import SalonSerializer
 
-from .models import Customer
+from .models import Customer, CustomerStats
 
 
-class CustomerSerializer(serializers.ModelSerializer):
+class CustomerSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     phone_number = PhoneNumberField(region="GB")
     salons = SalonSerializer(many=True, read_only=True)
     salon_ids = serializers.PrimaryKeyRelatedField(
@@ -58,6 +60,32 @@ class CustomerSerializer(serializers.ModelSerializer):
         instance.save()
 
         if salons is not None:
-            instance.salons.set(salons)
+            instance.salons.set(salons + self.hidden_salons(instance))
 
         return instance
+
+    def hidden_salons(self, instance):
+        """
+        Salons of ``instance`` the caller is not a member of.
+
+        A customer shared with another salon keeps that membership whatever
+        the caller sends, since it is not theirs to drop.
+        """
+        request = self.context.get('request')
+        if request is None or request.user.is_superuser:
+            return []
+        salon_ids = get_user_salon_ids(request.user)
+        return [salon for salon in instance.salons.all() if salon.pk not in salon_ids]
+
+
+class CustomerSummarySerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    class Meta:
+        model = CustomerStats
+        fields: ClassVar[list[str]] = [
+            'customer',
+            'visit_count',
+            'no_show_count',
+            'upcoming_count',
+            'last_visit',
+            'next_appointment',
+        ]
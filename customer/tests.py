@@ -0,0 +1,276 @@
+import gzip
+import io
+import json
+from datetime import timedelta
+
+from django.core.management import call_command
+from django.utils import timezone
+
+from appointment.models import Appointment
+from booking_api.testing import (
+    PerformanceTestCase,
+    add_customers,
+    create_salon,
+    next_phone_number,
+)
+
+from .dedupe import Cluster, iter_clusters, merge_clusters
+from .models import Customer, CustomerStats
+
+
+class CustomerEndpointTests(PerformanceTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.salon = create_salon()
+        cls.user = cls.salon.users.first()
+        cls.customer = add_customers(cls.salon, 5)[0]
+
+        cls.other_salon = create_salon(name="Other Salon")
+        cls.other_customer = add_customers(cls.other_salon, 1)[0]
+
+    def setUp(self):
+        super().setUp()
+        self.authenticate(self.user)
+
+    def grow(self):
+        add_customers(self.salon, 20)
+
+    def test_list(self):
+        self.assert_performance(
+            "customers.list",
+            lambda: self.client.get("/customers/"),
+            max_queries=4,
+            grow=self.grow,
+        )
+
+    def test_list_not_modified(self):
+        etag = self.client.get("/customers/")["ETag"]
+        self.assert_performance(
+            "customers.list_not_modified",
+            lambda: self.client.get("/customers/", HTTP_IF_NONE_MATCH=etag),
+            max_queries=1,
+            status=304,
+        )
+
+    def test_list_compressed(self):
+        response = self.client.get("/customers/", HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(
+            json.loads(gzip.decompress(response.content)),
+            self.client.get("/customers/").json(),
+        )
+
+    def test_list_etag_follows_memberships(self):
+        etag = self.client.get("/customers/")["ETag"]
+        self.customer.salons.add(self.other_salon)
+        response = self.client.get("/customers/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_list_sparse_fields(self):
+        self.assert_performance(
+            "customers.list_sparse",
+            lambda: self.client.get("/customers/?fields=id,full_name"),
+            max_queries=2,
+            grow=self.grow,
+        )
+
+    def test_search(self):
+        # Bounded rather than constant: substring matches are only queried
+        # when there are too few prefix matches
+        self.assert_performance(
+            "customers.search",
+            lambda: self.client.get("/customers/?q=Customer"),
+            max_queries=5,
+        )
+
+    def test_list_async(self):
+        self.assert_performance(
+            "customers.list_async",
+            lambda: self.client.get("/customers/async/"),
+            max_queries=4,
+            grow=self.grow,
+        )
+
+    def test_search_async(self):
+        self.assert_performance(
+            "customers.search_async",
+            lambda: self.client.get("/customers/async/?q=Customer"),
+            max_queries=4,
+        )
+
+    def test_async_list_matches_sync_list(self):
+        for query in ("?fields=id,full_name", "?q=Customer", "?sort_by=full_name"):
+            with self.subTest(query=query):
+                self.assertEqual(
+                    self.client.get(f"/customers/async/{query}").json(),
+                    self.client.get(f"/customers/{query}").json(),
+                )
+
+    def test_list_is_scoped_to_salon(self):
+        response = self.client.get("/customers/?fields=id")
+        ids = {customer["id"] for customer in response.data}
+        self.assertIn(self.customer.pk, ids)
+        self.assertNotIn(self.other_customer.pk, ids)
+
+    def test_detail(self):
+        self.assert_performance(
+            "customers.detail",
+            lambda: self.client.get(f"/customers/{self.customer.pk}/"),
+            max_queries=4,
+        )
+
+    def test_detail_of_other_salon_is_not_found(self):
+        response = self.client.get(f"/customers/{self.other_customer.pk}/")
+        self.assertEqual(response.status_code, 404)
+
+    def test_summary(self):
+        self.assert_performance(
+            "customers.summary",
+            lambda: self.client.get(f"/customers/{self.customer.pk}/summary/"),
+            max_queries=4,
+        )
+
+    def test_stale_summary_is_aggregated_without_writing(self):
+        expected = self.client.get(f"/customers/{self.customer.pk}/summary/").data
+        # Written before its next appointment passed
+        CustomerStats.objects.filter(customer=self.customer).update(
+            visit_count=99, next_appointment=timezone.now() - timedelta(minutes=1)
+        )
+
+        response = self.client.get(f"/customers/{self.customer.pk}/summary/")
+        self.assertEqual(response.data, expected)
+        self.assertEqual(
+            CustomerStats.objects.get(customer=self.customer).visit_count, 99
+        )
+
+    def test_create(self):
+        self.assert_performance(
+            "customers.create",
+            lambda: self.client.post(
+                "/customers/",
+                {
+                    "full_name": "New Customer",
+                    "phone_number": next_phone_number(),
+                    "salon_ids": [self.salon.pk],
+                },
+                format="json",
+            ),
+            max_queries=8,
+            status=201,
+        )
+
+    def test_update(self):
+        self.assert_performance(
+            "customers.update",
+            lambda: self.client.patch(
+                f"/customers/{self.customer.pk}/",
+                {"full_name": "Renamed Customer"},
+                format="json",
+            ),
+            max_queries=8,
+        )
+
+    def test_update_keeps_memberships_of_other_salons(self):
+        self.customer.salons.add(self.other_salon)
+
+        response = self.client.patch(
+            f"/customers/{self.customer.pk}/",
+            {"salon_ids": [self.salon.pk]},
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertCountEqual(
+            self.customer.salons.all(), [self.salon, self.other_salon]
+        )
+
+
+class DedupeTests(PerformanceTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.salon = create_salon()
+        cls.other_salon = create_salon(name="Other Salon")
+        cls.phone_number = next_phone_number()
+        cls.jane, cls.jane_again, cls.john, cls.unnamed = (
+            Customer.objects.create(full_name=name, phone_number=cls.phone_number)
+            for name in ("Jane Doe", "doe, JANE", "John Doe", "")
+        )
+        cls.jane.salons.add(cls.salon)
+        cls.jane_again.salons.add(cls.other_salon)
+        cls.john.salons.add(cls.salon)
+        cls.unnamed.salons.add(cls.salon)
+
+        user = cls.other_salon.users.first()
+        cls.appointment = Appointment.objects.bulk_create(
+            [
+                Appointment(
+                    salon=cls.other_salon,
+                    user=user,
+                    customer=cls.jane_again,
+                    appointment_time=timezone.now() + timedelta(days=1),
+                )
+            ]
+        )[0]
+
+    def cluster_ids(self, **kwargs):
+        return [
+            [pk for pk, _ in cluster.members] for cluster in iter_clusters(**kwargs)
+        ]
+
+    def dedupe(self, *args):
+        call_command("dedupe_customers", *args, stdout=io.StringIO())
+
+    def test_names_are_matched_by_default(self):
+        self.assertEqual(self.cluster_ids(), [[self.jane.pk, self.jane_again.pk]])
+
+    def test_phone_only(self):
+        self.assertEqual(
+            self.cluster_ids(match_names=False),
+            [[self.jane.pk, self.jane_again.pk, self.john.pk, self.unnamed.pk]],
+        )
+
+    def test_report_changes_nothing(self):
+        self.dedupe()
+        self.assertEqual(
+            Customer.objects.filter(phone_number=self.phone_number).count(), 4
+        )
+
+    def test_merge(self):
+        self.dedupe("--merge")
+
+        self.assertFalse(Customer.objects.filter(pk=self.jane_again.pk).exists())
+        self.assertTrue(Customer.objects.filter(pk=self.john.pk).exists())
+        self.assertTrue(Customer.objects.filter(pk=self.unnamed.pk).exists())
+
+        # The survivor took over the appointment and the membership
+        self.appointment.refresh_from_db()
+        self.assertEqual(self.appointment.customer_id, self.jane.pk)
+        self.assertCountEqual(
+            self.jane.salons.values_list("pk", flat=True),
+            [self.salon.pk, self.other_salon.pk],
+        )
+        self.assertEqual(
+            CustomerStats.objects.get(customer=self.jane).upcoming_count, 1
+        )
+
+    def test_merge_phone_only(self):
+        self.dedupe("--merge", "--phone-only")
+
+        self.assertEqual(
+            list(Customer.objects.filter(phone_number=self.phone_number)), [self.jane]
+        )
+        self.jane.refresh_from_db()
+        self.assertEqual(self.jane.full_name, "Jane Doe")
+
+    def test_blank_survivor_name_is_filled(self):
+        survivor = Customer.objects.create(full_name="", phone_number=self.phone_number)
+        merge_clusters(
+            [
+                Cluster(
+                    str(self.phone_number),
+                    [(survivor.pk, ""), (self.john.pk, "John Doe")],
+                )
+            ]
+        )
+        survivor.refresh_from_db()
+        self.assertEqual(survivor.full_name, "John Doe")
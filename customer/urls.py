@@ -1,6 +1,11 @@
 from django.urls import path
 
-from .views import CustomerDetailUpdateDeleteView, CustomerListCreateAPIView
+from .views import (
+    AsyncCustomerListView,
+    CustomerDetailUpdateDeleteView,
+    CustomerListCreateAPIView,
+    CustomerSummaryView,
+)
 
 urlpatterns = [
     path("", CustomerListCreateAPIView.as_view(), name="customer-list-create"),
@@ -9,4 +14,6 @@ urlpatterns = [
         CustomerDetailUpdateDeleteView.as_view(),
         name="customer-detail-update-delete",
     ),
+    path("<int:pk>/summary/", CustomerSummaryView.as_view(), name="customer-summary"),
+    path("async/", AsyncCustomerListView.as_view(), name="customer-list-async"),
 ]
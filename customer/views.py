@@ -1,44 +1,121 @@
-from rest_framework.generics import ListCreateAPIView, RetrieveUpdateDestroyAPIView
+from asgiref.sync import sync_to_async
+from django.http import Http404
+from rest_framework.generics import (
+    ListCreateAPIView,
+    RetrieveAPIView,
+    RetrieveUpdateDestroyAPIView,
+)
+from rest_framework.response import Response
 
+from booking_api.asyncviews import AsyncReadView
+from booking_api.conditional import ConditionalGetMixin
+from booking_api.database import NonAtomicReadsMixin
+from booking_api.prefetch import AutoPrefetchMixin
+from booking_api.tenancy import SalonScopedMixin
+
+from .helpers import get_customer_stats, search_customers
 from .models import Customer
-from .serializers import CustomerSerializer
+from .serializers import CustomerSerializer, CustomerSummarySerializer
 
 ALLOWED_SORT_FIELDS = ['id', 'full_name', 'phone_number', 'created', 'modified']
 DEFAULT_SORT_FIELD = 'created'
 DEFAULT_SORT_ORDER = 'desc'
+DEFAULT_SEARCH_LIMIT = 10
+MAX_SEARCH_LIMIT = 50
+
+
+def sort_customers(queryset, query_params):
+    """Apply ``?sort_by=`` and ``?order=``, falling back to newest first."""
+    sort_by = query_params.get('sort_by', DEFAULT_SORT_FIELD)
+    order = query_params.get('order', DEFAULT_SORT_ORDER)
+
+    # Validate sort field
+    if sort_by not in ALLOWED_SORT_FIELDS:
+        sort_by = DEFAULT_SORT_FIELD
+
+    # Validate order direction
+    if order not in ['asc', 'desc']:
+        order = DEFAULT_SORT_ORDER
+
+    # Apply ordering
+    order_prefix = '-' if order == 'desc' else ''
+    return queryset.order_by(f'{order_prefix}{sort_by}')
+
+
+def get_search_limit(query_params):
+    try:
+        limit = int(query_params.get('limit', DEFAULT_SEARCH_LIMIT))
+    except ValueError:
+        limit = DEFAULT_SEARCH_LIMIT
+    return max(1, min(limit, MAX_SEARCH_LIMIT))
 
 
-class CustomerListCreateAPIView(ListCreateAPIView):
+class CustomerListCreateAPIView(
+    NonAtomicReadsMixin,
+    ConditionalGetMixin,
+    SalonScopedMixin,
+    AutoPrefetchMixin,
+    ListCreateAPIView,
+):
     queryset = Customer.objects.all()
     serializer_class = CustomerSerializer
+    salon_field = 'salons'
 
     def get_queryset(self):
-        queryset = super().get_queryset()
+        # Scoped to the caller's salons, or to ?salon= by SalonScopedMixin
+        return sort_customers(super().get_queryset(), self.request.query_params)
 
-        # Filter by salon
-        salon_id = self.request.query_params.get('salon')
-        if salon_id:
-            queryset = queryset.filter(salons__id=salon_id)
+    def list(self, request, *args, **kwargs):
+        # Typeahead search (?q=) returns only the best ranked matches
+        search = request.query_params.get('q', '').strip()
+        if not search:
+            return super().list(request, *args, **kwargs)
 
-        # Sorting
-        sort_by = self.request.query_params.get('sort_by', DEFAULT_SORT_FIELD)
-        order = self.request.query_params.get('order', DEFAULT_SORT_ORDER)
+        limit = get_search_limit(request.query_params)
+        customers = search_customers(self.get_queryset(), search, limit)
+        serializer = self.get_serializer(customers, many=True)
+        return Response(serializer.data)
 
-        # Validate sort field
-        if sort_by not in ALLOWED_SORT_FIELDS:
-            sort_by = DEFAULT_SORT_FIELD
 
-        # Validate order direction
-        if order not in ['asc', 'desc']:
-            order = DEFAULT_SORT_ORDER
+class AsyncCustomerListView(AsyncReadView):
+    """Async ``GET /customers/``, including the ``?q=`` typeahead search."""
 
-        # Apply ordering
-        order_prefix = '-' if order == 'desc' else ''
-        queryset = queryset.order_by(f'{order_prefix}{sort_by}')
+    queryset = Customer.objects.all()
+    serializer_class = CustomerSerializer
+    salon_field = 'salons'
 
-        return queryset
+    async def get(self, request):
+        queryset = sort_customers(self.get_queryset(), request.query_params)
+        search = request.query_params.get('q', '').strip()
+        if not search:
+            return await self.list_response(queryset)
 
+        limit = get_search_limit(request.query_params)
+        # Up to two queries decided in between, so run together off the loop
+        customers = await sync_to_async(search_customers)(queryset, search, limit)
+        return Response(self.get_serializer(customers, many=True).data)
 
-class CustomerDetailUpdateDeleteView(RetrieveUpdateDestroyAPIView):
+
+class CustomerDetailUpdateDeleteView(
+    NonAtomicReadsMixin,
+    ConditionalGetMixin,
+    SalonScopedMixin,
+    AutoPrefetchMixin,
+    RetrieveUpdateDestroyAPIView,
+):
     queryset = Customer.objects.all()
     serializer_class = CustomerSerializer
+    salon_field = 'salons'
+
+
+class CustomerSummaryView(NonAtomicReadsMixin, SalonScopedMixin, RetrieveAPIView):
+    """Visit statistics of a customer, served from its denormalized row."""
+
+    queryset = Customer.objects.all()
+    serializer_class = CustomerSummarySerializer
+    salon_field = 'salons'
+
+    def get_object(self):
+        if not self.get_queryset().filter(pk=self.kwargs['pk']).exists():
+            raise Http404
+        return get_customer_stats(self.kwargs['pk'])
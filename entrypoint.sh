@@ -1,13 +1,9 @@
 #!/bin/sh
 set -e
 
-# Run health checks for external services
-echo "Running health checks..."
-python manage.py healthcheck --fail-fast
-
-echo "Running database migrations..."
-python manage.py migrate --noinput
-python manage.py seed_data
+# Health checks, then migrations and seed data unless they are current
+echo "Preparing database..."
+python manage.py bootstrap
 
 echo "Starting application..."
 exec "$@"
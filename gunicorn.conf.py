@@ -0,0 +1,26 @@
+"""
+Gunicorn settings shared by every way the web tier is started.
+
+Command line flags (see the Dockerfile) take precedence over this file.
+"""
+
+import os
+import shutil
+
+
+def on_starting(server):
+    # Only gunicorn's workers share samples through a directory; set here so
+    # management commands and runserver never look for it
+    directory = os.environ.get("GUNICORN_METRICS_DIR")
+    if directory:
+        # Samples left by a previous run would be aggregated with the new ones
+        shutil.rmtree(directory, ignore_errors=True)
+        os.makedirs(directory, exist_ok=True)
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = directory
+
+
+def child_exit(server, worker):
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
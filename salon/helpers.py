@@ -0,0 +1,120 @@
+"""
+Process-local cache of salon settings.
+
+Appointment writes and SMS actors need a salon's name and reminder time on
+every run. Each web and worker process keeps the most recently used salons
+in memory and drops them whenever the shared settings version, bumped on
+every salon change, moves on. The version is read at most once per
+``VERSION_CHECK_INTERVAL`` seconds, so other processes see changes within
+about a second.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple
+
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Salon
+
+SETTINGS_VERSION_KEY = "salon:settings-version"
+VERSION_CHECK_INTERVAL = 1.0
+MAX_CACHED_SALONS = 256
+
+_lock = threading.Lock()
+_salons = OrderedDict()
+_version = None
+_checked_at = float("-inf")
+# Moves on whenever cached settings are dropped, so a row read before that
+# is not stored after it
+_generation = 0
+
+
+class SalonSettings(NamedTuple):
+    pk: int
+    name: str
+    phone_number: str
+    reminder_time_minutes: int
+
+
+def get_salon_settings(salon_id):
+    """
+    Return the settings of a salon, from memory when possible.
+
+    Raises:
+        Salon.DoesNotExist: If there is no salon with this id
+    """
+    _check_version()
+
+    with _lock:
+        settings = _salons.get(salon_id)
+        if settings is not None:
+            _salons.move_to_end(salon_id)
+            return settings
+        generation = _generation
+
+    settings = _read_settings(salon_id)
+
+    with _lock:
+        # Dropped while reading, so the row may predate the change
+        if generation == _generation:
+            _salons[salon_id] = settings
+            if len(_salons) > MAX_CACHED_SALONS:
+                _salons.popitem(last=False)
+    return settings
+
+
+def _read_settings(salon_id):
+    row = Salon.objects.filter(pk=salon_id).values_list(*SalonSettings._fields).first()
+    if row is None:
+        raise Salon.DoesNotExist(f"Salon {salon_id} does not exist")
+    return SalonSettings(*row)
+
+
+def bump_settings_version(using=None):
+    """
+    Invalidate cached salon settings in every process once the current
+    transaction on ``using`` commits, when other processes can see the change.
+    """
+    transaction.on_commit(_bump_settings_version, using=using, robust=True)
+
+
+def _bump_settings_version():
+    # Added first since incr() fails on a missing key; a fresh value never
+    # matches one read before an eviction
+    if not cache.add(SETTINGS_VERSION_KEY, time.time_ns(), timeout=None):
+        try:
+            cache.incr(SETTINGS_VERSION_KEY)
+        except ValueError:
+            # Evicted since the add
+            cache.add(SETTINGS_VERSION_KEY, time.time_ns(), timeout=None)
+    clear_local_settings()
+
+
+def clear_local_settings():
+    global _checked_at, _generation
+
+    with _lock:
+        _salons.clear()
+        _generation += 1
+        # Re-read the version on next access so this process never keeps
+        # using settings cached under the old one.
+        _checked_at = float("-inf")
+
+
+def _check_version():
+    global _version, _checked_at, _generation
+
+    now = time.monotonic()
+    if now - _checked_at < VERSION_CHECK_INTERVAL:
+        return
+
+    version = cache.get(SETTINGS_VERSION_KEY, 0)
+    with _lock:
+        if version != _version:
+            _salons.clear()
+            _generation += 1
+            _version = version
+        _checked_at = now
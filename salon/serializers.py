@@ -1,13 +1,15 @@
+from django.utils import timezone
 from phonenumber_field.serializerfields import PhoneNumberField
 from rest_framework import serializers
 
 from address.models import Address
 from address.serializers import AddressSerializer
+from booking_api.serializers import SparseFieldsMixin
 
 from .models import Salon
 
 
-class SalonSerializer(serializers.ModelSerializer):
+class SalonSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     addresses = AddressSerializer(many=True)
     phone_number = PhoneNumberField(region="GB")
 
@@ -18,15 +20,36 @@ class SalonSerializer(serializers.ModelSerializer):
     def validate_addresses(self, addresses):
         if len(addresses) == 0:
             raise serializers.ValidationError("Address cannot be an empty list.")
+
+        # Ids refer to addresses of the salon being updated; new salons only
+        # get new addresses
+        if self.instance is not None:
+            # Prefetched by the view, so usually free
+            existing = {address.pk for address in self.instance.addresses.all()}
+            unknown = [
+                address["id"]
+                for address in addresses
+                if "id" in address and address["id"] not in existing
+            ]
+            if unknown:
+                raise serializers.ValidationError(
+                    f"Unknown address ids for this salon: {unknown}"
+                )
         return addresses
 
     def create(self, validated_data):
         address_data = validated_data.pop("addresses", [])
         salon = Salon.objects.create(**validated_data)
 
-        for address in address_data:
-            addr = Address.objects.create(salon=salon, **address)
-            salon.addresses.add(addr)
+        addresses = Address.objects.bulk_create(
+            [
+                Address(
+                    **{attr: value for attr, value in address.items() if attr != "id"}
+                )
+                for address in address_data
+            ]
+        )
+        self.link_addresses(salon, addresses)
 
         return salon
 
@@ -40,22 +63,67 @@ class SalonSerializer(serializers.ModelSerializer):
 
         # Update addresses if provided
         if address_data is not None:
-            # Clear existing addresses and add new ones
-            instance.addresses.clear()
-            for address in address_data:
-                address_id = address.get("id")
-                if address_id:
-                    # Update existing address
-                    addr = Address.objects.filter(id=address_id).first()
-                    if addr:
-                        for attr, value in address.items():
-                            if attr != "id":
-                                setattr(addr, attr, value)
-                        addr.save()
-                        instance.addresses.add(addr)
-                else:
-                    # Create new address
-                    addr = Address.objects.create(salon=instance, **address)
-                    instance.addresses.add(addr)
+            self.sync_addresses(instance, address_data)
 
         return instance
+
+    def sync_addresses(self, salon, address_data):
+        """
+        Make the salon's addresses match ``address_data``.
+
+        Entries with an ``id`` update that address, entries without one are
+        created and addresses missing from the list are unlinked. Ids were
+        checked to belong to the salon by ``validate_addresses()``. Each kind of
+        change is applied with a single query, whatever the number of
+        addresses.
+
+        Args:
+            salon (Salon): Salon being updated
+            address_data (list[dict]): Validated nested address data
+        """
+        existing = {address.pk: address for address in salon.addresses.all()}
+
+        now = timezone.now()
+        kept = set()
+        changed = []
+        changed_fields = set()
+        new = []
+        for data in address_data:
+            fields = {attr: value for attr, value in data.items() if attr != "id"}
+            if "id" not in data:
+                new.append(Address(**fields))
+                continue
+
+            address = existing[data["id"]]
+            kept.add(address.pk)
+            updated = {
+                attr
+                for attr, value in fields.items()
+                if getattr(address, attr) != value
+            }
+            if updated:
+                for attr in updated:
+                    setattr(address, attr, fields[attr])
+                address.modified = now
+                changed.append(address)
+                changed_fields |= updated
+
+        if changed:
+            Address.objects.bulk_update(changed, [*changed_fields, "modified"])
+
+        removed = existing.keys() - kept
+        if removed:
+            Salon.addresses.through.objects.filter(
+                salon=salon, address_id__in=removed
+            ).delete()
+
+        self.link_addresses(salon, Address.objects.bulk_create(new))
+
+    @staticmethod
+    def link_addresses(salon, addresses):
+        Salon.addresses.through.objects.bulk_create(
+            [
+                Salon.addresses.through(salon=salon, address=address)
+                for address in addresses
+            ]
+        )
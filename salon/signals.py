@@ -0,0 +1,14 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .helpers import bump_settings_version, clear_local_settings
+from .models import Salon
+
+
+@receiver(post_save, sender=Salon)
+@receiver(post_delete, sender=Salon)
+def invalidate_salon_settings(sender, using, **kwargs):
+    # Drop this process's copy right away so it reads its own writes, and
+    # tell other processes once the change is visible to them.
+    clear_local_settings()
+    bump_settings_version(using)
@@ -1 +1,225 @@
-# Create your tests here.
+from unittest import mock
+
+from django.core.cache import cache
+
+from booking_api.testing import (
+    PerformanceTestCase,
+    add_customers,
+    add_staff,
+    create_salon,
+    next_phone_number,
+)
+from salon import helpers
+from salon.helpers import bump_settings_version, get_salon_settings
+from user import helpers as user_helpers
+from user.helpers import STAFF_DIRECTORY_FIELDS
+
+
+class SalonEndpointTests(PerformanceTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.salon = create_salon()
+        cls.user = cls.salon.users.first()
+        add_customers(cls.salon, 5)
+        cls.other_salon = create_salon(name="Other Salon")
+
+    def setUp(self):
+        super().setUp()
+        self.authenticate(self.user)
+
+    def test_list(self):
+        self.assert_performance(
+            "salons.list",
+            lambda: self.client.get("/salons/"),
+            max_queries=3,
+            grow=lambda: self.user.salons.add(create_salon(name="Second Salon")),
+        )
+
+    def test_list_is_scoped_to_memberships(self):
+        response = self.client.get("/salons/")
+        self.assertEqual([salon["id"] for salon in response.data], [self.salon.pk])
+
+    def test_detail(self):
+        self.assert_performance(
+            "salons.detail",
+            lambda: self.client.get(f"/salons/{self.salon.pk}/"),
+            max_queries=3,
+        )
+
+    def test_detail_async(self):
+        self.assert_performance(
+            "salons.detail_async",
+            lambda: self.client.get(f"/salons/{self.salon.pk}/async/"),
+            max_queries=3,
+        )
+        self.assertEqual(
+            self.client.get(f"/salons/{self.salon.pk}/async/").json(),
+            self.client.get(f"/salons/{self.salon.pk}/").json(),
+        )
+
+    def test_detail_async_not_modified(self):
+        url = f"/salons/{self.salon.pk}/async/"
+        etag = self.client.get(url)["ETag"]
+        self.assert_performance(
+            "salons.detail_async_not_modified",
+            lambda: self.client.get(url, HTTP_IF_NONE_MATCH=etag),
+            max_queries=1,
+            status=304,
+        )
+
+    def test_detail_etag_follows_addresses(self):
+        url = f"/salons/{self.salon.pk}/"
+        etag = self.client.get(url)["ETag"]
+        address = self.salon.addresses.first()
+        address.city = "Leeds"
+        address.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_detail_async_of_other_salon_is_not_found(self):
+        response = self.client.get(f"/salons/{self.other_salon.pk}/async/")
+        self.assertEqual(response.status_code, 404)
+
+    def test_detail_of_other_salon_is_not_found(self):
+        response = self.client.get(f"/salons/{self.other_salon.pk}/")
+        self.assertEqual(response.status_code, 404)
+
+    def test_create(self):
+        self.assert_performance(
+            "salons.create",
+            lambda: self.client.post(
+                "/salons/",
+                {
+                    "name": "New Salon",
+                    "phone_number": next_phone_number(),
+                    "addresses": [
+                        {
+                            "street": "2 High Street",
+                            "city": "London",
+                            "postal_code": "SW1A 1AA",
+                        }
+                    ],
+                },
+                format="json",
+            ),
+            max_queries=8,
+            status=201,
+        )
+
+    def test_staff_directory(self):
+        self.assert_performance(
+            "salons.staff",
+            lambda: self.client.get(f"/salons/{self.salon.pk}/staff/"),
+            max_queries=0,
+            grow=lambda: add_staff(self.salon, 10),
+        )
+
+    def test_staff_directory_of_other_salon_is_forbidden(self):
+        response = self.client.get(f"/salons/{self.other_salon.pk}/staff/")
+        self.assertEqual(response.status_code, 403)
+
+    def staff(self):
+        response = self.client.get(f"/salons/{self.salon.pk}/staff/")
+        return {member["id"]: member for member in response.data}
+
+    def test_staff_directory_omits_memberships(self):
+        self.other_salon.users.add(self.user)
+        self.assertEqual(set(self.staff()[self.user.pk]), set(STAFF_DIRECTORY_FIELDS))
+
+    def test_staff_directory_read_before_a_change_is_not_cached(self):
+        member = self.salon.users.exclude(pk=self.user.pk).first()
+        read = user_helpers.read_staff_directory
+
+        def read_then_rename(salon_id):
+            staff = read(salon_id)
+            # Committed while the directory was being read
+            member.full_name = "Renamed"
+            with self.captureOnCommitCallbacks(execute=True):
+                member.save()
+            return staff
+
+        with mock.patch.object(
+            user_helpers, "read_staff_directory", side_effect=read_then_rename
+        ):
+            self.staff()
+        self.assertEqual(self.staff()[member.pk]["full_name"], "Renamed")
+
+    def test_staff_directory_follows_memberships(self):
+        self.staff()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            joined = add_staff(self.salon, 1)[0]
+        self.assertIn(joined.pk, self.staff())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.salon.users.remove(joined)
+        self.assertNotIn(joined.pk, self.staff())
+
+    def test_staff_directory_follows_profiles(self):
+        member = self.salon.users.exclude(pk=self.user.pk).first()
+        self.staff()
+
+        member.full_name = "Renamed"
+        with self.captureOnCommitCallbacks(execute=True):
+            member.save()
+        self.assertEqual(self.staff()[member.pk]["full_name"], "Renamed")
+
+        member.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            member.save()
+        self.assertNotIn(member.pk, self.staff())
+
+
+class SalonSettingsCacheTests(PerformanceTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.salon = create_salon()
+
+    def test_settings_are_cached(self):
+        get_salon_settings(self.salon.pk)
+        with self.assertNumQueries(0):
+            settings = get_salon_settings(self.salon.pk)
+        self.assertEqual(settings.name, self.salon.name)
+
+    def test_version_is_bumped_on_commit(self):
+        version = cache.get(helpers.SETTINGS_VERSION_KEY)
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.salon.save()
+        self.assertEqual(cache.get(helpers.SETTINGS_VERSION_KEY), version)
+
+        for callback in callbacks:
+            callback()
+        self.assertNotEqual(cache.get(helpers.SETTINGS_VERSION_KEY), version)
+
+    def test_bump_after_eviction(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            bump_settings_version()
+        version = cache.get(helpers.SETTINGS_VERSION_KEY)
+
+        cache.delete(helpers.SETTINGS_VERSION_KEY)
+        with self.captureOnCommitCallbacks(execute=True):
+            bump_settings_version()
+        self.assertNotIn(cache.get(helpers.SETTINGS_VERSION_KEY), (None, version))
+
+    def test_bump_when_evicted_between_add_and_incr(self):
+        with (
+            mock.patch.object(cache, "add", side_effect=[False, True]) as add,
+            mock.patch.object(cache, "incr", side_effect=ValueError),
+            self.captureOnCommitCallbacks(execute=True),
+        ):
+            bump_settings_version()
+        self.assertEqual(add.call_count, 2)
+
+    def test_row_read_before_a_change_is_not_cached(self):
+        read_settings = helpers._read_settings
+
+        def read_then_change(salon_id):
+            settings = read_settings(salon_id)
+            # Another thread sees a new version while this one was reading
+            helpers.clear_local_settings()
+            return settings
+
+        with mock.patch.object(helpers, "_read_settings", read_then_change):
+            get_salon_settings(self.salon.pk)
+        with self.assertNumQueries(1):
+            get_salon_settings(self.salon.pk)
@@ -1,6 +1,11 @@
 from django.urls import path
 
-from salon.views import SalonDetailUpdateDeleteView, SalonListCreateAPIView
+from salon.views import (
+    AsyncSalonDetailView,
+    SalonDetailUpdateDeleteView,
+    SalonListCreateAPIView,
+    StaffDirectoryView,
+)
 
 app_name = "salon"
 
@@ -12,4 +17,6 @@ urlpatterns = [
         SalonDetailUpdateDeleteView.as_view(),
         name="salon_detail_update_delete",
     ),
+    path("<int:pk>/staff/", StaffDirectoryView.as_view(), name="salon_staff"),
+    path("<int:pk>/async/", AsyncSalonDetailView.as_view(), name="salon_detail_async"),
 ]
@@ -1,15 +1,67 @@
-from rest_framework.generics import ListCreateAPIView, RetrieveUpdateDestroyAPIView
+from rest_framework.generics import (
+    GenericAPIView,
+    ListCreateAPIView,
+    RetrieveUpdateDestroyAPIView,
+)
+from rest_framework.response import Response
 
+from booking_api.asyncviews import AsyncReadView
+from booking_api.conditional import ConditionalGetMixin
+from booking_api.database import NonAtomicReadsMixin
+from booking_api.prefetch import AutoPrefetchMixin
+from booking_api.tenancy import SalonScopedMixin
 from salon.models import Salon
 from salon.serializers import SalonSerializer
+from user.helpers import get_staff_directory
 
 
 # Create your views here.
-class SalonListCreateAPIView(ListCreateAPIView):
+class SalonListCreateAPIView(
+    NonAtomicReadsMixin,
+    ConditionalGetMixin,
+    SalonScopedMixin,
+    AutoPrefetchMixin,
+    ListCreateAPIView,
+):
     queryset = Salon.objects.all()
     serializer_class = SalonSerializer
+    salon_field = "pk"
 
+    def perform_create(self, serializer):
+        # The creator becomes a member so they can manage their new salon
+        salon = serializer.save()
+        salon.users.add(self.request.user)
+
+
+class SalonDetailUpdateDeleteView(
+    NonAtomicReadsMixin,
+    ConditionalGetMixin,
+    SalonScopedMixin,
+    AutoPrefetchMixin,
+    RetrieveUpdateDestroyAPIView,
+):
+    queryset = Salon.objects.all()
+    serializer_class = SalonSerializer
+    salon_field = "pk"
+
+
+class AsyncSalonDetailView(AsyncReadView):
+    """Async ``GET /salons/<pk>/``."""
 
-class SalonDetailUpdateDeleteView(RetrieveUpdateDestroyAPIView):
     queryset = Salon.objects.all()
     serializer_class = SalonSerializer
+    salon_field = "pk"
+
+    async def get(self, request, pk):
+        return await self.detail_response(self.get_queryset(), pk)
+
+
+class StaffDirectoryView(NonAtomicReadsMixin, SalonScopedMixin, GenericAPIView):
+    """Compact list of a salon's staff, for pickers and calendars."""
+
+    queryset = Salon.objects.all()
+    salon_field = "pk"
+
+    def get(self, request, pk):
+        self.check_salon_access([pk])
+        return Response(get_staff_directory(pk))
@@ -0,0 +1,216 @@
+"""
+Throughput of the sync read endpoints under WSGI against their async
+counterparts under ASGI.
+
+Logs in as the owners of salons generated by ``seed_data --scale`` and, for
+every ``--clients`` level, keeps that many concurrent clients requesting the
+hot read endpoints for ``--duration`` seconds: the sync paths from the WSGI
+server and the ``async/`` paths from the ASGI server. Both servers must use
+the same database. Requests per second and latency percentiles are reported
+per endpoint, server and concurrency level.
+
+Usage::
+
+    gunicorn --workers 3 --threads 2 --bind :8000 booking_api.wsgi:application &
+    uvicorn --workers 3 --port 8001 booking_api.asgi:application &
+    python scripts/compare_servers.py --wsgi-url http://localhost:8000 \\
+        --asgi-url http://localhost:8001 --clients 10,50,100 --duration 20
+"""
+
+import argparse
+import itertools
+import json
+import random
+import statistics
+import threading
+import time
+from datetime import date, timedelta
+from http.cookies import SimpleCookie
+
+import requests
+
+# Sync path and async path of every endpoint, formatted with the salon id,
+# a day and a search term
+ENDPOINTS = {
+    "calendar": (
+        "/appointments/?salon={salon}&date={day}&expand=customer",
+        "/appointments/async/?salon={salon}&date={day}&expand=customer",
+    ),
+    "customers": (
+        "/customers/?salon={salon}&fields=id,full_name,phone_number",
+        "/customers/async/?salon={salon}&fields=id,full_name,phone_number",
+    ),
+    "search": (
+        "/customers/?salon={salon}&q={term}",
+        "/customers/async/?salon={salon}&q={term}",
+    ),
+    "salon": ("/salons/{salon}/", "/salons/{salon}/async/"),
+}
+# Names, and the national digits every generated customer number starts with
+SEARCH_TERMS = ("Smith", "Patel", "Olivia", "Jack", "Chen", "06000")
+
+
+def percentile(ordered, percent):
+    index = min(len(ordered) - 1, round(percent / 100 * (len(ordered) - 1)))
+    return round(ordered[index] * 1000, 1)
+
+
+def login(options, salon_number):
+    """Returns the bearer token and salon id of a generated salon's owner."""
+    response = requests.post(
+        options.wsgi_url.rstrip("/") + "/users/login/",
+        json={
+            "email": options.email.format(salon=salon_number),
+            "password": options.password,
+        },
+        timeout=options.timeout,
+    )
+    response.raise_for_status()
+    # The cookie is marked secure, so it is read from the header
+    cookies = SimpleCookie()
+    for header in response.raw.headers.getlist("Set-Cookie"):
+        cookies.load(header)
+    return cookies["token"].value, response.json()["user"]["salons"][0]
+
+
+class Client(threading.Thread):
+    def __init__(self, base_url, path, account, options, deadline, seed):
+        super().__init__(daemon=True)
+        self.base_url = base_url.rstrip("/")
+        self.path = path
+        self.salon = account[1]
+        self.options = options
+        self.deadline = deadline
+        self.rng = random.Random(seed)
+        self.session = requests.Session()
+        self.session.headers["Authorization"] = f"Bearer {account[0]}"
+        self.latencies = []
+        self.errors = 0
+
+    def run(self):
+        while time.monotonic() < self.deadline:
+            day = date.today() + timedelta(days=self.rng.randint(-7, 14))
+            path = self.path.format(
+                salon=self.salon,
+                day=day.isoformat(),
+                term=self.rng.choice(SEARCH_TERMS),
+            )
+            started = time.perf_counter()
+            try:
+                response = self.session.get(
+                    self.base_url + path, timeout=self.options.timeout
+                )
+                ok = response.ok
+            except requests.RequestException:
+                ok = False
+            self.latencies.append(time.perf_counter() - started)
+            if not ok:
+                self.errors += 1
+
+
+def measure(base_url, path, accounts, clients, options):
+    started = time.monotonic()
+    deadline = started + options.duration
+    threads = [
+        Client(base_url, path, account, options, deadline, f"{options.seed}:{index}")
+        for index, account in zip(range(clients), itertools.cycle(accounts))
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    duration = time.monotonic() - started
+
+    latencies = sorted(itertools.chain.from_iterable(t.latencies for t in threads))
+    if not latencies:
+        return {"requests": 0, "errors": 0, "rps": 0.0}
+    return {
+        "requests": len(latencies),
+        "errors": sum(thread.errors for thread in threads),
+        "rps": round(len(latencies) / duration, 1),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 1),
+        "p50_ms": percentile(latencies, 50),
+        "p99_ms": percentile(latencies, 99),
+    }
+
+
+def parse_counts(value):
+    return [int(count) for count in value.split(",")]
+
+
+def parse_endpoints(value):
+    names = value.split(",")
+    for name in names:
+        if name not in ENDPOINTS:
+            raise argparse.ArgumentTypeError(f"Unknown endpoint: {name}")
+    return names
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--wsgi-url", default="http://localhost:8000")
+    parser.add_argument("--asgi-url", default="http://localhost:8001")
+    parser.add_argument(
+        "--clients",
+        type=parse_counts,
+        default=[10, 50],
+        help="Comma-separated concurrent client counts to compare",
+    )
+    parser.add_argument(
+        "--duration", type=float, default=20, help="Seconds per measurement"
+    )
+    parser.add_argument(
+        "--endpoints",
+        type=parse_endpoints,
+        default=list(ENDPOINTS),
+        help=f"Comma-separated endpoints to measure (default {','.join(ENDPOINTS)})",
+    )
+    parser.add_argument(
+        "--salons",
+        type=int,
+        default=10,
+        help="Number of generated salons the clients are spread over",
+    )
+    parser.add_argument(
+        "--email",
+        default="staff{salon}.0@scale.example.com",
+        help="Login email; {salon} is replaced by the salon number",
+    )
+    parser.add_argument("--password", default="scalepass123")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Also write the results to this file")
+    options = parser.parse_args()
+
+    accounts = [login(options, number) for number in range(1, options.salons + 1)]
+
+    print(
+        f"\n{'endpoint':<11}{'server':<7}{'clients':>8}{'requests':>10}"
+        f"{'errors':>8}{'req/s':>9}{'mean':>9}{'p50':>9}{'p99':>9}  (ms)"
+    )
+    results = []
+    for name in options.endpoints:
+        for clients in options.clients:
+            for server, base_url, path in zip(
+                ("wsgi", "asgi"),
+                (options.wsgi_url, options.asgi_url),
+                ENDPOINTS[name],
+                strict=True,
+            ):
+                row = measure(base_url, path, accounts, clients, options)
+                results.append(
+                    {"endpoint": name, "server": server, "clients": clients, **row}
+                )
+                print(
+                    f"{name:<11}{server:<7}{clients:>8}{row['requests']:>10}"
+                    f"{row['errors']:>8}{row['rps']:>9}{row.get('mean_ms', '-'):>9}"
+                    f"{row.get('p50_ms', '-'):>9}{row.get('p99_ms', '-'):>9}"
+                )
+
+    if options.json:
+        with open(options.json, "w") as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
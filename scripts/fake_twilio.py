@@ -0,0 +1,153 @@
+"""
+Local stand-in for the Twilio Messages API, for load tests and benchmarks.
+
+Accepts ``POST /2010-04-01/Accounts/<sid>/Messages.json`` like Twilio does,
+waits ``--latency-ms`` to mimic the real round trip and answers with a queued
+message. Nothing is sent anywhere. ``GET /stats`` returns the number of
+messages received so far; ``POST /stats/reset`` sets it back to zero.
+
+Point the app and the dramatiq worker at it with::
+
+    TWILIO_API_URL=http://localhost:8025 TWILLIO_SID=ACfake TWILLIO_TOKEN=fake
+
+Usage::
+
+    python scripts/fake_twilio.py --port 8025 --latency-ms 150
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+
+class Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.messages = 0
+            self.failures = 0
+            self.first = None
+            self.last = None
+
+    def record(self, failed):
+        now = time.time()
+        with self.lock:
+            if failed:
+                self.failures += 1
+                return
+            self.messages += 1
+            self.first = self.first or now
+            self.last = now
+
+    def as_dict(self):
+        with self.lock:
+            return {
+                "messages": self.messages,
+                "failures": self.failures,
+                "first": self.first,
+                "last": self.last,
+            }
+
+
+class FakeTwilioHandler(BaseHTTPRequestHandler):
+    server_version = "FakeTwilio/1.0"
+
+    def do_GET(self):
+        if self.path == "/stats":
+            self.reply(200, self.server.stats.as_dict())
+        else:
+            self.reply(404, {"message": "Not found"})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        form = parse_qs(self.rfile.read(length).decode())
+
+        if self.path == "/stats/reset":
+            self.server.stats.reset()
+            self.reply(204)
+            return
+        if not self.path.endswith("/Messages.json"):
+            self.reply(404, {"message": "Not found"})
+            return
+
+        time.sleep(self.server.latency)
+        failed = random.random() < self.server.fail_rate
+        self.server.stats.record(failed)
+        if failed:
+            self.reply(500, {"code": 20500, "message": "Simulated failure"})
+            return
+
+        sid = f"SM{uuid.uuid4().hex}"
+        self.reply(
+            201,
+            {
+                "sid": sid,
+                "status": "queued",
+                "to": form.get("To", [""])[0],
+                "from": form.get("From", [""])[0],
+                "body": form.get("Body", [""])[0],
+                "num_segments": "1",
+                "direction": "outbound-api",
+                "uri": f"{self.path[: -len('.json')]}/{sid}.json",
+            },
+        )
+
+    def reply(self, status, payload=None):
+        body = json.dumps(payload).encode() if payload is not None else b""
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8025)
+    parser.add_argument(
+        "--latency-ms",
+        type=float,
+        default=150,
+        help="Delay before answering, like the real API round trip",
+    )
+    parser.add_argument(
+        "--fail-rate",
+        type=float,
+        default=0.0,
+        help="Share of messages answered with a 500",
+    )
+    parser.add_argument("--verbose", action="store_true", help="Log every request")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer((args.host, args.port), FakeTwilioHandler)
+    server.daemon_threads = True
+    server.stats = Stats()
+    server.latency = args.latency_ms / 1000
+    server.fail_rate = args.fail_rate
+    server.verbose = args.verbose
+
+    print(f"Fake Twilio listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(json.dumps(server.stats.as_dict()))
+
+
+if __name__ == "__main__":
+    main()
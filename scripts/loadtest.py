@@ -0,0 +1,297 @@
+"""
+Load test of the booking API with scripted front desk scenarios.
+
+Each virtual user logs in as the owner of one salon generated by
+``seed_data --scale`` and then loops over weighted scenarios until the time
+is up:
+
+- ``login``: signs in again
+- ``calendar``: polls one day of the salon's appointments, as the calendar
+  view does
+- ``book``: books a customer in the coming weeks
+- ``reschedule``: moves one of its own bookings to another slot
+
+Throughput and latency percentiles are reported per scenario, so runs
+against different gunicorn ``--workers``/``--threads`` settings compare
+directly. Bookings send SMS, so run the app and the worker against
+``scripts/fake_twilio.py`` (see the README).
+
+Usage::
+
+    python scripts/loadtest.py --base-url http://localhost:8000 \\
+        --users 20 --duration 60 --label "3 workers x 2 threads"
+"""
+
+import argparse
+import json
+import random
+import statistics
+import threading
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+from http.cookies import SimpleCookie
+
+import requests
+
+SCENARIOS = ("login", "calendar", "book", "reschedule")
+DEFAULT_WEIGHTS = "login=1,calendar=12,book=3,reschedule=2"
+
+
+class Results:
+    """Latencies and failures of every request, per scenario."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def record(self, scenario, elapsed, ok):
+        with self.lock:
+            self.latencies[scenario].append(elapsed)
+            if not ok:
+                self.errors[scenario] += 1
+
+    def summary(self, duration):
+        rows = {}
+        for scenario in SCENARIOS:
+            latencies = sorted(self.latencies.get(scenario, ()))
+            if not latencies:
+                continue
+            rows[scenario] = {
+                "requests": len(latencies),
+                "errors": self.errors.get(scenario, 0),
+                "rps": round(len(latencies) / duration, 1),
+                "mean_ms": round(statistics.fmean(latencies) * 1000, 1),
+                "p50_ms": percentile(latencies, 50),
+                "p90_ms": percentile(latencies, 90),
+                "p99_ms": percentile(latencies, 99),
+                "max_ms": round(latencies[-1] * 1000, 1),
+            }
+        return rows
+
+
+def percentile(ordered, percent):
+    index = min(len(ordered) - 1, round(percent / 100 * (len(ordered) - 1)))
+    return round(ordered[index] * 1000, 1)
+
+
+class VirtualUser(threading.Thread):
+    def __init__(self, options, number, results, deadline):
+        super().__init__(daemon=True)
+        self.options = options
+        self.results = results
+        self.deadline = deadline
+        self.rng = random.Random(f"{options.seed}:{number}")
+        salon_number = number % options.salons + 1
+        self.email = options.email.format(salon=salon_number)
+        self.session = requests.Session()
+        self.scenarios = list(options.weights)
+        self.weights = list(options.weights.values())
+        self.user = None
+        self.salon_id = None
+        self.customer_ids = []
+        self.booked = []
+
+    def url(self, path):
+        return self.options.base_url.rstrip("/") + path
+
+    def request(self, scenario, method, path, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = self.session.request(
+                method, self.url(path), timeout=self.options.timeout, **kwargs
+            )
+        except requests.RequestException:
+            self.results.record(scenario, time.perf_counter() - started, ok=False)
+            return None
+        self.results.record(scenario, time.perf_counter() - started, response.ok)
+        return response if response.ok else None
+
+    def login(self):
+        response = self.request(
+            "login",
+            "POST",
+            "/users/login/",
+            json={"email": self.email, "password": self.options.password},
+        )
+        if response is None:
+            return False
+
+        # The cookie is marked secure and may carry a production domain, so
+        # the token is read from the header and sent as a bearer token
+        cookies = SimpleCookie()
+        for header in response.raw.headers.getlist("Set-Cookie"):
+            cookies.load(header)
+        self.session.headers["Authorization"] = f"Bearer {cookies['token'].value}"
+        self.session.cookies.clear()
+        self.user = response.json()["user"]
+        return True
+
+    def run(self):
+        if not self.login() or not self.user["salons"]:
+            return
+        self.salon_id = self.user["salons"][0]
+
+        response = self.session.get(
+            self.url(f"/customers/?salon={self.salon_id}&fields=id"),
+            timeout=self.options.timeout,
+        )
+        if response.ok:
+            self.customer_ids = [customer["id"] for customer in response.json()]
+
+        while time.monotonic() < self.deadline:
+            scenario = self.rng.choices(self.scenarios, self.weights)[0]
+            getattr(self, scenario)()
+            if self.options.think_time:
+                time.sleep(self.rng.uniform(0, 2 * self.options.think_time))
+
+    def calendar(self):
+        day = date.today() + timedelta(days=self.rng.randint(-7, 14))
+        self.request(
+            "calendar",
+            "GET",
+            f"/appointments/?salon={self.salon_id}&date={day.isoformat()}",
+        )
+
+    def book(self):
+        if not self.customer_ids:
+            return
+        start = self.slot()
+        response = self.request(
+            "book",
+            "POST",
+            "/appointments/",
+            json={
+                "salon": self.salon_id,
+                "user": self.user["id"],
+                "customer": self.rng.choice(self.customer_ids),
+                "appointment_time": start.isoformat(),
+                "end_time": (start + timedelta(minutes=60)).isoformat(),
+            },
+        )
+        if response is not None:
+            self.booked.append(response.json()["id"])
+
+    def reschedule(self):
+        if not self.booked:
+            self.book()
+            return
+        start = self.slot()
+        self.request(
+            "reschedule",
+            "PATCH",
+            f"/appointments/{self.rng.choice(self.booked)}/",
+            json={
+                "appointment_time": start.isoformat(),
+                "end_time": (start + timedelta(minutes=60)).isoformat(),
+            },
+        )
+
+    def slot(self):
+        """A quarter-hour during opening hours in the next three weeks."""
+        day = date.today() + timedelta(days=self.rng.randint(1, 21))
+        return datetime(
+            day.year,
+            day.month,
+            day.day,
+            self.rng.randint(9, 18),
+            self.rng.choice((0, 15, 30, 45)),
+            tzinfo=timezone.utc,
+        )
+
+
+def parse_weights(value):
+    weights = {}
+    for item in value.split(","):
+        name, _, weight = item.partition("=")
+        if name not in SCENARIOS:
+            raise argparse.ArgumentTypeError(f"Unknown scenario: {name}")
+        weights[name] = float(weight)
+    return weights
+
+
+def print_report(label, options, rows, duration):
+    print(f"\n{label or 'Load test'}: {options.users} users for {duration:.0f}s")
+    header = f"{'scenario':<12}{'requests':>10}{'errors':>8}{'req/s':>8}"
+    header += "".join(f"{name:>9}" for name in ("mean", "p50", "p90", "p99", "max"))
+    print(header + "  (ms)")
+    for scenario, row in rows.items():
+        line = f"{scenario:<12}{row['requests']:>10}{row['errors']:>8}{row['rps']:>8}"
+        line += "".join(
+            f"{row[key]:>9}" for key in ("mean_ms", "p50_ms", "p90_ms", "p99_ms")
+        )
+        print(line + f"{row['max_ms']:>9}")
+
+    total = sum(row["requests"] for row in rows.values())
+    print(f"{'total':<12}{total:>10}{'':>8}{round(total / duration, 1):>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--users", type=int, default=10, help="Concurrent users")
+    parser.add_argument("--duration", type=float, default=60, help="Seconds")
+    parser.add_argument(
+        "--salons",
+        type=int,
+        default=10,
+        help="Number of generated salons the users are spread over",
+    )
+    parser.add_argument(
+        "--email",
+        default="staff{salon}.0@scale.example.com",
+        help="Login email; {salon} is replaced by the salon number",
+    )
+    parser.add_argument("--password", default="scalepass123")
+    parser.add_argument(
+        "--weights",
+        type=parse_weights,
+        default=DEFAULT_WEIGHTS,
+        help=f"Relative scenario frequencies (default {DEFAULT_WEIGHTS})",
+    )
+    parser.add_argument(
+        "--think-time",
+        type=float,
+        default=0.0,
+        help="Average pause between requests of a user, in seconds",
+    )
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--label", help="Name of the configuration under test")
+    parser.add_argument("--json", help="Also write the results to this file")
+    options = parser.parse_args()
+    if isinstance(options.weights, str):
+        options.weights = parse_weights(options.weights)
+
+    results = Results()
+    started = time.monotonic()
+    deadline = started + options.duration
+    users = [
+        VirtualUser(options, number, results, deadline)
+        for number in range(options.users)
+    ]
+    for user in users:
+        user.start()
+    for user in users:
+        user.join()
+    duration = time.monotonic() - started
+
+    rows = results.summary(duration)
+    print_report(options.label, options, rows, duration)
+    if options.json:
+        with open(options.json, "w") as file:
+            json.dump(
+                {
+                    "label": options.label,
+                    "users": options.users,
+                    "duration": round(duration, 1),
+                    "scenarios": rows,
+                },
+                file,
+                indent=2,
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+import time
+
+from asgiref.sync import sync_to_async
+from dj_rest_auth.app_settings import api_settings as rest_auth_settings
+from dj_rest_auth.jwt_auth import JWTCookieAuthentication
+from django.core.cache import cache
+from django.db import router
+from django.utils.translation import gettext_lazy as _
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from booking_api.replicas import replica_reads
+from booking_api.tenancy import membership_cache_key
+
+from .models import ExtendedUser
+
+USER_CACHE_TIMEOUT = 300
+
+# What authentication and scoping read from request.user; other fields are
+# deferred and loaded from the database on first access
+CACHED_USER_FIELDS = ("id", "is_active", "is_staff", "is_superuser", "is_owner")
+
+
+def user_version_key(user_id):
+    return f"user:{user_id}:auth-version"
+
+
+def user_cache_key(user_id, version):
+    return f"user:{user_id}:auth:{version}"
+
+
+def get_user_version(user_id):
+    """Current version of ``user_id``'s cache entry, moved on by every save."""
+    key = user_version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        # Unique after an eviction too, so no older entry is ever matched
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+async def aget_user_version(user_id):
+    """``get_user_version()`` for async views."""
+    key = user_version_key(user_id)
+    version = await cache.aget(key)
+    if version is None:
+        await cache.aadd(key, time.time_ns(), timeout=None)
+        version = await cache.aget(key)
+    return version
+
+
+def bump_user_version(user_id):
+    """
+    Orphan ``user_id``'s cached entry.
+
+    An entry stored by a request that loaded the user before the change
+    lands under the old version, so it is never read.
+    """
+    key = user_version_key(user_id)
+    if cache.add(key, time.time_ns(), timeout=None):
+        return
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Evicted since the add
+        cache.add(key, time.time_ns(), timeout=None)
+
+
+def forget_user(user_id):
+    """Drop the cached user and salon memberships of ``user_id``."""
+    bump_user_version(user_id)
+    cache.delete(membership_cache_key(user_id))
+
+
+def cache_entry(user, salon_ids):
+    """The part of ``user`` kept in the cache, without any secret."""
+    return {
+        **{field: getattr(user, field) for field in CACHED_USER_FIELDS},
+        "salon_ids": salon_ids,
+        "password_marker": get_md5_hash_password(user.password),
+    }
+
+
+def user_from_entry(entry):
+    """An ``ExtendedUser`` holding the cached fields, deferring the others."""
+    # from_db() takes the values in the order of the model's fields
+    fields = [
+        field.attname
+        for field in ExtendedUser._meta.concrete_fields
+        if field.attname in CACHED_USER_FIELDS
+    ]
+    user = ExtendedUser.from_db(
+        router.db_for_read(ExtendedUser),
+        fields,
+        [entry[field] for field in fields],
+    )
+    user._salon_ids = entry["salon_ids"]
+    return user
+
+
+class CachedJWTCookieAuthentication(JWTCookieAuthentication):
+    """
+    JWTCookieAuthentication loading the user from the shared cache.
+
+    Only the fields authentication and salon scoping need are cached, with
+    the user's salon ids and a marker of its password, so an authenticated,
+    salon-scoped request needs no query to identify the caller. Keys include
+    a per-user version moved on after every save, membership change or
+    logout (see ``user.signals``), so a request racing with one of those can
+    only fill an entry that is never read.
+    """
+
+    def get_user(self, validated_token):
+        user_id = self.get_user_id(validated_token)
+        key = user_cache_key(user_id, get_user_version(user_id))
+        entry = cache.get(key)
+        if entry is None:
+            user = self.load_user(validated_token)
+            cache.set(key, cache_entry(user, user._salon_ids), USER_CACHE_TIMEOUT)
+            return user
+
+        self.check_cached_user(entry, validated_token)
+        return user_from_entry(entry)
+
+    def load_user(self, validated_token):
+        """
+        The user and its salon ids, read from the primary.
+
+        Read views route their queries to the replica, which may not have
+        the latest save yet; an entry filled from it would be served until
+        it expires.
+        """
+        with replica_reads(False):
+            user = super().get_user(validated_token)
+            # Queried rather than taken from the membership cache, which is
+            # not versioned
+            user._salon_ids = frozenset(user.salons.values_list("pk", flat=True))
+        return user
+
+    async def aauthenticate(self, request):
+        """
+        ``authenticate()`` for async views, reading the cache without blocking.
+
+        Only a cache miss falls back to the database, in a worker thread.
+        """
+        raw_token = self.get_request_token(request)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+
+        user_id = self.get_user_id(validated_token)
+        key = user_cache_key(user_id, await aget_user_version(user_id))
+        entry = await cache.aget(key)
+        if entry is None:
+            user = await sync_to_async(self.load_user)(validated_token)
+            await cache.aset(
+                key, cache_entry(user, user._salon_ids), USER_CACHE_TIMEOUT
+            )
+            return user, validated_token
+
+        self.check_cached_user(entry, validated_token)
+        return user_from_entry(entry), validated_token
+
+    def get_request_token(self, request):
+        """
+        The raw token of ``request``, from its header or else its cookie.
+
+        Applies the CSRF checks of ``authenticate()`` to cookies. Those only
+        reject unsafe methods, so safe requests skip them.
+        """
+        header = self.get_header(request)
+        if header is not None:
+            return self.get_raw_token(header)
+
+        cookie_name = rest_auth_settings.JWT_AUTH_COOKIE
+        if not cookie_name:
+            return None
+        raw_token = request.COOKIES.get(cookie_name)
+        if request.method not in SAFE_METHODS and (
+            rest_auth_settings.JWT_AUTH_COOKIE_ENFORCE_CSRF_ON_UNAUTHENTICATED
+            or (raw_token is not None and rest_auth_settings.JWT_AUTH_COOKIE_USE_CSRF)
+        ):
+            self.enforce_csrf(request)
+        return raw_token
+
+    @staticmethod
+    def get_user_id(validated_token):
+        try:
+            return validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(
+                _("Token contained no recognizable user identification")
+            ) from None
+
+    @staticmethod
+    def check_cached_user(entry, validated_token):
+        """The checks the parent applies to users loaded from the database."""
+        if api_settings.CHECK_USER_IS_ACTIVE and not entry["is_active"]:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        if (
+            api_settings.CHECK_REVOKE_TOKEN
+            and validated_token.get(api_settings.REVOKE_TOKEN_CLAIM)
+            != entry["password_marker"]
+        ):
+            raise AuthenticationFailed(
+                _("The user's password has been changed."), code="password_changed"
+            )
@@ -0,0 +1,11 @@
+"""
+Attributes of the cookies the API sets, shared by the auth views and
+middleware that set cookies of their own.
+"""
+
+from django.conf import settings
+
+# Cookie configuration - matches login/register cookie settings
+COOKIE_DOMAIN = ".lichnails.co.uk" if not settings.DEVELOPMENT_MODE else None
+COOKIE_SAMESITE = "None"
+COOKIE_PATH = "/"
@@ -1,8 +1,96 @@
+import time
+
+from django.core.cache import cache
 from rest_framework_simplejwt.tokens import RefreshToken
 
+from .models import ExtendedUser
+
+STAFF_DIRECTORY_TIMEOUT = 300
+STAFF_DIRECTORY_FIELDS = (
+    "id",
+    "email",
+    "full_name",
+    "first_name",
+    "last_name",
+    "phone_number",
+    "is_owner",
+)
+
 
 def generate_tokens(user):
     token = RefreshToken.for_user(user)
     tokens = {"access_token": str(token.access_token), "refresh_token": str(token)}
 
     return tokens
+
+
+def staff_directory_version_key(salon_id):
+    return f"salon:{salon_id}:staff-version"
+
+
+def staff_directory_cache_key(salon_id, version):
+    return f"salon:{salon_id}:staff:{version}"
+
+
+def get_staff_directory_version(salon_id):
+    """Current version of a salon's directory, moved on by every change."""
+    key = staff_directory_version_key(salon_id)
+    version = cache.get(key)
+    if version is None:
+        # Unique after an eviction too, so no older entry is ever matched
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_staff_directory_version(salon_id):
+    """
+    Orphan the cached directory of ``salon_id``.
+
+    A directory stored by a request that read the staff before the change
+    lands under the old version, so it is never read.
+    """
+    key = staff_directory_version_key(salon_id)
+    if cache.add(key, time.time_ns(), timeout=None):
+        return
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Evicted since the add
+        cache.add(key, time.time_ns(), timeout=None)
+
+
+def get_staff_directory(salon_id):
+    """
+    Active staff of a salon.
+
+    Built with a single query and cached under a per-salon version, moved on
+    once a member or membership of the salon changes (see ``user.signals``).
+
+    Args:
+        salon_id (int): Salon whose staff to list
+
+    Returns:
+        list[dict]: Staff ordered by name
+    """
+    # Read before the staff, so a change committed meanwhile orphans the entry
+    key = staff_directory_cache_key(salon_id, get_staff_directory_version(salon_id))
+    staff = cache.get(key)
+    if staff is not None:
+        return staff
+
+    staff = read_staff_directory(salon_id)
+    cache.set(key, staff, STAFF_DIRECTORY_TIMEOUT)
+    return staff
+
+
+def read_staff_directory(salon_id):
+    members = ExtendedUser.salons.through.objects.filter(salon_id=salon_id).values(
+        "extendeduser_id"
+    )
+    return [
+        {**user, "phone_number": str(user["phone_number"])}
+        for user in ExtendedUser.objects.filter(pk__in=members, is_active=True)
+        .values(*STAFF_DIRECTORY_FIELDS)
+        .order_by("full_name", "email")
+    ]
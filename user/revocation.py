@@ -0,0 +1,111 @@
+"""
+Revocation of refresh tokens.
+
+Revoked token ids (``jti``) live in a Redis sorted set scored by their
+expiry, so entries disappear once the token could not be used anyway. Each
+process mirrors the set in a Bloom filter: a token the filter has never seen
+is not revoked and costs no round trip, and only possible matches are
+confirmed against Redis. Processes pick up revocations made elsewhere within
+``SYNC_INTERVAL`` seconds.
+"""
+
+import functools
+import hashlib
+import math
+import threading
+import time
+
+from rest_framework_simplejwt.settings import api_settings
+
+from booking_api.cache import get_redis_client
+
+REVOKED_TOKENS_KEY = "auth:revoked-refresh-tokens"
+REVOKED_VERSION_KEY = "auth:revoked-refresh-tokens:version"
+SYNC_INTERVAL = 1.0
+
+
+class BloomFilter:
+    """Set membership with false positives but no false negatives."""
+
+    def __init__(self, capacity, error_rate=0.001):
+        self.size = max(
+            64, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        )
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "big")
+        second = int.from_bytes(digest[8:], "big")
+        # Double hashing derives all positions from one digest
+        return ((first + i * second) % self.size for i in range(self.hash_count))
+
+    def add(self, item):
+        for position in self._positions(item):
+            self.bits[position // 8] |= 1 << (position % 8)
+
+    def __contains__(self, item):
+        return all(
+            self.bits[position // 8] & (1 << (position % 8))
+            for position in self._positions(item)
+        )
+
+
+class RevocationList:
+    """Process-local view of the revoked refresh tokens."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.filter = BloomFilter(1024)
+        self.version = None
+        self.synced_at = float("-inf")
+
+    @functools.cached_property
+    def redis(self):
+        return get_redis_client()
+
+    def revoke(self, jti, expires_at):
+        pipe = self.redis.pipeline()
+        pipe.zadd(REVOKED_TOKENS_KEY, {jti: expires_at})
+        pipe.zremrangebyscore(REVOKED_TOKENS_KEY, "-inf", time.time())
+        pipe.incr(REVOKED_VERSION_KEY)
+        pipe.execute()
+
+        with self.lock:
+            self.filter.add(jti)
+
+    def is_revoked(self, jti):
+        self.sync()
+        if jti not in self.filter:
+            return False
+        return self.redis.zscore(REVOKED_TOKENS_KEY, jti) is not None
+
+    def sync(self):
+        """Rebuild the filter when another process revoked a token."""
+        now = time.monotonic()
+        if now - self.synced_at < SYNC_INTERVAL:
+            return
+
+        version = self.redis.get(REVOKED_VERSION_KEY)
+        if version != self.version:
+            jtis = self.redis.zrangebyscore(REVOKED_TOKENS_KEY, time.time(), "+inf")
+            revoked = BloomFilter(max(1024, 2 * len(jtis)))
+            for jti in jtis:
+                revoked.add(jti.decode())
+            with self.lock:
+                self.filter = revoked
+                self.version = version
+        self.synced_at = now
+
+
+revocation_list = RevocationList()
+
+
+def revoke_refresh_token(token):
+    """Reject ``token`` (a ``RefreshToken``) from now on, in every process."""
+    revocation_list.revoke(token[api_settings.JTI_CLAIM], token["exp"])
+
+
+def is_refresh_token_revoked(token):
+    return revocation_list.is_revoked(token[api_settings.JTI_CLAIM])
@@ -1,10 +1,16 @@
+from typing import ClassVar
+
 from dj_rest_auth.registration.serializers import RegisterSerializer
 from phonenumber_field.serializerfields import PhoneNumberField
 from rest_framework import serializers
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
 
+from booking_api.serializers import SparseFieldsMixin
 from salon.models import Salon
 
 from .models import ExtendedUser
+from .revocation import is_refresh_token_revoked
 
 
 class UserCreateSerializer(RegisterSerializer):
@@ -51,10 +57,36 @@ class UserCreateSerializer(RegisterSerializer):
         return user
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     phone_number = PhoneNumberField(required=True, allow_blank=False, region="GB")
     salons = serializers.PrimaryKeyRelatedField(many=True, read_only=True)
 
     class Meta:
         model = ExtendedUser
         exclude = ("password", "is_superuser", "groups", "user_permissions")
+        # Granted by an administrator, never through the API; addresses ids
+        # would otherwise attach any salon's or user's address
+        read_only_fields = ("is_staff", "is_active", "is_owner", "addresses")
+        expandable_fields: ClassVar[dict[str, str]] = {
+            "salons": "salon.serializers.SalonSerializer",
+        }
+
+    def get_fields(self):
+        fields = super().get_fields()
+
+        # The login email is changed by salon owners, not by staff themselves
+        request = self.context.get("request")
+        if request is None or not (request.user.is_owner or request.user.is_superuser):
+            fields["email"] = serializers.EmailField(read_only=True)
+        return fields
+
+
+class RevocableTokenRefreshSerializer(TokenRefreshSerializer):
+    """Refuse refresh tokens revoked at logout."""
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs["refresh"])
+        if is_refresh_token_revoked(refresh):
+            raise InvalidToken("Token is revoked")
+
+        return super().validate(attrs)
@@ -0,0 +1,76 @@
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_save, pre_delete
+from django.dispatch import receiver
+
+from booking_api.tenancy import membership_cache_key
+
+from .authentication import bump_user_version
+from .helpers import bump_staff_directory_version
+from .models import ExtendedUser
+
+
+def delete_on_commit(keys, using):
+    transaction.on_commit(lambda: cache.delete_many(keys), using=using, robust=True)
+
+
+def forget_staff_directories_on_commit(salon_ids, using):
+    """Orphan the cached directories of ``salon_ids`` once the change is visible."""
+
+    def bump():
+        for salon_id in salon_ids:
+            bump_staff_directory_version(salon_id)
+
+    transaction.on_commit(bump, using=using, robust=True)
+
+
+def forget_users_on_commit(user_ids, using):
+    """Orphan the cached entries of ``user_ids`` once the change is visible."""
+
+    def bump():
+        for user_id in user_ids:
+            bump_user_version(user_id)
+
+    transaction.on_commit(bump, using=using, robust=True)
+
+
+@receiver(m2m_changed, sender=ExtendedUser.salons.through)
+def invalidate_salon_memberships(
+    sender, instance, action, reverse, pk_set, using, **kwargs
+):
+    """Forget cached salon ids and staff directories affected by a change."""
+    if action not in ("pre_clear", "post_add", "post_remove"):
+        return
+
+    if reverse:
+        # ``instance`` is a salon and ``pk_set`` holds user ids
+        salon_ids = [instance.pk]
+        if action == "pre_clear":
+            user_ids = list(instance.users.values_list("pk", flat=True))
+        else:
+            user_ids = pk_set
+    else:
+        user_ids = [instance.pk]
+        if action == "pre_clear":
+            salon_ids = list(instance.salons.values_list("pk", flat=True))
+        else:
+            salon_ids = pk_set
+
+    delete_on_commit([membership_cache_key(user_id) for user_id in user_ids], using)
+    forget_staff_directories_on_commit(list(salon_ids), using)
+    # Cached users carry their salon ids too
+    forget_users_on_commit(list(user_ids), using)
+
+
+@receiver(post_save, sender=ExtendedUser)
+@receiver(pre_delete, sender=ExtendedUser)
+def invalidate_cached_user(sender, instance, using, **kwargs):
+    """Covers profile edits, password changes, deactivation and last_login."""
+    # New users join salons afterwards, and last_login is not in directories
+    update_fields = kwargs.get("update_fields")
+    if not kwargs.get("created") and update_fields != {"last_login"}:
+        salon_ids = list(instance.salons.values_list("pk", flat=True))
+        forget_staff_directories_on_commit(salon_ids, using)
+
+    delete_on_commit([membership_cache_key(instance.pk)], using)
+    forget_users_on_commit([instance.pk], using)
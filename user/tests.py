@@ -1 +1,357 @@
-# Create your tests here.
+import time
+from unittest import mock
+
+from dj_rest_auth.app_settings import api_settings as rest_auth_settings
+from django.core.cache import cache
+from django.test import RequestFactory, override_settings
+from rest_framework.exceptions import PermissionDenied
+
+from booking_api.cache import get_redis_client
+from booking_api.replicas import replica_reads
+from booking_api.testing import (
+    PASSWORD,
+    PerformanceTestCase,
+    add_staff,
+    create_salon,
+    next_phone_number,
+)
+from user.authentication import (
+    CachedJWTCookieAuthentication,
+    aget_user_version,
+    bump_user_version,
+    cache_entry,
+    get_user_version,
+    user_cache_key,
+    user_from_entry,
+    user_version_key,
+)
+from user.helpers import generate_tokens
+from user.models import ExtendedUser
+from user.revocation import (
+    REVOKED_TOKENS_KEY,
+    REVOKED_VERSION_KEY,
+    SYNC_INTERVAL,
+    BloomFilter,
+    RevocationList,
+)
+
+
+class UserEndpointTests(PerformanceTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.salon = create_salon(staff=3)
+        cls.user = cls.salon.users.first()
+        cls.other_user = create_salon(name="Other Salon").users.first()
+
+    def setUp(self):
+        super().setUp()
+        self.authenticate(self.user)
+
+    def test_list(self):
+        self.assert_performance(
+            "users.list",
+            lambda: self.client.get("/users/"),
+            max_queries=3,
+            grow=lambda: add_staff(self.salon, 10),
+        )
+
+    def test_detail(self):
+        self.assert_performance(
+            "users.detail",
+            lambda: self.client.get(f"/users/{self.user.pk}/"),
+            max_queries=3,
+        )
+
+    def test_detail_of_other_salon_is_not_found(self):
+        response = self.client.get(f"/users/{self.other_user.pk}/")
+        self.assertEqual(response.status_code, 404)
+
+    def test_update(self):
+        self.assert_performance(
+            "users.update",
+            lambda: self.client.patch(
+                f"/users/{self.user.pk}/", {"first_name": "Renamed"}, format="json"
+            ),
+            max_queries=7,
+        )
+
+    def test_update_of_other_staff_is_forbidden(self):
+        colleague = self.salon.users.exclude(pk=self.user.pk).first()
+        response = self.client.patch(
+            f"/users/{colleague.pk}/", {"first_name": "Renamed"}, format="json"
+        )
+        self.assertEqual(response.status_code, 403)
+        colleague.refresh_from_db()
+        self.assertNotEqual(colleague.first_name, "Renamed")
+
+    def test_owner_updates_staff(self):
+        owner = add_staff(self.salon, 1)[0]
+        owner.is_owner = True
+        owner.save()
+        self.authenticate(owner)
+        response = self.client.patch(
+            f"/users/{self.user.pk}/", {"first_name": "Renamed"}, format="json"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["first_name"], "Renamed")
+
+    def test_update_ignores_privilege_fields(self):
+        response = self.client.patch(
+            f"/users/{self.user.pk}/",
+            {"is_staff": True, "is_active": False, "is_owner": True},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.is_staff)
+        self.assertTrue(self.user.is_active)
+        self.assertFalse(self.user.is_owner)
+
+    def test_update_ignores_email_and_addresses(self):
+        address = self.other_user.salons.get().addresses.get()
+        response = self.client.patch(
+            f"/users/{self.user.pk}/",
+            {"email": "taken@example.com", "addresses": [address.pk]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.user.refresh_from_db()
+        self.assertNotEqual(self.user.email, "taken@example.com")
+        self.assertFalse(self.user.addresses.exists())
+
+    def test_owner_updates_staff_email(self):
+        owner = add_staff(self.salon, 1)[0]
+        owner.is_owner = True
+        owner.save()
+        self.authenticate(owner)
+        response = self.client.patch(
+            f"/users/{self.user.pk}/", {"email": "renamed@example.com"}, format="json"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.email, "renamed@example.com")
+
+    def test_register(self):
+        emails = (f"new{number}@example.com" for number in range(100))
+        self.assert_performance(
+            "users.register",
+            lambda: self.client.post(
+                "/users/register/",
+                {
+                    "email": next(emails),
+                    "password1": PASSWORD,
+                    "password2": PASSWORD,
+                    "phone_number": next_phone_number(),
+                    "salons": [self.salon.pk],
+                },
+                format="json",
+            ),
+            max_queries=19,
+            status=201,
+        )
+
+    def test_login(self):
+        self.client.credentials()
+        self.assert_performance(
+            "users.login",
+            lambda: self.client.post(
+                "/users/login/",
+                {"email": self.user.email, "password": PASSWORD},
+                format="json",
+            ),
+            max_queries=12,
+        )
+
+    def test_logout_revokes_refresh_token(self):
+        refresh = generate_tokens(self.user)["refresh_token"]
+        response = self.client.post("/token/refresh/", {"refresh": refresh})
+        self.assertEqual(response.status_code, 200)
+
+        self.client.cookies["refresh_token"] = refresh
+        self.assert_performance(
+            "users.logout", lambda: self.client.post("/users/logout/"), max_queries=4
+        )
+
+        response = self.client.post("/token/refresh/", {"refresh": refresh})
+        self.assertEqual(response.status_code, 401)
+
+    def test_token_refresh(self):
+        refresh = generate_tokens(self.user)["refresh_token"]
+        self.assert_performance(
+            "token.refresh",
+            lambda: self.client.post("/token/refresh/", {"refresh": refresh}),
+            max_queries=3,
+        )
+
+
+class RevocationListTests(PerformanceTestCase):
+    def setUp(self):
+        super().setUp()
+        self.redis = get_redis_client()
+        self.redis.delete(REVOKED_TOKENS_KEY, REVOKED_VERSION_KEY)
+        self.addCleanup(self.redis.delete, REVOKED_TOKENS_KEY, REVOKED_VERSION_KEY)
+        self.revocations = RevocationList()
+
+    def expires_at(self):
+        return time.time() + 60
+
+    def test_unseen_token_costs_no_round_trip(self):
+        self.revocations.sync()
+        with mock.patch.object(self.revocations.redis, "zscore") as zscore:
+            self.assertFalse(self.revocations.is_revoked("unseen"))
+        zscore.assert_not_called()
+
+    def test_possible_match_is_confirmed_in_redis(self):
+        self.revocations.revoke("revoked", self.expires_at())
+
+        # Every token looks revoked to the filter
+        with mock.patch.object(BloomFilter, "__contains__", return_value=True):
+            self.assertTrue(self.revocations.is_revoked("revoked"))
+            self.assertFalse(self.revocations.is_revoked("unseen"))
+
+    def test_revocations_elsewhere_are_picked_up_after_sync_interval(self):
+        self.revocations.sync()
+        RevocationList().revoke("elsewhere", self.expires_at())
+        self.assertFalse(self.revocations.is_revoked("elsewhere"))
+
+        self.revocations.synced_at -= SYNC_INTERVAL
+        self.assertTrue(self.revocations.is_revoked("elsewhere"))
+
+    def test_expired_tokens_are_pruned(self):
+        self.revocations.revoke("expired", time.time() - 1)
+        self.revocations.revoke("current", self.expires_at())
+        self.assertEqual(self.redis.zrange(REVOKED_TOKENS_KEY, 0, -1), [b"current"])
+
+        other = RevocationList()
+        other.redis.zadd(REVOKED_TOKENS_KEY, {"expired": time.time() - 1})
+        other.sync()
+        self.assertNotIn("expired", other.filter)
+        self.assertIn("current", other.filter)
+
+
+class AuthenticationCacheTests(PerformanceTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.salon = create_salon()
+        cls.user = cls.salon.users.first()
+
+    def setUp(self):
+        super().setUp()
+        self.authenticate(self.user)
+
+    def cached_entry(self):
+        version = get_user_version(self.user.pk)
+        return cache.get(user_cache_key(self.user.pk, version))
+
+    def test_cached_request_runs_no_user_query(self):
+        self.client.get(f"/users/{self.user.pk}/")
+        entry = self.cached_entry()
+        self.assertEqual(entry["salon_ids"], {self.salon.pk})
+        self.assertNotIn("password", entry)
+
+        with self.assertNumQueries(1):
+            # Only the user detail itself
+            response = self.client.get(f"/users/{self.user.pk}/?fields=id")
+        self.assertEqual(response.status_code, 200)
+
+    def test_cached_user_loads_other_fields_on_access(self):
+        self.client.get("/users/")
+        user = user_from_entry(self.cached_entry())
+        with self.assertNumQueries(1):
+            self.assertEqual(user.email, self.user.email)
+
+    def test_save_orphans_cached_entry(self):
+        self.client.get("/users/")
+        with self.captureOnCommitCallbacks(execute=True):
+            ExtendedUser.objects.get(pk=self.user.pk).save()
+        self.assertIsNone(self.cached_entry())
+
+    def test_entry_stored_by_a_racing_request_is_never_read(self):
+        # A request loads the user, then the user is deactivated and only
+        # afterwards does the request store what it loaded
+        version = get_user_version(self.user.pk)
+        stale = cache_entry(self.user, frozenset([self.salon.pk]))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+        cache.set(user_cache_key(self.user.pk, version), stale)
+
+        response = self.client.get("/users/")
+        self.assertEqual(response.status_code, 401)
+
+    def test_membership_change_orphans_cached_entry(self):
+        self.client.get("/users/")
+        other_salon = create_salon(name="Other Salon")
+        with self.captureOnCommitCallbacks(execute=True):
+            other_salon.users.add(self.user)
+
+        response = self.client.get(f"/users/?salon={other_salon.pk}")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            self.cached_entry()["salon_ids"], {self.salon.pk, other_salon.pk}
+        )
+
+    def test_version_survives_eviction(self):
+        version = get_user_version(self.user.pk)
+        cache.delete(user_version_key(self.user.pk))
+        bump_user_version(self.user.pk)
+        self.assertNotEqual(get_user_version(self.user.pk), version)
+
+    # No replica is configured in the tests, so a read routed to it fails
+    @override_settings(DATABASE_ROUTERS=["booking_api.replicas.ReplicaRouter"])
+    def test_cache_miss_reads_from_the_primary(self):
+        authentication = CachedJWTCookieAuthentication()
+        token = authentication.get_validated_token(
+            generate_tokens(self.user)["access_token"]
+        )
+
+        with replica_reads():
+            user = authentication.get_user(token)
+
+        self.assertEqual(user, self.user)
+        self.assertEqual(self.cached_entry()["salon_ids"], {self.salon.pk})
+
+    @override_settings(DATABASE_ROUTERS=["booking_api.replicas.ReplicaRouter"])
+    async def test_async_cache_miss_reads_from_the_primary(self):
+        token = generate_tokens(self.user)["access_token"]
+        request = RequestFactory().get("/", HTTP_AUTHORIZATION=f"Bearer {token}")
+
+        with replica_reads():
+            user, _ = await CachedJWTCookieAuthentication().aauthenticate(request)
+
+        self.assertEqual(user, self.user)
+        self.assertEqual(user._salon_ids, {self.salon.pk})
+
+    def cookie_request(self, method="get"):
+        token = generate_tokens(self.user)["access_token"]
+        factory = RequestFactory()
+        factory.cookies["token"] = token
+        return getattr(factory, method)("/")
+
+    async def test_async_cookie_is_read_from_the_cache(self):
+        version = await aget_user_version(self.user.pk)
+        entry = cache_entry(self.user, frozenset([self.salon.pk]))
+        await cache.aset(user_cache_key(self.user.pk, version), entry)
+
+        with (
+            mock.patch.object(rest_auth_settings, "JWT_AUTH_COOKIE", "token"),
+            mock.patch.object(rest_auth_settings, "JWT_AUTH_COOKIE_USE_CSRF", True),
+            # Nothing runs in a worker thread
+            mock.patch("user.authentication.sync_to_async") as sync_to_async,
+        ):
+            result = await CachedJWTCookieAuthentication().aauthenticate(
+                self.cookie_request()
+            )
+
+        sync_to_async.assert_not_called()
+        self.assertEqual(result[0].pk, self.user.pk)
+
+    async def test_async_cookie_enforces_csrf_on_unsafe_methods(self):
+        with (
+            mock.patch.object(rest_auth_settings, "JWT_AUTH_COOKIE", "token"),
+            mock.patch.object(rest_auth_settings, "JWT_AUTH_COOKIE_USE_CSRF", True),
+        ):
+            with self.assertRaises(PermissionDenied):
+                await CachedJWTCookieAuthentication().aauthenticate(
+                    self.cookie_request("post")
+                )
@@ -1,21 +1,29 @@
 from dj_rest_auth.registration.views import RegisterView
 from dj_rest_auth.views import LoginView
-from django.conf import settings
+from django.db.models import Q
 from rest_framework import status
-from rest_framework.generics import ListAPIView
+from rest_framework.generics import GenericAPIView, ListAPIView
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from rest_framework.views import APIView
-
-from user.serializers import UserCreateSerializer, UserSerializer
-
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.views import TokenRefreshView
+
+from booking_api.database import NonAtomicReadsMixin
+from booking_api.prefetch import AutoPrefetchMixin, optimize_queryset
+from booking_api.tenancy import SalonScopedMixin
+from user.serializers import (
+    RevocableTokenRefreshSerializer,
+    UserCreateSerializer,
+    UserSerializer,
+)
+
+from .authentication import forget_user
+from .cookies import COOKIE_DOMAIN, COOKIE_PATH, COOKIE_SAMESITE
 from .helpers import generate_tokens
 from .models import ExtendedUser
-
-# Cookie configuration - matches login/register cookie settings
-COOKIE_DOMAIN = ".lichnails.co.uk" if not settings.DEVELOPMENT_MODE else None
-COOKIE_SAMESITE = "None"
-COOKIE_PATH = "/"
+from .revocation import revoke_refresh_token
 
 
 # Create your views here.
@@ -77,9 +85,15 @@ class CustomLogoutView(APIView):
         """
         Handle POST request to logout user.
 
-        Clears both access token and refresh token cookies by setting
-        them to empty values with max_age=0.
+        Revokes the refresh token so it cannot be used again, clears both
+        access token and refresh token cookies by setting them to empty
+        values with max_age=0, and drops the cached user.
         """
+        if request.user.is_authenticated:
+            forget_user(request.user.pk)
+
+        self._revoke_refresh_token(request)
+
         response = Response(
             {"detail": "Successfully logged out."},
             status=status.HTTP_200_OK,
@@ -89,6 +103,18 @@ class CustomLogoutView(APIView):
 
         return response
 
+    def _revoke_refresh_token(self, request):
+        """Revoke the refresh token from the cookie or the request body."""
+        raw_token = request.COOKIES.get("refresh_token") or request.data.get("refresh")
+        if not raw_token:
+            return
+
+        try:
+            revoke_refresh_token(RefreshToken(raw_token))
+        except TokenError:
+            # Already expired or invalid, so it cannot be used anyway
+            pass
+
     def _clear_auth_cookies(self, response):
         """
         Clear authentication cookies from the response.
@@ -160,40 +186,64 @@ class CustomLoginView(LoginView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class UserListView(ListAPIView):
+class UserListView(
+    NonAtomicReadsMixin, SalonScopedMixin, AutoPrefetchMixin, ListAPIView
+):
     # permission_classes = [permissions.IsAdminUser]  # Field is_staff = True
-    def get(self, request):
-        salon_id = request.query_params.get("salon")
-        users = ExtendedUser.objects.filter(salons=salon_id)
-        serializer = UserSerializer(users, many=True)
-        return Response(serializer.data)
+    queryset = ExtendedUser.objects.all()
+    serializer_class = UserSerializer
+    salon_field = "salons"
 
 
-class UserDetails(APIView):
+class UserDetails(NonAtomicReadsMixin, SalonScopedMixin, GenericAPIView):
     # permission_classes = [IsTokenOwnerOrAdmin]
+    queryset = ExtendedUser.objects.all()
+    salon_field = "salons"
+
+    def get_queryset(self):
+        # Users can always see themselves, even before joining a salon
+        queryset = ExtendedUser.objects.all()
+        salon_ids = self.get_salon_ids()
+        if salon_ids is None:
+            return queryset
+        return queryset.filter(
+            self.salon_filter(salon_ids) | Q(pk=self.request.user.pk)
+        )
 
     def get(self, request, pk):
         try:
-            user = ExtendedUser.objects.get(pk=pk)
+            users = optimize_queryset(
+                self.get_queryset(), UserSerializer(context={"request": request})
+            )
+            user = users.get(pk=pk)
         except ExtendedUser.DoesNotExist:
             return Response(
                 {"error": "User not found"}, status=status.HTTP_404_NOT_FOUND
             )
 
-        serializer = UserSerializer(user)
+        serializer = UserSerializer(user, context={"request": request})
 
         return Response(data={"user": serializer.data})
 
     def patch(self, request, pk):
         try:
-            user = ExtendedUser.objects.get(pk=pk)
+            user = self.get_queryset().get(pk=pk)
         except ExtendedUser.DoesNotExist:
             return Response(
                 {"error": "User not found"}, status=status.HTTP_404_NOT_FOUND
             )
 
+        # Users edit themselves; salon owners edit the staff of their salons,
+        # the only other users get_queryset() returns
+        editor = request.user
+        if user.pk != editor.pk and not (editor.is_owner or editor.is_superuser):
+            return Response(
+                {"error": "You may only edit your own profile"},
+                status=status.HTTP_403_FORBIDDEN,
+            )
+
         serializer = UserSerializer(
-            user, data=request.data, partial=True
+            user, data=request.data, partial=True, context={"request": request}
         )  # set partial=True to update a data partially
 
         if serializer.is_valid():
@@ -201,3 +251,7 @@ class UserDetails(APIView):
             return Response(serializer.data)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+class RevocableTokenRefreshView(TokenRefreshView):
+    serializer_class = RevocableTokenRefreshSerializer